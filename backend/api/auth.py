@@ -5,8 +5,6 @@ from sqlalchemy.orm import Session
 from utils.security import create_access_token, GOOGLE_CLIENT_ID
 from crud.usuario import get_or_create_user
 from api.empresas import get_db
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -19,6 +17,9 @@ async def google_login(google_token: GoogleToken, db: Session = Depends(get_db))
     Recebe um ID Token do Google, valida-o e, em caso de sucesso,
     retorna um token JWT interno da aplicação.
     """
+    # As bibliotecas do Google só são necessárias no login; carregá-las aqui tira esse custo da subida da API
+    from google.oauth2 import id_token
+    from google.auth.transport import requests as google_requests
     try:
         idinfo = id_token.verify_oauth2_token(
             google_token.token, 
@@ -1,9 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from services.gemini_service import GeminiService
+from services import intent_service
+from services.chat_session_service import manager as session_manager
+from api.empresas import get_db
+from api.zabbix import get_zabbix_credentials
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from llm.prompts import PromptBuilder
-from utils.security import get_current_user, TokenData, require_role
+from utils.security import get_current_user, TokenData, require_role, require_empresa_access
 from schemas.roles import UserRole
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 # Define o router com prefixo e tags
 router = APIRouter(
@@ -16,6 +25,9 @@ class ChatRequest(BaseModel):
     question: str
     empresa_id: int
 
+class ChatSessionMessage(BaseModel):
+    question: str
+
 # --- CORREÇÃO APLICADA AQUI ---
 # Instanciamos o PromptBuilder e o GeminiService da forma correta,
 # garantindo que o serviço tenha acesso ao construtor de prompts.
@@ -29,7 +41,10 @@ async def chat_with_gemini(
     current_user: TokenData = Depends(get_current_user)
 ):
     try:
-        result = gemini_service.process_user_question(
+        # O modelo pode levar até o prazo do pro mais o fallback: fora do event loop,
+        # para não travar as demais requisições e streams enquanto isso
+        result = await run_in_threadpool(
+            gemini_service.process_user_question,
             question=request.question,
             empresa_id=request.empresa_id
         )
@@ -37,6 +52,60 @@ async def chat_with_gemini(
             raise HTTPException(status_code=500, detail=result["error"])
         return result
     except Exception as e:
-        # Adiciona um log de erro no console do backend para facilitar o debug
-        print(f"Erro na rota /chat: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.exception("Erro na rota /chat")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/intents/stats")
+def read_intent_stats(current_user: TokenData = Depends(require_role(UserRole.SUPER_ADMIN))):
+    """Taxa de acerto das respostas rápidas por intenção (perguntas que não passaram pelo modelo)."""
+    return intent_service.stats.snapshot()
+
+
+@router.get("/models/stats")
+def read_model_stats(current_user: TokenData = Depends(require_role(UserRole.SUPER_ADMIN))):
+    """Latência, tokens, timeouts e fallbacks por modelo do Gemini."""
+    return gemini_service.router.stats()
+
+
+# --- SESSÕES DE CHAT ---
+
+@router.post("/sessions/{empresa_id}")
+def create_chat_session(
+    empresa_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_user),
+    user_with_access = Depends(require_empresa_access)
+):
+    """Abre uma sessão: o contexto do Zabbix é montado na primeira pergunta e reaproveitado nas seguintes."""
+    api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
+    session = session_manager.create(empresa_id, current_user.user_id, api_url, token_zabbix)
+    return session.info()
+
+def _get_session(session_id: str, current_user: TokenData):
+    session = session_manager.get(session_id, current_user.user_id)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sessão de chat não encontrada ou expirada.")
+    return session
+
+@router.post("/sessions/{session_id}/messages")
+async def send_chat_session_message(
+    session_id: str,
+    request: ChatSessionMessage,
+    current_user: TokenData = Depends(get_current_user)
+):
+    session = _get_session(session_id, current_user)
+    try:
+        return await run_in_threadpool(session_manager.ask, session, request.question)
+    except Exception as e:
+        logger.exception("Erro na rota /chat/sessions", extra={"session_id": session_id})
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sessions/{session_id}")
+def read_chat_session(session_id: str, current_user: TokenData = Depends(get_current_user)):
+    return _get_session(session_id, current_user).info()
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_chat_session(session_id: str, current_user: TokenData = Depends(get_current_user)):
+    if not session_manager.delete(session_id, current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sessão de chat não encontrada ou expirada.")
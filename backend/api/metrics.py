@@ -0,0 +1,25 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import registry
+
+# Coletores como o Prometheus não usam o JWT da aplicação: a coleta exige
+# "Authorization: Bearer <METRICS_TOKEN>". Sem METRICS_TOKEN definido, a rota
+# fica desligada (as métricas expõem rotas, tenants e volumes de uso).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """Métricas no formato de exposição de texto do Prometheus."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Métricas desativadas: defina METRICS_TOKEN.")
+    if not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido.")
+    return PlainTextResponse(registry.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
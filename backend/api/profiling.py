@@ -0,0 +1,140 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel, Field
+
+from schemas.roles import UserRole
+from utils import profiling
+from utils.security import require_role
+
+# Perfis de CPU e memória da instância em execução (ver utils/profiling.py).
+# Só para super admins: as saídas expõem caminhos e nomes internos do código.
+router = APIRouter(
+    prefix=profiling.PROFILING_PATH_PREFIX,
+    tags=["Profiling"],
+    dependencies=[Depends(require_role(UserRole.SUPER_ADMIN))]
+)
+
+GROUP_BY_PATTERN = "^(lineno|filename|traceback)$"
+
+
+class CpuProfileRequest(BaseModel):
+    seconds: Optional[float] = Field(None, gt=0, le=profiling.MAX_PROFILE_SECONDS)
+    requests: Optional[int] = Field(None, gt=0)
+    interval_ms: float = Field(5.0, ge=1, le=1000)
+
+
+def _finished_profile() -> profiling.CpuProfile:
+    profile = profiling.current_cpu_profile()
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma captura de CPU foi feita.")
+    if profile.running:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A captura de CPU ainda está em andamento.")
+    return profile
+
+
+def _snapshot_or_404(snapshot_id: int):
+    snapshot = profiling.get_snapshot(snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Snapshot {snapshot_id} não encontrado.")
+    return snapshot
+
+
+def _download(content: bytes, filename: str, media_type: str = "application/octet-stream") -> Response:
+    return Response(content=content, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# --- CPU ---
+
+@router.post("/cpu", status_code=status.HTTP_202_ACCEPTED)
+def start_cpu_profile(request: CpuProfileRequest):
+    """
+    Inicia uma captura por amostragem dos próximos `seconds` segundos ou das
+    próximas `requests` requisições (o que vier primeiro). Sem nenhum dos dois,
+    roda até /cpu/stop ou até o limite de PROFILING_MAX_SECONDS.
+    """
+    try:
+        profile = profiling.start_cpu_profile(request.interval_ms, request.seconds, request.requests)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return profile.status()
+
+
+@router.get("/cpu")
+def read_cpu_profile():
+    """Andamento da captura atual (ou da última)."""
+    profile = profiling.current_cpu_profile()
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma captura de CPU foi feita.")
+    return profile.status()
+
+
+@router.post("/cpu/stop")
+def stop_cpu_profile():
+    profile = profiling.current_cpu_profile()
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma captura de CPU foi feita.")
+    profile.stop()
+    return profile.status()
+
+
+@router.get("/cpu/collapsed", response_class=PlainTextResponse)
+def download_cpu_collapsed():
+    """Pilhas no formato collapsed (flamegraph.pl, speedscope)."""
+    return _download(_finished_profile().collapsed().encode("utf-8"), "cpu.collapsed", "text/plain; charset=utf-8")
+
+
+@router.get("/cpu/pstats")
+def download_cpu_pstats():
+    """Arquivo .prof para `python -m pstats` ou snakeviz."""
+    return _download(_finished_profile().pstats_bytes(), "cpu.prof")
+
+
+# --- MEMÓRIA ---
+
+@router.post("/memory/snapshots", status_code=status.HTTP_201_CREATED)
+def create_memory_snapshot(frames: int = Query(1, ge=1, le=50), limit: int = Query(20, ge=1, le=500)):
+    """
+    Tira um snapshot do tracemalloc (ligando-o no primeiro, com `frames` níveis
+    de pilha) e devolve os maiores alocadores.
+    """
+    info = profiling.take_snapshot(frames)
+    return {**info, "top": profiling.top_allocators(profiling.get_snapshot(info["id"]), limit=limit)}
+
+
+@router.get("/memory/snapshots")
+def list_memory_snapshots():
+    return profiling.list_snapshots()
+
+
+@router.get("/memory/snapshots/{snapshot_id}")
+def read_memory_snapshot(snapshot_id: int, group_by: str = Query("lineno", pattern=GROUP_BY_PATTERN),
+                         limit: int = Query(20, ge=1, le=500)):
+    return profiling.top_allocators(_snapshot_or_404(snapshot_id), group_by, limit)
+
+
+@router.get("/memory/snapshots/{snapshot_id}/download")
+def download_memory_snapshot(snapshot_id: int):
+    """Snapshot bruto, carregável com tracemalloc.Snapshot.load."""
+    return _download(profiling.dump_snapshot(_snapshot_or_404(snapshot_id)), f"snapshot-{snapshot_id}.tracemalloc")
+
+
+@router.get("/memory/diff")
+def diff_memory_snapshots(base: int, current: int, group_by: str = Query("lineno", pattern=GROUP_BY_PATTERN),
+                          limit: int = Query(20, ge=1, le=500)):
+    """O que cresceu (ou diminuiu) entre os snapshots `base` e `current`."""
+    return profiling.diff_snapshots(_snapshot_or_404(base), _snapshot_or_404(current), group_by, limit)
+
+
+@router.delete("/memory", status_code=status.HTTP_204_NO_CONTENT)
+def stop_memory_tracing():
+    """Desliga o tracemalloc e descarta os snapshots."""
+    profiling.stop_tracing()
+
+
+@router.get("/memory/caches")
+def read_cache_memory(top: int = Query(5, ge=0, le=100)):
+    """Memória aproximada de cada cache em memória e do processo."""
+    return {"process": profiling.process_memory(), "caches": profiling.cache_memory(top)}
@@ -8,6 +8,9 @@ from services import zabbix_service, report_service
 import time
 from typing import Optional, List
 from collections import defaultdict
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
@@ -67,6 +70,5 @@ async def generate_comprehensive_report(
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        # Para debug, é útil logar o erro completo no servidor
-        print(f"Erro inesperado em generate_comprehensive_report: {e}")
+        logger.exception("Erro inesperado em generate_comprehensive_report")
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {e}")
\ No newline at end of file
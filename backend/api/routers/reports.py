@@ -39,13 +39,12 @@ async def generate_comprehensive_report(
 
     # 3. Se a verificação passar, a lógica de negócio continua
     try:
-        report_service = ReportService()
+        report_service = ReportService(db)
         report_result = report_service.generate_comprehensive_report(
             empresa_id=request.empresa_id,
             user_query=request.user_query,
             host_id=request.host_id,
-            period=request.period,
-            db=db
+            period=request.period
         )
         return report_result
 
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from api.empresas import get_db
+from api.zabbix import get_zabbix_credentials
+from services import zabbix_service, sla_service, incident_service
+from utils.security import require_empresa_access
+import time
+
+router = APIRouter(prefix="/sla", tags=["SLA"])
+
+@router.get("/availability/{empresa_id}")
+def read_availability(
+    empresa_id: int,
+    db: Session = Depends(get_db),
+    month: Optional[str] = Query(None, regex=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    time_from: Optional[int] = None,
+    time_till: Optional[int] = None,
+    hostids: Optional[List[str]] = Query(None),
+    min_severity: int = Query(sla_service.DEFAULT_MIN_SEVERITY, ge=0, le=5),
+    sla_target: float = Query(sla_service.DEFAULT_SLA_TARGET, gt=0, le=100),
+    top: int = Query(10, ge=1, le=100),
+    user_with_access = Depends(require_empresa_access)
+):
+    """
+    Disponibilidade por host e por grupo. Informe 'month' (AAAA-MM) para o mês
+    fechado ou 'time_from'/'time_till'; sem parâmetros, considera os últimos 30 dias.
+    """
+    if month is not None:
+        time_from, time_till = sla_service.month_bounds(month)
+    else:
+        if time_till is None: time_till = int(time.time())
+        if time_from is None: time_from = time_till - (30 * 24 * 60 * 60)
+    if time_from >= time_till:
+        raise HTTPException(status_code=400, detail="time_from deve ser anterior a time_till")
+
+    try:
+        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
+        return sla_service.compute_sla(
+            api_url=api_url, token=token_zabbix, time_from=time_from, time_till=time_till,
+            hostids=hostids, min_severity=min_severity, sla_target=sla_target, top=top
+        )
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/incidents/{empresa_id}")
+def read_incident_stats(
+    empresa_id: int,
+    db: Session = Depends(get_db),
+    time_from: Optional[int] = None,
+    time_till: Optional[int] = None,
+    hostids: Optional[List[str]] = Query(None),
+    min_severity: int = Query(0, ge=0, le=5),
+    top: int = Query(incident_service.DEFAULT_TOP, ge=1, le=200),
+    user_with_access = Depends(require_empresa_access)
+):
+    """
+    MTTR, MTBF, contagem de incidentes e percentis de duração por host, trigger
+    e severidade. Sem parâmetros de tempo, considera os últimos 7 dias.
+    """
+    if time_till is None: time_till = int(time.time())
+    if time_from is None: time_from = time_till - (7 * 24 * 60 * 60)
+    if time_from >= time_till:
+        raise HTTPException(status_code=400, detail="time_from deve ser anterior a time_till")
+
+    try:
+        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
+        return incident_service.compute_incident_stats(
+            api_url=api_url, token=token_zabbix, time_from=time_from, time_till=time_till,
+            hostids=hostids, min_severity=min_severity, top=top
+        )
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from api.empresas import get_db
+from api.zabbix import get_zabbix_credentials
+from services import zabbix_service, trend_service
+from utils.security import require_empresa_access
+
+router = APIRouter(prefix="/trends", tags=["Trends"])
+
+@router.get("/capacity/{empresa_id}")
+def read_capacity_forecast(
+    empresa_id: int,
+    db: Session = Depends(get_db),
+    days: int = Query(trend_service.DEFAULT_DAYS, ge=2, le=180),
+    threshold: float = Query(trend_service.DEFAULT_THRESHOLD, gt=0, le=100),
+    metric: Optional[List[str]] = Query(None),
+    method: str = Query("huber", regex="^(huber|ols)$"),
+    horizon_days: int = Query(trend_service.DEFAULT_HORIZON_DAYS, ge=1, le=3650),
+    limit: int = Query(50, ge=1, le=500),
+    user_with_access = Depends(require_empresa_access)
+):
+    """
+    Previsão de "dias até encher" (disco, memória e CPU) a partir das tendências
+    horárias dos últimos 'days' dias, ordenada por urgência.
+    """
+    if metric and not set(metric) <= {"disk", "memory", "cpu"}:
+        raise HTTPException(status_code=400, detail="metric deve ser 'disk', 'memory' ou 'cpu'")
+    try:
+        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
+        return trend_service.forecast_capacity(
+            api_url=api_url, token=token_zabbix, days=days, threshold=threshold,
+            metrics=metric, method=method, horizon_days=horizon_days, limit=limit
+        )
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 # --- CORREÇÃO AQUI ---
 from typing import List, Optional 
 from api.empresas import get_db
 from crud.empresa import get_empresa_by_id
-from utils.security import descriptografar_token, require_empresa_access, TokenData
-from services import zabbix_service
+from database.connection import SessionLocal
+from utils.security import descriptografar_token, get_current_user, require_empresa_access, TokenData
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from services import zabbix_service, pdf_service, export_service, live_updates, anomaly_service, correlation_service
+from utils.cache import etag_json_response
+import asyncio
+import os
 import time
 
 router = APIRouter(prefix="/zabbix", tags=["Zabbix"])
@@ -17,26 +23,60 @@ def get_zabbix_credentials(empresa_id: int, db: Session):
     token_zabbix = descriptografar_token(db_empresa.token_zabbix_criptografado)
     return db_empresa.url_zabbix, token_zabbix
 
+def _credentials_producer(empresa_id: int, db: Session, fetch):
+    """Adia a busca de credenciais (consulta + decrypt Fernet) para quando o cache de resposta falhar."""
+    def producer():
+        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
+        return fetch(api_url, token_zabbix)
+    return producer
+
+def streaming_credentials(empresa_id: int, current_user: TokenData = Depends(get_current_user)):
+    """
+    Controle de acesso e credenciais do Zabbix para rotas de streaming, numa
+    sessão curta fechada antes da resposta. Com get_db a conexão ficaria fora do
+    pool (pool_size=5) durante todo o download ou stream.
+    """
+    db = SessionLocal()
+    try:
+        require_empresa_access(empresa_id, db, current_user)
+        return get_zabbix_credentials(empresa_id, db)
+    finally:
+        db.close()
+
 @router.get("/hosts/{empresa_id}")
-def read_zabbix_hosts(empresa_id: int, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+def read_zabbix_hosts(request: Request, empresa_id: int, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+    try:
+        return etag_json_response(request, f"hosts:{empresa_id}", 300, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_zabbix_hosts(api_url=url, token=tk)))
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/hosts/search/{empresa_id}")
+def search_zabbix_hosts(
+    empresa_id: int,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user_with_access = Depends(require_empresa_access)
+):
+    """Busca ranqueada (prefixo e aproximada) por nome, IP, grupos e tags dos hosts."""
     try:
         api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_zabbix_hosts(api_url=api_url, token=token_zabbix)
+        return zabbix_service.search_hosts(api_url=api_url, token=token_zabbix, query=q, limit=limit)
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/history/aggregated/{empresa_id}")
 def read_aggregated_history(
+    request: Request,
     empresa_id: int,
     period: str = Query("24h", regex="^(24h|7d|30d)$"),
     db: Session = Depends(get_db),
     user_with_access = Depends(require_empresa_access)
 ):
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_aggregated_history(
-            api_url=api_url, token=token_zabbix, period=period
-        )
+        return etag_json_response(request, f"history:{empresa_id}:{period}", 60, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_aggregated_history(api_url=url, token=tk, period=period)))
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -44,13 +84,14 @@ def read_aggregated_history(
 
 @router.get("/metrics/top_consumers/{empresa_id}")
 def read_top_consumers(
+    request: Request,
     empresa_id: int,
     db: Session = Depends(get_db),
     user_with_access = Depends(require_empresa_access)
 ):
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_top_consumers(api_url=api_url, token=token_zabbix)
+        return etag_json_response(request, f"top_consumers:{empresa_id}", 60, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_top_consumers(api_url=url, token=tk)))
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -58,52 +99,108 @@ def read_top_consumers(
 
 @router.get("/context/full/{empresa_id}")
 def read_full_context(
+    request: Request,
     empresa_id: int,
     db: Session = Depends(get_db),
     user_with_access = Depends(require_empresa_access)
 ):
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_full_zabbix_context(api_url=api_url, token=token_zabbix)
+        return etag_json_response(request, f"context:{empresa_id}", 30, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_full_zabbix_context(api_url=url, token=tk)))
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {e}")
                         
 @router.get("/metrics/key_metrics/{empresa_id}/{host_id}")
-def read_key_metrics(empresa_id: int, host_id: str, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+def read_key_metrics(request: Request, empresa_id: int, host_id: str, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+    try:
+        return etag_json_response(request, f"key_metrics:{empresa_id}:{host_id}", 10, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_key_metrics(api_url=url, token=tk, host_id=host_id)))
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics/anomalies/{empresa_id}")
+def read_metric_anomalies(
+    empresa_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    user_with_access = Depends(require_empresa_access)
+):
+    """
+    Séries de CPU, memória e rede fora do padrão do próprio host (z-score sobre
+    EWMA), mais o histórico recente de anomalias detectadas.
+    """
     try:
         api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_key_metrics(api_url=api_url, token=token_zabbix, host_id=host_id)
+        return anomaly_service.get_anomalies(api_url=api_url, token=token_zabbix, limit=limit)
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/alerts/critical/{empresa_id}")
-def read_critical_alerts(empresa_id: int, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+def read_critical_alerts(request: Request, empresa_id: int, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_active_triggers(api_url=api_url, token=token_zabbix)
+        return etag_json_response(request, f"active_triggers:{empresa_id}", 30, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_active_triggers(api_url=url, token=tk)))
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/triggers/host/{empresa_id}/{host_id}")
-def read_host_triggers(empresa_id: int, host_id: str, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+def read_host_triggers(request: Request, empresa_id: int, host_id: str, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
     """Retorna triggers ativos e inativos de um host específico"""
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_host_triggers(api_url=api_url, token=token_zabbix, host_id=host_id)
+        return etag_json_response(request, f"host_triggers:{empresa_id}:{host_id}", 15, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_host_triggers(api_url=url, token=tk, host_id=host_id)))
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/host/info/{empresa_id}/{host_id}")
-def read_host_info(empresa_id: int, host_id: str, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
+def read_host_info(request: Request, empresa_id: int, host_id: str, db: Session = Depends(get_db), user_with_access = Depends(require_empresa_access)):
     """Retorna informações do sistema do host"""
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_host_system_info(api_url=api_url, token=token_zabbix, host_id=host_id)
+        return etag_json_response(request, f"host_info:{empresa_id}:{host_id}", 3600, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_host_system_info(api_url=url, token=tk, host_id=host_id)))
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/live/{empresa_id}")
+async def stream_live_updates(
+    request: Request,
+    empresa_id: int,
+    topic: str = Query("triggers", regex="^(triggers|key_metrics|host_triggers)$"),
+    host_id: Optional[str] = Query(None),
+    credentials = Depends(streaming_credentials)
+):
+    """
+    Server-Sent Events com snapshot inicial e diffs de triggers ativos, das
+    métricas-chave ou dos triggers de um host. Um único poller por (empresa,
+    tópico, host) atende todos os inscritos. A sessão de banco é fechada antes
+    do stream começar (streaming_credentials).
+    """
+    if topic in live_updates.HOST_TOPICS and not host_id:
+        raise HTTPException(status_code=422, detail=f"O tópico '{topic}' exige o parâmetro host_id.")
+
+    api_url, token_zabbix = credentials
+    channel_host = host_id if topic in live_updates.HOST_TOPICS else None
+    queue = live_updates.hub.subscribe(empresa_id, topic, channel_host, lambda: (api_url, token_zabbix))
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                    yield live_updates.format_sse(message)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            live_updates.hub.unsubscribe(empresa_id, topic, channel_host, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/alerts/history/{empresa_id}")
 def read_alert_history(
     empresa_id: int,
@@ -126,6 +223,37 @@ def read_alert_history(
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/alerts/storms/{empresa_id}")
+def read_alert_storms(
+    empresa_id: int,
+    db: Session = Depends(get_db),
+    source: str = Query("active", regex="^(active|history)$"),
+    time_from: Optional[int] = None,
+    time_till: Optional[int] = None,
+    hostids: Optional[List[str]] = Query(None),
+    window: int = Query(correlation_service.DEFAULT_WINDOW_SECONDS, ge=60, le=24 * 60 * 60),
+    max_groups: int = Query(correlation_service.DEFAULT_MAX_GROUPS, ge=1, le=500),
+    user_with_access = Depends(require_empresa_access)
+):
+    """
+    Alertas ativos (source=active) ou do histórico (source=history) agrupados em
+    tempestades: problemas equivalentes e próximos no tempo viram um só grupo.
+    """
+    try:
+        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
+        if source == "active":
+            alerts = zabbix_service.get_active_triggers(api_url, token_zabbix)
+        else:
+            if time_till is None: time_till = int(time.time())
+            if time_from is None: time_from = time_till - (24 * 60 * 60)
+            alerts = zabbix_service.get_alert_history(
+                api_url=api_url, token=token_zabbix,
+                time_from=time_from, time_till=time_till, hostids=hostids
+            )
+        return correlation_service.compress_alerts(alerts, window_seconds=window, max_groups=max_groups)
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/events/log/{empresa_id}")
 def read_event_log(
     empresa_id: int,
@@ -133,6 +261,7 @@ def read_event_log(
     time_from: Optional[int] = None,
     time_till: Optional[int] = None,
     hostids: Optional[List[str]] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
     user_with_access = Depends(require_empresa_access)
 ):
     try:
@@ -142,30 +271,43 @@ def read_event_log(
         
         return zabbix_service.get_event_log(
             api_url=api_url, token=token_zabbix,
-            time_from=time_from, time_till=time_till, hostids=hostids
+            time_from=time_from, time_till=time_till, hostids=hostids, limit=limit
         )
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/inventory/{empresa_id}")
-def read_inventory(
+@router.get("/events/log/{empresa_id}/page")
+def read_event_log_page(
     empresa_id: int,
-    filter: Optional[str] = Query(None),
-    includeHeavy: bool = Query(False),
     db: Session = Depends(get_db),
+    time_from: Optional[int] = None,
+    time_till: Optional[int] = None,
+    hostids: Optional[List[str]] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, regex=r"^\d+$"),
+    since: Optional[str] = Query(None, regex=r"^\d+$"),
     user_with_access = Depends(require_empresa_access)
 ):
+    """
+    Log de eventos paginado por eventid. Use 'cursor' (next_cursor) para páginas
+    mais antigas ou 'since' (latest_cursor) para buscar apenas eventos novos.
+    """
     try:
         api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_company_inventory(
-            api_url=api_url, token=token_zabbix, filter_text=filter, include_heavy=includeHeavy
+        if time_till is None: time_till = int(time.time())
+        if time_from is None: time_from = time_till - (24 * 60 * 60)
+
+        return zabbix_service.get_event_log_page(
+            api_url=api_url, token=token_zabbix,
+            time_from=time_from, time_till=time_till, hostids=hostids,
+            limit=limit, cursor=cursor, since=since
         )
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-
 @router.get("/inventory/{empresa_id}")
 def read_inventory(
+    request: Request,
     empresa_id: int,
     filter: Optional[str] = Query(None),
     includeHeavy: bool = Query(False),
@@ -173,89 +315,106 @@ def read_inventory(
     user_with_access = Depends(require_empresa_access)
 ):
     try:
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        return zabbix_service.get_company_inventory(
-            api_url=api_url, token=token_zabbix, filter_text=filter, include_heavy=includeHeavy
-        )
+        return etag_json_response(request, f"inventory:{empresa_id}:{includeHeavy}:{filter or ''}", 60, _credentials_producer(
+            empresa_id, db, lambda url, tk: zabbix_service.get_company_inventory(
+                api_url=url, token=tk, filter_text=filter, include_heavy=includeHeavy)))
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _export_response(rows, export_format: str, columns: List[str], filename: str):
+    body = export_service.prime(export_service.serialize(rows, export_format, columns))
+    return StreamingResponse(
+        body,
+        media_type=export_service.EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"}
+    )
+
+@router.get("/export/inventory/{empresa_id}")
+def export_inventory(
+    empresa_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    filter: Optional[str] = Query(None),
+    credentials = Depends(streaming_credentials)
+):
+    """Exporta o inventário linha a linha em NDJSON ou CSV."""
+    try:
+        api_url, token_zabbix = credentials
+        rows = export_service.iter_inventory_rows(api_url, token_zabbix, filter_text=filter)
+        return _export_response(rows, format, export_service.INVENTORY_COLUMNS, "inventario-hosts")
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export/events/{empresa_id}")
+def export_event_log(
+    empresa_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    time_from: Optional[int] = None,
+    time_till: Optional[int] = None,
+    hostids: Optional[List[str]] = Query(None),
+    credentials = Depends(streaming_credentials)
+):
+    """Exporta o log de eventos de qualquer intervalo, paginando o Zabbix por eventid."""
+    try:
+        api_url, token_zabbix = credentials
+        if time_till is None: time_till = int(time.time())
+        if time_from is None: time_from = time_till - (24 * 60 * 60)
+
+        rows = export_service.iter_event_rows(api_url, token_zabbix, time_from, time_till, hostids=hostids)
+        return _export_response(rows, format, export_service.EVENT_COLUMNS, "eventos")
+    except zabbix_service.ZabbixAPIException as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export/alerts/{empresa_id}")
+def export_alert_history(
+    empresa_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    time_from: Optional[int] = None,
+    time_till: Optional[int] = None,
+    hostids: Optional[List[str]] = Query(None),
+    credentials = Depends(streaming_credentials)
+):
+    """Exporta o histórico de alertas de qualquer intervalo, página a página."""
+    try:
+        api_url, token_zabbix = credentials
+        if time_till is None: time_till = int(time.time())
+        if time_from is None: time_from = time_till - (24 * 60 * 60)
+
+        rows = export_service.iter_alert_rows(api_url, token_zabbix, time_from, time_till, hostids=hostids)
+        return _export_response(rows, format, export_service.ALERT_COLUMNS, "historico-alertas")
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/inventory/{empresa_id}/pdf")
-def download_inventory_pdf(
+async def download_inventory_pdf(
     empresa_id: int,
     filter: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    user_with_access = Depends(require_empresa_access)
+    credentials = Depends(streaming_credentials)
 ):
     """
     Gera um PDF do inventário de hosts e retorna como download.
+    A renderização roda no pool de processos do pdf_service, sem travar o event loop.
     """
     try:
-        from io import BytesIO
-        from reportlab.lib.pagesizes import A4, landscape
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet
+        api_url, token_zabbix = credentials
+        data = await run_in_threadpool(
+            zabbix_service.get_company_inventory,
+            api_url=api_url, token=token_zabbix, filter_text=filter, include_heavy=True  # Heavy para o PDF
+        )
 
-        api_url, token_zabbix = get_zabbix_credentials(empresa_id, db)
-        data = zabbix_service.get_company_inventory(api_url=api_url, token=token_zabbix, filter_text=filter, include_heavy=True) # Heavy para o PDF
-
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=20)
-        elements = []
-        styles = getSampleStyleSheet()
-
-        title = Paragraph(f"Inventário de Hosts - Empresa ID: {empresa_id}", styles['Title'])
-        elements.append(title)
-        elements.append(Spacer(1, 12))
-
-        headers = [
-            # --- CORREÇÃO AQUI: Adicionando as colunas que faltavam ---
-            "Host", "Nome", "Status", "IP(s)", "Grupos", "Templates", 
-            "OS", "Modelo", "Vendor", "Localização", "Responsável"
-        ]
-        rows = [headers]
-        for r in data:
-            ips = ", ".join([i.get('ip') for i in (r.get('interfaces') or []) if i.get('ip')])
-            groups = "; ".join(r.get('groups', []))
-            templates = "; ".join(r.get('templates', []))
-            inv = r.get('inventory') or {}
-            row = [
-                r.get('host', ''),
-                r.get('name', ''),
-                'Habilitado' if int(r.get('status', 1)) == 0 else 'Desabilitado',
-                ips,
-                groups,
-                templates,
-                inv.get('os_full', ''),
-                inv.get('model', ''),
-                inv.get('vendor', ''),
-                # --- CORREÇÃO AQUI: Adicionando os dados das novas colunas ---
-                inv.get('location', ''),
-                inv.get('contact', '')
-            ]
-            rows.append(row)
-
-        table = Table(rows, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 8),
-            ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ]))
-        elements.append(table)
-
-        doc.build(elements)
-        buffer.seek(0)
-        
-        from fastapi.responses import StreamingResponse
-        return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=inventario-hosts.pdf"})
+        pdf_file = await pdf_service.open_inventory_pdf(empresa_id, data)
+
+        return StreamingResponse(
+            pdf_service.iter_file(pdf_file),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": "attachment; filename=inventario-hosts.pdf",
+                "Content-Length": str(os.fstat(pdf_file.fileno()).st_size),
+            }
+        )
 
     except zabbix_service.ZabbixAPIException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except ImportError:
         raise HTTPException(status_code=500, detail="A biblioteca 'reportlab' não está instalada no servidor.")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro interno do servidor ao gerar PDF: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro interno do servidor ao gerar PDF: {e}")
@@ -0,0 +1,348 @@
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- FROTA DETERMINÍSTICA A PARTIR DAS FIXTURES ---
+# items.json e triggers.json são dumps reais da API do Zabbix para um host.
+# Eles servem de modelo: cada host da frota recebe uma cópia dos itens e
+# triggers, com ids próprios e valores derivados de um hash de (semente, host,
+# item), então o mesmo (hosts, seed) gera sempre os mesmos dados, em qualquer
+# ordem de consulta. Itens e triggers são materializados sob demanda (só os
+# que uma consulta pede), para que frotas grandes caibam em memória; apenas
+# os eventos são gerados na construção, em tuplas compactas.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ITEMS_FIXTURE = os.path.join(BACKEND_DIR, "items.json")
+TRIGGERS_FIXTURE = os.path.join(BACKEND_DIR, "triggers.json")
+
+HOSTID_BASE = 20000
+ITEMID_BASE = 1_000_000
+TRIGGERID_BASE = 50_000_000
+EVENTID_BASE = 100_000_000
+ITEM_STRIDE = 1000  # Máximo de itens por host (o id do item codifica o host)
+TRIGGER_STRIDE = 1000
+
+# Campos dos itens e triggers das fixtures mantidos nos registros servidos
+ITEM_FIELDS = (
+    "itemid", "type", "hostid", "name", "key_", "delay", "history", "trends", "status", "value_type",
+    "units", "description", "flags", "state", "error", "lastclock", "lastns", "lastvalue", "prevvalue",
+)
+TRIGGER_FIELDS = (
+    "triggerid", "expression", "description", "url", "status", "value", "priority", "lastchange",
+    "comments", "error", "templateid", "type", "state", "flags", "recovery_mode", "opdata", "event_name",
+)
+
+HOST_GROUPS = ("Linux servers", "Databases", "Web servers", "Infraestrutura", "Aplicações")
+ENVIRONMENTS = ("prod", "hml", "dev")
+
+_MASK64 = (1 << 64) - 1
+
+
+def _load_fixture(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fixture:
+        return json.load(fixture)
+
+
+def _clone_templates(templates: List[Dict[str, Any]], token: str, replacement: str) -> List[Dict[str, Any]]:
+    """Cópias dos modelos que mencionam `token` (uma partição ou interface), trocando-o por `replacement`."""
+    clones = []
+    for template in templates:
+        if any(isinstance(v, str) and token in v for v in template.values()):
+            clones.append({k: v.replace(token, replacement) if isinstance(v, str) else v for k, v in template.items()})
+    return clones
+
+
+def expand_templates(items: List[Dict[str, Any]], triggers: List[Dict[str, Any]], extra_partitions: int = 0,
+                     extra_interfaces: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Aumenta o número de itens e triggers por host clonando os da partição
+    /dados e da interface ens4 das fixtures (/dados2, /dados3, ...; ens5,
+    ens6, ...). Com as fixtures, cada partição extra soma 7 itens e cada
+    interface 9: 1 partição e 1 interface dão 101 itens por host, ou seja,
+    ~1M de itens numa frota de 10k hosts.
+    """
+    expanded_items, expanded_triggers = list(items), list(triggers)
+    for n in range(extra_partitions):
+        expanded_items += _clone_templates(items, "/dados", f"/dados{n + 2}")
+        expanded_triggers += _clone_templates(triggers, "/dados", f"/dados{n + 2}")
+    for n in range(extra_interfaces):
+        expanded_items += _clone_templates(items, "ens4", f"ens{n + 5}")
+        expanded_triggers += _clone_templates(triggers, "ens4", f"ens{n + 5}")
+    return expanded_items, expanded_triggers
+
+
+def unit_hash(*values: int) -> float:
+    """Número em [0, 1) derivado deterministicamente dos inteiros dados (splitmix64)."""
+    h = 0x9E3779B97F4A7C15
+    for value in values:
+        h = (h ^ (value & _MASK64)) * 0xBF58476D1CE4E5B9 & _MASK64
+        h ^= h >> 31
+        h = h * 0x94D049BB133111EB & _MASK64
+        h ^= h >> 29
+    return h / 2.0 ** 64
+
+
+class Dataset:
+    """
+    Frota sintética de `hosts` hosts, todos com os itens e triggers das
+    fixtures. `now` fixa o relógio (padrão: hora cheia atual) e `days` é a
+    janela de eventos gerados. `extra_partitions`/`extra_interfaces` aumentam
+    os itens por host (ver expand_templates).
+    """
+
+    def __init__(self, hosts: int = 10, seed: int = 1, now: int = None, days: int = 7,
+                 problem_ratio: float = 0.03, incidents_per_trigger_day: float = 0.05,
+                 item_templates: List[Dict[str, Any]] = None, trigger_templates: List[Dict[str, Any]] = None,
+                 extra_partitions: int = 0, extra_interfaces: int = 0):
+        self.host_count = hosts
+        self.seed = seed
+        self.now = now if now is not None else int(time.time() // 3600 * 3600)
+        self.days = days
+        self.problem_ratio = problem_ratio
+        self.incidents_per_trigger_day = incidents_per_trigger_day
+
+        items = item_templates if item_templates is not None else _load_fixture(ITEMS_FIXTURE)
+        triggers = trigger_templates if trigger_templates is not None else _load_fixture(TRIGGERS_FIXTURE)
+        items, triggers = expand_templates(items, triggers, extra_partitions, extra_interfaces)
+        if len(items) > ITEM_STRIDE or len(triggers) > TRIGGER_STRIDE:
+            raise ValueError("Modelo com mais itens ou triggers por host do que o suportado")
+        self.item_templates = [{k: item.get(k, "") for k in ITEM_FIELDS} for item in items]
+        self.trigger_templates = [{k: trigger.get(k, "") for k in TRIGGER_FIELDS} for trigger in triggers]
+        self._template_partitions = self._partition_index()
+
+        self.hosts = [self._make_host(i) for i in range(hosts)]
+        self.hosts_by_id = {h["hostid"]: i for i, h in enumerate(self.hosts)}
+
+        # Triggers em problema: (host, índice do trigger) -> lastchange
+        self.open_triggers: Dict[Tuple[int, int], int] = {}
+        for host_idx in range(hosts):
+            for trig_idx in range(len(self.trigger_templates)):
+                if unit_hash(seed, 2, host_idx, trig_idx) < problem_ratio:
+                    age = 60 + int(unit_hash(seed, 3, host_idx, trig_idx) * 3 * 86400)
+                    self.open_triggers[(host_idx, trig_idx)] = self.now - age
+        self._build_events()
+
+    # --- HOSTS ---
+
+    def _make_host(self, i: int) -> Dict[str, Any]:
+        hostid = str(HOSTID_BASE + i)
+        name = f"srv-{i:05d}"
+        group = HOST_GROUPS[int(unit_hash(self.seed, 10, i) * len(HOST_GROUPS))]
+        env = ENVIRONMENTS[int(unit_hash(self.seed, 11, i) * len(ENVIRONMENTS))]
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        return {
+            "hostid": hostid,
+            "host": name,
+            "name": name,
+            "status": "0",
+            "available": "1",
+            "description": f"Servidor sintético {i} ({group})",
+            "interfaces": [{"ip": ip, "dns": f"{name}.bench.local"}],
+            "groups": [{"groupid": str(100 + HOST_GROUPS.index(group)), "name": group}],
+            "tags": [{"tag": "env", "value": env}, {"tag": "role", "value": group.split()[0].lower()}],
+            "parentTemplates": [{"templateid": "10001", "name": "Linux by Zabbix agent"}],
+            "inventory": {
+                "os": "Linux", "os_full": "Linux version 6.1.0-40-cloud-amd64", "os_short": "Debian",
+                "os_version": "12", "host_networks": ip,
+            },
+        }
+
+    def host_index(self, hostid: Any) -> Optional[int]:
+        return self.hosts_by_id.get(str(hostid))
+
+    # --- ITENS ---
+
+    def _partition_index(self) -> Dict[int, int]:
+        """Índice da partição (0, 1, ...) de cada item de disco do modelo, para variar o uso por partição."""
+        partitions: Dict[str, int] = {}
+        result = {}
+        for idx, item in enumerate(self.item_templates):
+            key = item["key_"]
+            if key.startswith("vfs.fs.") and "[" in key:
+                partition = key[key.index("[") + 1:].split(",")[0]
+                result[idx] = partitions.setdefault(partition, len(partitions))
+        return result
+
+    def _host_load(self, host_idx: int) -> Tuple[float, float]:
+        """CPU e memória (%) do host: a maioria folgada, alguns poucos quentes."""
+        cpu = 2.0 + 93.0 * unit_hash(self.seed, 20, host_idx) ** 3
+        memory = 15.0 + 80.0 * unit_hash(self.seed, 21, host_idx) ** 2
+        return cpu, memory
+
+    def _disk_pused(self, host_idx: int, partition: int) -> float:
+        return 3.0 + 94.0 * unit_hash(self.seed, 22, host_idx, partition) ** 2
+
+    def item_lastvalue(self, host_idx: int, tmpl_idx: int) -> str:
+        template = self.item_templates[tmpl_idx]
+        key = template["key_"]
+        cpu, memory = self._host_load(host_idx)
+        r = unit_hash(self.seed, 23, host_idx, tmpl_idx)
+
+        if key == "system.cpu.util":
+            return f"{cpu:.6f}"
+        if key.startswith("system.cpu.util[,"):
+            share = {"user": 0.8, "system": 0.15, "iowait": 0.03, "idle": None}.get(key[len("system.cpu.util[,"):-1], 0.005)
+            return f"{(100 - cpu) if share is None else cpu * share:.6f}"
+        if key == "vm.memory.utilization":
+            return f"{memory:.6f}"
+        if key == "vm.memory.size[pavailable]":
+            return f"{100 - memory:.6f}"
+        if tmpl_idx in self._template_partitions and key.endswith(",pused]"):
+            return f"{self._disk_pused(host_idx, self._template_partitions[tmpl_idx]):.6f}"
+        if key in ("agent.hostname", "system.hostname"):
+            return self.hosts[host_idx]["host"]
+
+        value = template["lastvalue"]
+        if template["value_type"] in ("0", "3") and value not in ("", None):
+            try:
+                number = float(value)
+            except ValueError:
+                return value
+            scaled = number * (0.3 + 1.7 * r)
+            if template["units"] == "%":
+                scaled = min(100.0, scaled)
+            return str(int(scaled)) if template["value_type"] == "3" else f"{scaled:.6f}"
+        return value
+
+    def make_item(self, host_idx: int, tmpl_idx: int) -> Dict[str, Any]:
+        item = dict(self.item_templates[tmpl_idx])
+        item["itemid"] = str(ITEMID_BASE + host_idx * ITEM_STRIDE + tmpl_idx)
+        item["hostid"] = self.hosts[host_idx]["hostid"]
+        item["lastvalue"] = self.item_lastvalue(host_idx, tmpl_idx)
+        item["prevvalue"] = item["lastvalue"]
+        item["lastclock"] = str(self.now - int(unit_hash(self.seed, 24, host_idx, tmpl_idx) * 60))
+        item["lastns"] = "0"
+        return item
+
+    def locate_item(self, itemid: Any) -> Optional[Tuple[int, int]]:
+        offset = int(itemid) - ITEMID_BASE
+        host_idx, tmpl_idx = divmod(offset, ITEM_STRIDE)
+        if offset < 0 or host_idx >= self.host_count or tmpl_idx >= len(self.item_templates):
+            return None
+        return host_idx, tmpl_idx
+
+    def value_at(self, host_idx: int, tmpl_idx: int, clock: int) -> float:
+        """
+        Valor histórico de um item no instante `clock`: ciclo diário em torno
+        do último valor, ruído determinístico e, nos itens de disco, um
+        crescimento lento (para a previsão de capacidade ter o que medir).
+        """
+        try:
+            base = float(self.item_lastvalue(host_idx, tmpl_idx))
+        except ValueError:
+            return 0.0
+        template = self.item_templates[tmpl_idx]
+        phase = unit_hash(self.seed, 30, host_idx, tmpl_idx) * 2 * math.pi
+        noise = unit_hash(self.seed, 31, host_idx, tmpl_idx, clock) - 0.5
+        value = base * (1 + 0.15 * math.sin(2 * math.pi * clock / 86400 + phase) + 0.1 * noise)
+        if tmpl_idx in self._template_partitions and template["key_"].endswith(",pused]"):
+            growth_per_day = 0.4 * unit_hash(self.seed, 32, host_idx, tmpl_idx)
+            value = base - growth_per_day * (self.now - clock) / 86400 + 0.2 * noise
+        if template["units"] == "%":
+            value = min(100.0, max(0.0, value))
+        return max(0.0, value)
+
+    # --- TRIGGERS ---
+
+    def make_trigger(self, host_idx: int, trig_idx: int) -> Dict[str, Any]:
+        trigger = dict(self.trigger_templates[trig_idx])
+        trigger["triggerid"] = str(TRIGGERID_BASE + host_idx * TRIGGER_STRIDE + trig_idx)
+        opened_at = self.open_triggers.get((host_idx, trig_idx))
+        if opened_at is not None:
+            trigger["value"] = "1"
+            trigger["lastchange"] = str(opened_at)
+        else:
+            trigger["value"] = "0"
+            trigger["lastchange"] = str(self.now - 86400 - int(unit_hash(self.seed, 40, host_idx, trig_idx) * 30 * 86400))
+        return trigger
+
+    def locate_trigger(self, triggerid: Any) -> Optional[Tuple[int, int]]:
+        offset = int(triggerid) - TRIGGERID_BASE
+        host_idx, trig_idx = divmod(offset, TRIGGER_STRIDE)
+        if offset < 0 or host_idx >= self.host_count or trig_idx >= len(self.trigger_templates):
+            return None
+        return host_idx, trig_idx
+
+    def trigger_name(self, host_idx: int, trig_idx: int) -> str:
+        return expand_macros(self.trigger_templates[trig_idx]["description"], self.hosts[host_idx]["name"])
+
+    # --- EVENTOS ---
+
+    def _build_events(self):
+        """
+        Incidentes passados (problema + recuperação) e os abertos dos triggers
+        em problema. Guardados como tuplas, em ordem de eventid (= ordem de clock):
+        (eventid, clock, value, host_idx, trig_idx, r_eventid)
+        """
+        window = self.days * 86400
+        expected = self.incidents_per_trigger_day * self.days
+        raw = []  # (clock, value, host_idx, trig_idx, par)
+        for host_idx in range(self.host_count):
+            for trig_idx in range(len(self.trigger_templates)):
+                base = int(expected)
+                count = base + (1 if unit_hash(self.seed, 50, host_idx, trig_idx) < expected - base else 0)
+                for n in range(count):
+                    start = self.now - window + int(unit_hash(self.seed, 51, host_idx, trig_idx, n) * window)
+                    duration = 60 + int(-math.log(1 - unit_hash(self.seed, 52, host_idx, trig_idx, n)) * 1800)
+                    pair = len(raw)
+                    raw.append((start, 1, host_idx, trig_idx, pair))
+                    if start + duration < self.now:
+                        raw.append((start + duration, 0, host_idx, trig_idx, pair))
+        for (host_idx, trig_idx), opened_at in self.open_triggers.items():
+            raw.append((opened_at, 1, host_idx, trig_idx, len(raw)))
+
+        raw.sort(key=lambda e: (e[0], -e[1]))
+        recovery_of: Dict[int, int] = {}
+        eventids = []
+        for position, (clock, value, _h, _t, pair) in enumerate(raw):
+            eventid = EVENTID_BASE + position
+            eventids.append(eventid)
+            if value == 0:
+                recovery_of[pair] = eventid
+
+        self.events: List[Tuple[int, int, int, int, int, int]] = []
+        for eventid, (clock, value, host_idx, trig_idx, pair) in zip(eventids, raw):
+            r_eventid = recovery_of.get(pair, 0) if value == 1 else 0
+            self.events.append((eventid, clock, value, host_idx, trig_idx, r_eventid))
+        self.event_clocks = [e[1] for e in self.events]
+
+    def event_record(self, event: Tuple[int, int, int, int, int, int]) -> Dict[str, Any]:
+        eventid, clock, value, host_idx, trig_idx, r_eventid = event
+        severity = self.trigger_templates[trig_idx]["priority"] if value == 1 else "0"
+        return {
+            "eventid": str(eventid),
+            "source": "0",
+            "object": "0",
+            "objectid": str(TRIGGERID_BASE + host_idx * TRIGGER_STRIDE + trig_idx),
+            "clock": str(clock),
+            "ns": "0",
+            "value": str(value),
+            "acknowledged": "0",
+            "name": self.trigger_name(host_idx, trig_idx),
+            "severity": severity,
+            "r_eventid": str(r_eventid),
+        }
+
+    def locate_event(self, eventid: Any) -> Optional[Tuple[int, int, int, int, int, int]]:
+        position = int(eventid) - EVENTID_BASE
+        if 0 <= position < len(self.events):
+            return self.events[position]
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "hosts": self.host_count,
+            "items_per_host": len(self.item_templates),
+            "items": self.host_count * len(self.item_templates),
+            "triggers": self.host_count * len(self.trigger_templates),
+            "open_problems": len(self.open_triggers),
+            "events": len(self.events),
+            "seed": self.seed,
+            "now": self.now,
+        }
+
+
+def expand_macros(text: str, host_name: str) -> str:
+    return text.replace("{HOST.NAME}", host_name).replace("{HOST.HOST}", host_name)
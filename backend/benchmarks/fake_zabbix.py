@@ -0,0 +1,446 @@
+import argparse
+import json
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from benchmarks.dataset import Dataset, ITEMID_BASE, ITEM_STRIDE, TRIGGERID_BASE, TRIGGER_STRIDE, expand_macros
+
+# --- SERVIDOR JSON-RPC QUE IMITA O ZABBIX ---
+# Atende host.get, item.get, trigger.get, problem.get, event.get, history.get
+# e trend.get a partir de um Dataset, com a semântica de parâmetros que o
+# backend usa (output, filter, search/searchByAny, *ids, select*, sort,
+# limit, countOutput, time_from/time_till, eventid_from/eventid_till). Pode
+# rodar como servidor HTTP ou em processo, como transporte do zabbix_service.
+#
+#   python -m benchmarks.fake_zabbix --hosts 200 --latency-ms 20 --port 8090
+
+class ZabbixError(Exception):
+    def __init__(self, code: int, message: str, data: str = ""):
+        super().__init__(message)
+        self.code, self.message, self.data = code, message, data
+
+
+def _as_list(value) -> List[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _project(record: Dict[str, Any], output) -> Dict[str, Any]:
+    if output in (None, "extend"):
+        return dict(record)
+    return {field: record[field] for field in _as_list(output) if field in record}
+
+
+def _sort_key(field: str):
+    def key(record):
+        value = record.get(field, "")
+        try:
+            return (0, float(value), "")
+        except (TypeError, ValueError):
+            return (1, 0.0, str(value).lower())
+    return key
+
+
+def _sort(records: List[Dict[str, Any]], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    fields = _as_list(params.get("sortfield"))
+    orders = _as_list(params.get("sortorder")) or ["ASC"]
+    # Ordenação estável do último critério para o primeiro
+    for position in range(len(fields) - 1, -1, -1):
+        order = orders[position] if position < len(orders) else orders[-1]
+        records.sort(key=_sort_key(fields[position]), reverse=str(order).upper() == "DESC")
+    return records
+
+
+def _matcher(params: Dict[str, Any]) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    """Combina filter (igualdade) e search (substring, sem caixa) como o Zabbix."""
+    conditions = []
+    for field, values in (params.get("filter") or {}).items():
+        accepted = {str(v) for v in _as_list(values)}
+        conditions.append(lambda r, f=field, a=accepted: str(r.get(f, "")) in a)
+    start = bool(params.get("startSearch"))
+    for field, patterns in (params.get("search") or {}).items():
+        lowered = [str(p).lower().replace("*", "") for p in _as_list(patterns)]
+        if start:
+            conditions.append(lambda r, f=field, p=lowered: any(str(r.get(f, "")).lower().startswith(x) for x in p))
+        else:
+            conditions.append(lambda r, f=field, p=lowered: any(x in str(r.get(f, "")).lower() for x in p))
+    if not conditions:
+        return None
+    if params.get("searchByAny"):
+        return lambda r: any(c(r) for c in conditions)
+    return lambda r: all(c(r) for c in conditions)
+
+
+def _finish(records: List[Dict[str, Any]], params: Dict[str, Any]):
+    if params.get("countOutput"):
+        return str(len(records))
+    records = _sort(records, params)
+    limit = params.get("limit")
+    if limit:
+        records = records[:int(limit)]
+    return records
+
+
+class FakeZabbix:
+    """
+    Despachante JSON-RPC sobre um Dataset. `latency_ms` (+ `jitter_ms`
+    aleatório) simula o tempo de resposta do servidor; `history_step` é o
+    intervalo entre pontos do history.get, em segundos.
+    """
+
+    def __init__(self, dataset: Dataset, latency_ms: float = 0.0, jitter_ms: float = 0.0, history_step: int = 300):
+        self.dataset = dataset
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.history_step = history_step
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._methods = {
+            "apiinfo.version": lambda params: "6.0.42",
+            "host.get": self.host_get,
+            "item.get": self.item_get,
+            "trigger.get": self.trigger_get,
+            "problem.get": self.problem_get,
+            "event.get": self.event_get,
+            "history.get": self.history_get,
+            "trend.get": self.trend_get,
+        }
+
+    # --- DESPACHO ---
+
+    def handle(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = payload.get("id", 1)
+        method = payload.get("method")
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + random.random() * self.jitter_ms) / 1000.0)
+        try:
+            handler = self._methods.get(method)
+            if handler is None:
+                raise ZabbixError(-32601, "Method not found.", f'Incorrect API "{method}".')
+            result = handler(payload.get("params") or {})
+            return {"jsonrpc": "2.0", "result": result, "id": request_id}
+        except ZabbixError as e:
+            return {"jsonrpc": "2.0", "error": {"code": e.code, "message": e.message, "data": e.data}, "id": request_id}
+
+    def transport(self, api_url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Compatível com zabbix_service.set_transport: serve o payload em processo, sem HTTP."""
+        # Ida e volta por JSON, como no HTTP, para que o chamador não compartilhe objetos com o dataset
+        return json.loads(json.dumps(self.handle(json.loads(json.dumps(payload)))))
+
+    # --- HOSTS ---
+
+    def _host_indices(self, params: Dict[str, Any]) -> Iterable[int]:
+        if params.get("hostids") is not None:
+            indices = (self.dataset.host_index(h) for h in _as_list(params["hostids"]))
+            return sorted({i for i in indices if i is not None})
+        return range(self.dataset.host_count)
+
+    def _host_record(self, host_idx: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        host = self.dataset.hosts[host_idx]
+        record = _project({k: v for k, v in host.items() if not isinstance(v, (list, dict))}, params.get("output"))
+        for option, source in (("selectInterfaces", "interfaces"), ("selectGroups", "groups"),
+                               ("selectHostGroups", "groups"), ("selectTags", "tags"),
+                               ("selectParentTemplates", "parentTemplates")):
+            if option in params:
+                record["hostgroups" if option == "selectHostGroups" else source] = [
+                    _project(entry, params[option]) for entry in host[source]
+                ]
+        if "selectInventory" in params:
+            record["inventory"] = _project(host["inventory"], params["selectInventory"])
+        if "selectItems" in params:
+            if params["selectItems"] == "count":
+                record["items"] = str(len(self.dataset.item_templates))
+            else:
+                record["items"] = [_project(self.dataset.make_item(host_idx, i), params["selectItems"])
+                                   for i in range(len(self.dataset.item_templates))]
+        return record
+
+    def host_get(self, params: Dict[str, Any]):
+        match = _matcher(params)
+        hosts = []
+        for host_idx in self._host_indices(params):
+            host = self.dataset.hosts[host_idx]
+            if match is None or match(host):
+                hosts.append(host_idx)
+        if params.get("countOutput"):
+            return str(len(hosts))
+        records = [self._host_record(i, {**params, "output": "extend"}) for i in hosts]
+        records = _finish(records, {**params, "countOutput": False})
+        return [self._reproject(r, params) for r in records]
+
+    def _reproject(self, record: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplica o 'output' depois de filtrar e ordenar (que podem usar campos fora dele)."""
+        output = params.get("output")
+        if output in (None, "extend"):
+            return record
+        keep = set(_as_list(output)) | {k for k, v in record.items() if isinstance(v, (list, dict))}
+        if "selectItems" in params:
+            keep.add("items")
+        return {k: v for k, v in record.items() if k in keep}
+
+    # --- ITENS ---
+
+    def _template_candidates(self, params: Dict[str, Any]) -> List[int]:
+        """Índices dos itens do modelo que podem casar com filter/search (chave e nome não variam por host)."""
+        match = _matcher(params)
+        if match is None:
+            return list(range(len(self.dataset.item_templates)))
+        constant = {"key_", "name", "type", "value_type", "units", "delay", "status", "flags"}
+        fields = set((params.get("filter") or {}).keys()) | set((params.get("search") or {}).keys())
+        if not fields <= constant:
+            return list(range(len(self.dataset.item_templates)))
+        return [i for i, template in enumerate(self.dataset.item_templates) if match(template)]
+
+    def _items(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        dataset = self.dataset
+        if params.get("itemids") is not None:
+            located = [dataset.locate_item(i) for i in _as_list(params["itemids"])]
+            pairs = [p for p in located if p is not None]
+            if params.get("hostids") is not None:
+                allowed = set(self._host_indices(params))
+                pairs = [p for p in pairs if p[0] in allowed]
+        else:
+            templates = self._template_candidates(params)
+            pairs = [(h, t) for h in self._host_indices(params) for t in templates]
+        match = _matcher(params)
+        items = []
+        for host_idx, tmpl_idx in pairs:
+            item = dataset.make_item(host_idx, tmpl_idx)
+            if match is None or match(item):
+                items.append((host_idx, item))
+        return items
+
+    def item_get(self, params: Dict[str, Any]):
+        items = self._items(params)
+        if params.get("countOutput"):
+            return str(len(items))
+        records = []
+        for host_idx, item in items:
+            record = dict(item)
+            if "selectHosts" in params:
+                record["hosts"] = [_project(self.dataset.hosts[host_idx], params["selectHosts"])]
+            records.append(record)
+        records = _finish(records, params)
+        return [self._reproject(r, params) for r in records]
+
+    # --- TRIGGERS ---
+
+    def _trigger_pairs(self, params: Dict[str, Any]) -> Iterable:
+        dataset = self.dataset
+        if params.get("triggerids") is not None:
+            located = (dataset.locate_trigger(t) for t in _as_list(params["triggerids"]))
+            return [p for p in located if p is not None]
+        filter_value = (params.get("filter") or {}).get("value")
+        only_problems = params.get("only_true") or _as_list(filter_value) in (["1"], [1])
+        if only_problems:
+            # Atalho: só os triggers em problema, sem varrer a frota inteira
+            if params.get("hostids") is None:
+                return sorted(dataset.open_triggers)
+            allowed = set(self._host_indices(params))
+            return sorted(pair for pair in dataset.open_triggers if pair[0] in allowed)
+        return [(h, t) for h in self._host_indices(params) for t in range(len(dataset.trigger_templates))]
+
+    def trigger_get(self, params: Dict[str, Any]):
+        dataset = self.dataset
+        match = _matcher(params)
+        min_severity = params.get("min_severity")
+        records = []
+        for host_idx, trig_idx in self._trigger_pairs(params):
+            trigger = dataset.make_trigger(host_idx, trig_idx)
+            if match is not None and not match(trigger):
+                continue
+            if min_severity is not None and int(trigger["priority"]) < int(min_severity):
+                continue
+            if params.get("expandDescription"):
+                trigger["description"] = expand_macros(trigger["description"], dataset.hosts[host_idx]["name"])
+            if "selectHosts" in params:
+                trigger["hosts"] = [_project(dataset.hosts[host_idx], params["selectHosts"])]
+            records.append(trigger)
+        if params.get("countOutput"):
+            return str(len(records))
+        records = _finish(records, params)
+        return [self._reproject(r, params) for r in records]
+
+    # --- EVENTOS E PROBLEMAS ---
+
+    def _event_window(self, params: Dict[str, Any]) -> List[tuple]:
+        dataset = self.dataset
+        if params.get("eventids") is not None:
+            located = (dataset.locate_event(e) for e in _as_list(params["eventids"]))
+            events = [e for e in located if e is not None]
+        else:
+            lo = bisect_left(dataset.event_clocks, int(params["time_from"])) if params.get("time_from") is not None else 0
+            hi = bisect_right(dataset.event_clocks, int(params["time_till"])) if params.get("time_till") is not None else len(dataset.events)
+            events = dataset.events[lo:hi]
+        if params.get("eventid_from") is not None:
+            events = [e for e in events if e[0] >= int(params["eventid_from"])]
+        if params.get("eventid_till") is not None:
+            events = [e for e in events if e[0] <= int(params["eventid_till"])]
+
+        hosts = {dataset.host_index(h) for h in _as_list(params.get("hostids"))} if params.get("hostids") is not None else None
+        objectids = {int(o) for o in _as_list(params.get("objectids"))} if params.get("objectids") is not None else None
+        values = {int(v) for v in _as_list(params.get("value"))} if params.get("value") is not None else None
+        severities = {str(s) for s in _as_list(params.get("severities"))} if params.get("severities") is not None else None
+
+        selected = []
+        for event in events:
+            eventid, clock, value, host_idx, trig_idx, r_eventid = event
+            if hosts is not None and host_idx not in hosts:
+                continue
+            if objectids is not None and TRIGGERID_BASE + host_idx * TRIGGER_STRIDE + trig_idx not in objectids:
+                continue
+            if values is not None and value not in values:
+                continue
+            if severities is not None and (dataset.trigger_templates[trig_idx]["priority"] if value == 1 else "0") not in severities:
+                continue
+            selected.append(event)
+        return selected
+
+    def _event_records(self, events: List[tuple], params: Dict[str, Any]):
+        dataset = self.dataset
+        if params.get("countOutput"):
+            return str(len(events))
+        records = []
+        for event in events:
+            record = dataset.event_record(event)
+            host_idx, trig_idx = event[3], event[4]
+            if "selectHosts" in params:
+                record["hosts"] = [_project(dataset.hosts[host_idx], params["selectHosts"])]
+            if "selectRelatedObject" in params:
+                trigger = dataset.make_trigger(host_idx, trig_idx)
+                trigger["description"] = expand_macros(trigger["description"], dataset.hosts[host_idx]["name"])
+                record["relatedObject"] = _project(trigger, params["selectRelatedObject"])
+            records.append(record)
+        records = _finish(records, params)
+        return [self._reproject(r, params) for r in records]
+
+    def event_get(self, params: Dict[str, Any]):
+        return self._event_records(self._event_window(params), params)
+
+    def problem_get(self, params: Dict[str, Any]):
+        # Problemas ainda não resolvidos (eventos de problema sem recuperação)
+        problems = [e for e in self._event_window({**params, "value": 1}) if e[5] == 0]
+        return self._event_records(problems, params)
+
+    # --- HISTÓRICO E TENDÊNCIAS ---
+
+    def _numeric_items(self, params: Dict[str, Any]) -> List[tuple]:
+        located = (self.dataset.locate_item(i) for i in _as_list(params.get("itemids")))
+        pairs = [p for p in located if p is not None]
+        if params.get("history") is not None:
+            value_type = str(params["history"])
+            pairs = [p for p in pairs if self.dataset.item_templates[p[1]]["value_type"] == value_type]
+        return [p for p in pairs if self.dataset.item_templates[p[1]]["value_type"] in ("0", "3")]
+
+    def _clock_range(self, params: Dict[str, Any], step: int) -> range:
+        time_till = min(int(params.get("time_till") or self.dataset.now), self.dataset.now)
+        time_from = int(params.get("time_from") or time_till - 86400)
+        first = -(-time_from // step) * step
+        return range(first, time_till + 1, step)
+
+    def history_get(self, params: Dict[str, Any]):
+        dataset = self.dataset
+        clocks = self._clock_range(params, self.history_step)
+        records = []
+        for host_idx, tmpl_idx in self._numeric_items(params):
+            itemid = str(ITEMID_BASE + host_idx * ITEM_STRIDE + tmpl_idx)
+            integer = dataset.item_templates[tmpl_idx]["value_type"] == "3"
+            for clock in clocks:
+                value = dataset.value_at(host_idx, tmpl_idx, clock)
+                records.append({
+                    "itemid": itemid, "clock": str(clock),
+                    "value": str(int(value)) if integer else f"{value:.4f}", "ns": "0",
+                })
+        if params.get("countOutput"):
+            return str(len(records))
+        records = _finish(records, params)
+        return [_project(r, params.get("output")) for r in records]
+
+    def trend_get(self, params: Dict[str, Any]):
+        dataset = self.dataset
+        clocks = self._clock_range(params, 3600)
+        records = []
+        for host_idx, tmpl_idx in self._numeric_items(params):
+            itemid = str(ITEMID_BASE + host_idx * ITEM_STRIDE + tmpl_idx)
+            for clock in clocks:
+                avg = dataset.value_at(host_idx, tmpl_idx, clock)
+                records.append({
+                    "itemid": itemid, "clock": str(clock), "num": "60",
+                    "value_min": f"{avg * 0.9:.4f}", "value_avg": f"{avg:.4f}", "value_max": f"{avg * 1.1:.4f}",
+                })
+        records = _finish(records, params)
+        return [_project(r, params.get("output")) for r in records]
+
+
+# --- SERVIDOR HTTP ---
+
+def make_handler(fake: FakeZabbix):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                response = fake.handle(payload)
+            except json.JSONDecodeError:
+                response = {"jsonrpc": "2.0", "error": {"code": -32700, "message": "Parse error.", "data": ""}, "id": None}
+            body = json.dumps(response).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json-rpc")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_server(fake: FakeZabbix, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Servidor HTTP (uma thread por conexão); port=0 escolhe uma porta livre (server.server_address)."""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(fake: FakeZabbix, host: str = "127.0.0.1", port: int = 0):
+    """Sobe o servidor numa thread e devolve (server, url da API)."""
+    server = make_server(fake, host, port)
+    threading.Thread(target=server.serve_forever, name="fake-zabbix", daemon=True).start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/api_jsonrpc.php"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor JSON-RPC que imita o Zabbix a partir das fixtures.")
+    parser.add_argument("--hosts", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=7, help="janela de eventos gerados")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--history-step", type=int, default=300)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    dataset = Dataset(hosts=args.hosts, seed=args.seed, days=args.days)
+    fake = FakeZabbix(dataset, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, history_step=args.history_step)
+    server = make_server(fake, args.host, args.port)
+    print(f"Zabbix simulado em http://{args.host}:{args.port}/api_jsonrpc.php  {dataset.summary()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
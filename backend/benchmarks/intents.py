@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+from typing import List, Optional, Tuple
+
+# --- CASOS DAS RESPOSTAS RÁPIDAS ---
+# Perguntas de exemplo e a intenção que cada uma deve acionar (None = vai para
+# o modelo). Uma resposta rápida errada é pior que uma chamada ao modelo: as
+# perguntas que pedem um recorte (categoria, severidade, host, grupo) não podem
+# cair nos templates de contagem, lista ou top N, que respondem sobre a frota toda.
+#
+#   python -m benchmarks.intents            # tabela
+#   python -m benchmarks.intents --check    # falha (código 1) se algum caso divergir
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES: List[Tuple[str, Optional[str]]] = [
+    # Perguntas puras: respondidas pelo template
+    ("quantos problemas ativos existem?", "active_problem_count"),
+    ("How many active problems are there?", "active_problem_count"),
+    ("quais são os problemas ativos?", "active_problem_list"),
+    ("quais servidores tem problemas?", "active_problem_list"),
+    ("Quais hosts usam mais CPU?", "top_cpu"),
+    ("qual servidor tem mais uso de cpu agora?", "top_cpu"),
+    ("which hosts use the most memory?", "top_memory"),
+    ("top memória", "top_memory"),
+    ("o que está acontecendo com o host web01?", "host_status"),
+    # Perguntas com recorte: o template responderia com dados sem filtro
+    ("quais servidores tem problemas com alertas de disco?", None),
+    ("Quantos alertas de disco temos?", None),
+    ("Quantos alertas críticos temos?", None),
+    ("liste os problemas do grupo Linux", None),
+    ("quais problemas de severidade alta?", None),
+    ("o host web01 tem mais cpu?", None),
+    ("quais hosts do grupo Windows usam mais memória?", None),
+    ("top 3 cpu", None),
+    # Perguntas abertas
+    ("por que o web01 está com a CPU alta?", None),
+    ("analise os problemas ativos", None),
+]
+
+
+def first_intent(question: str) -> Optional[str]:
+    """Intenção de maior prioridade reconhecida na pergunta (sem consultar o Zabbix)."""
+    from services import intent_service
+    matches = intent_service.match_intents(question)
+    return matches[0][0] if matches else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Casos das respostas rápidas por intenção.")
+    parser.add_argument("--check", action="store_true", help="falha se alguma pergunta acionar outra intenção")
+    args = parser.parse_args()
+
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    failures = 0
+    for question, expected in CASES:
+        got = first_intent(question)
+        ok = got == expected
+        failures += not ok
+        print(f"{'ok' if ok else 'ERRO':<5} {str(expected):<22} {str(got):<22} {question}")
+    print(f"\n{len(CASES) - failures}/{len(CASES)} casos conferem")
+    if args.check and failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+# --- MICRO-BENCHMARKS DAS FUNÇÕES PURAS ---
+# Mede, sem rede, as transformações de dados dos caminhos quentes:
+# summarize_key_metrics (parsing das chaves do get_key_metrics),
+# aggregate_by_hour (get_aggregated_history), group_host_triggers
+# (get_host_triggers), format_event_log (get_event_log) e
+# PromptBuilder.build_prompt. As entradas vêm do Dataset sintético (formato
+# das fixtures) em três tamanhos e são montadas uma única vez, antes de medir.
+#
+#   python -m benchmarks.micro                                  # tabela
+#   python -m benchmarks.micro --save                           # grava benchmarks/baselines/micro.json
+#   python -m benchmarks.micro --check                          # falha (código 1) se algo regrediu
+#   python -m benchmarks.micro --check --threshold 0.10 --only aggregate_by_hour
+#
+# Cada caso roda em laços calibrados para ~`--min-time` segundos; vale o
+# melhor de `--repeat` laços (o mínimo é o estimador menos sujeito a ruído).
+# Um trabalho de referência fixo é medido junto e gravado na baseline: no
+# --check os tempos são comparados descontando a diferença de velocidade da
+# máquina, e um caso acima do limite é medido de novo antes de ser acusado.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "micro.json")
+# Relógio fixo para que as entradas sejam idênticas em qualquer execução
+FIXED_NOW = 1_760_000_400 // 3600 * 3600
+API_URL = "http://fake-zabbix.invalid/api_jsonrpc.php"
+QUESTION = "Faça uma análise geral do ambiente e recomende ações."
+
+Case = Tuple[str, str, Callable[[], Any]]  # (função, tamanho, chamada)
+
+
+def prepare_environment():
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def _fake(hosts: int, **dataset_options):
+    from benchmarks.dataset import Dataset
+    from benchmarks.fake_zabbix import FakeZabbix
+    return FakeZabbix(Dataset(hosts=hosts, now=FIXED_NOW, **dataset_options))
+
+
+def build_cases() -> List[Case]:
+    from llm.prompts import PromptBuilder
+    from services import zabbix_service
+
+    cases: List[Case] = []
+
+    # Itens de um host: o das fixtures, e hosts com muitas partições e interfaces
+    for label, partitions, interfaces in (("85 itens", 0, 0), ("405 itens", 20, 20), ("885 itens", 50, 50)):
+        fake = _fake(1, extra_partitions=partitions, extra_interfaces=interfaces)
+        items = fake.item_get({"output": ["key_", "lastvalue", "name"], "hostids": fake.dataset.hosts[0]["hostid"]})
+        cases.append(("summarize_key_metrics", label, lambda items=items: zabbix_service.summarize_key_metrics(items)))
+
+    # Pontos de histórico (CPU de N hosts, um ponto a cada 5 min)
+    for label, hosts, hours in (("1k pontos", 10, 8), ("10k pontos", 35, 24), ("100k pontos", 50, 168)):
+        fake = _fake(hosts)
+        items = fake.item_get({"output": ["itemid", "key_"], "selectHosts": ["name"], "filter": {"key_": "system.cpu.util"}})
+        itemid_to_host = {item["itemid"]: item["hosts"][0]["name"] for item in items}
+        history = fake.history_get({"output": "extend", "history": 0, "itemids": list(itemid_to_host),
+                                    "time_from": FIXED_NOW - hours * 3600, "time_till": FIXED_NOW,
+                                    "sortfield": "clock", "sortorder": "ASC"})
+        cases.append(("aggregate_by_hour", label,
+                      lambda history=history, mapping=itemid_to_host: zabbix_service.aggregate_by_hour(history, mapping)))
+
+    # Triggers de um host (group_host_triggers só acrescenta um campo derivado: pode repetir sobre a mesma lista)
+    for label, hosts in (("31 triggers", 1), ("1k triggers", 33), ("10k triggers", 323)):
+        fake = _fake(hosts, problem_ratio=0.2)
+        triggers = fake.trigger_get({
+            "output": ["triggerid", "description", "priority", "lastchange", "comments", "opdata", "state", "error", "value", "status"],
+            "expandDescription": True, "selectHosts": ["name"], "sortfield": "lastchange", "sortorder": "DESC",
+        })
+        cases.append(("group_host_triggers", label, lambda triggers=triggers: zabbix_service.group_host_triggers(triggers)))
+
+    # Eventos no formato de _event_log_params
+    for label, limit in (("100 eventos", 100), ("1k eventos", 1000), ("10k eventos", 10000)):
+        fake = _fake(200, incidents_per_trigger_day=0.2)
+        events = fake.event_get({**zabbix_service._event_log_params(FIXED_NOW - 7 * 86400, FIXED_NOW),
+                                 "sortfield": ["clock"], "sortorder": "DESC", "limit": limit})
+        cases.append(("format_event_log", label, lambda events=events: zabbix_service.format_event_log(events)))
+
+    # Prompt sobre o contexto completo de frotas de vários tamanhos
+    builder = PromptBuilder()
+    for label, hosts in (("10 hosts", 10), ("100 hosts", 100), ("1k hosts", 1000)):
+        fake = _fake(hosts)
+        zabbix_service.set_transport(fake.transport)
+        try:
+            context = zabbix_service.get_full_zabbix_context(API_URL, "bench-token")
+        finally:
+            zabbix_service.set_transport(None)
+            _clear_caches()
+        cases.append(("build_prompt", label, lambda context=context: builder.build_prompt(QUESTION, context)))
+
+    return cases
+
+
+def _clear_caches():
+    from utils.cache import _instances
+    for cache in _instances:
+        cache.clear()
+
+
+def time_case(fn: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, Any]:
+    """Melhor tempo por chamada (µs), com o número de chamadas por laço calibrado para durar ~min_time."""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= 0.02 or number >= 1_000_000:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return {"us": round(best * 1e6, 2), "loops": number}
+
+
+def _reference_workload():
+    # Trabalho fixo no mesmo estilo das funções medidas (dicionários, strings, floats)
+    rows = [{"key": f"item[{i},pused]", "value": str(i * 0.37)} for i in range(2000)]
+    return sorted((float(r["value"]), r["key"].split("[")[1]) for r in rows)
+
+
+def measure_reference(min_time: float, repeat: int) -> float:
+    """Tempo (µs) do trabalho de referência: serve para descontar a variação de velocidade da máquina."""
+    return time_case(_reference_workload, min_time, repeat)["us"]
+
+
+TABLE_HEADER = f"{'função':<24} {'tamanho':<14} {'µs/chamada':>13} {'laços':>8} {'baseline':>13} {'Δ':>8}"
+
+
+def format_row(row: Dict[str, Any], baseline: Dict[str, Any] = None, speed: float = 1.0) -> str:
+    """Linha da tabela; Δ é a variação em relação à baseline já descontado o fator de velocidade."""
+    line = f"{row['function']:<24} {row['size']:<14} {row['us']:>13.1f} {row['loops']:>8}"
+    if baseline:
+        change = row["us"] / (baseline["us"] * speed) - 1 if baseline["us"] else 0.0
+        line += f" {baseline['us']:>13.1f} {change:>+8.1%}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks das funções puras de processamento.")
+    parser.add_argument("--only", action="append", default=[], help="mede só as funções com este nome")
+    parser.add_argument("--min-time", type=float, default=0.2, help="duração aproximada de cada laço (s)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="grava os resultados como nova baseline")
+    parser.add_argument("--check", action="store_true", help="falha se algum caso ficar mais lento que a baseline além do limite")
+    parser.add_argument("--threshold", type=float, default=0.25, help="regressão relativa aceita no --check (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    prepare_environment()
+    previous: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    previous_reference = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        previous = {(row["function"], row["size"]): row for row in stored["rows"]}
+        previous_reference = stored.get("reference_us")
+    elif args.check:
+        parser.error(f"baseline não encontrada: {args.baseline}")
+
+    cases = [c for c in build_cases() if not args.only or c[0] in args.only]
+    reference_us = measure_reference(args.min_time, args.repeat * 2)
+    # Fator de velocidade da máquina agora em relação à da baseline (>1 = mais lenta).
+    # Só desconta lentidão: uma referência que saiu rápida por acaso não aperta o limite.
+    speed = max(1.0, reference_us / previous_reference) if previous_reference else 1.0
+    print(f"Referência: {reference_us:.1f} µs (fator em relação à baseline: {speed:.2f})\n")
+    print(TABLE_HEADER)
+    print("-" * len(TABLE_HEADER))
+    rows, regressions = [], []
+    for function, size, fn in cases:
+        row = {"function": function, "size": size, **time_case(fn, args.min_time, args.repeat)}
+        before = previous.get((function, size))
+        if args.check and before and row["us"] > before["us"] * speed * (1 + args.threshold):
+            # Confirma antes de acusar: ruído de uma medição isolada não deve derrubar o check
+            retry = time_case(fn, args.min_time, args.repeat * 2)
+            if retry["us"] < row["us"]:
+                row = {"function": function, "size": size, **retry}
+        rows.append(row)
+        print(format_row(row, before, speed), flush=True)
+        if before and row["us"] > before["us"] * speed * (1 + args.threshold):
+            regressions.append(f"{function} ({size}): {before['us']:.1f} -> {row['us']:.1f} µs "
+                               f"({row['us'] / (before['us'] * speed) - 1:+.0%} descontada a referência)")
+
+    # Segunda medição da referência, ao final: vale a menor das duas
+    reference_us = min(reference_us, measure_reference(args.min_time, args.repeat * 2))
+
+    if args.save:
+        # Casos fora do --only mantêm o valor anterior
+        merged = {**previous, **{(row["function"], row["size"]): row for row in rows}}
+        if previous_reference and args.only:
+            # Só parte dos casos foi medida: converte para a velocidade da baseline existente
+            reference_us = previous_reference
+            for row in rows:
+                merged[(row["function"], row["size"])] = {**row, "us": round(row["us"] / speed, 2)}
+        document = {
+            "environment": {"python": sys.version.split()[0], "platform": sys.platform},
+            "reference_us": reference_us,
+            "rows": list(merged.values()),
+        }
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nBaseline gravada em {args.baseline}")
+
+    if args.check:
+        if regressions:
+            print(f"\nRegressões acima de {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\nSem regressões acima de {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
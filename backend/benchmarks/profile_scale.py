@@ -0,0 +1,248 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+# --- PERFIS DE CPU E MEMÓRIA EM ESCALA ---
+# Mede get_key_metrics, get_top_consumers, get_company_inventory,
+# get_full_zabbix_context e PromptBuilder.build_prompt contra frotas
+# sintéticas de vários tamanhos (até 10k hosts / ~1M de itens). As respostas
+# do Zabbix simulado são gravadas numa primeira passada e reproduzidas (só o
+# json.loads, como faria o response.json() do HTTP) nas passadas medidas, então
+# o tempo e a memória são os do backend, não os do simulador. Os caches são
+# limpos antes de cada passada.
+#
+#   python -m benchmarks.profile_scale                                  # tabela nas escalas padrão
+#   python -m benchmarks.profile_scale --output benchmarks/baselines/scale.json
+#   python -m benchmarks.profile_scale --check benchmarks/baselines/scale.json
+#   python -m benchmarks.profile_scale --scales 10000 --profile-dir /tmp/perfis
+#
+# --check refaz as medições com os parâmetros da baseline e falha (código 1)
+# se algum alvo ficar mais lento ou usar mais memória do que a tolerância.
+# Tempos dependem da máquina: compare baselines geradas no mesmo ambiente.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCALES = (100, 1000, 10000)
+API_URL = "http://fake-zabbix.invalid/api_jsonrpc.php"
+TOKEN = "bench-token"
+QUESTION = "Faça uma análise geral do ambiente e recomende ações."
+
+
+class ReplayTransport:
+    """Grava a resposta de cada payload na primeira chamada e depois só a decodifica."""
+
+    def __init__(self, upstream: Callable[[str, Dict[str, Any], float], Dict[str, Any]]):
+        self.upstream = upstream
+        self.recorded: Dict[str, bytes] = {}
+        self.calls = 0
+        self.bytes = 0
+
+    def __call__(self, api_url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        key = json.dumps({k: v for k, v in payload.items() if k != "id"}, sort_keys=True)
+        body = self.recorded.get(key)
+        if body is None:
+            body = self.recorded[key] = json.dumps(self.upstream(api_url, payload, timeout)).encode("utf-8")
+        self.calls += 1
+        self.bytes += len(body)
+        return json.loads(body)
+
+    def reset_counters(self):
+        self.calls = self.bytes = 0
+
+
+def prepare_environment():
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def build_targets(dataset) -> List[Tuple[str, Callable[[], Any]]]:
+    from llm.prompts import PromptBuilder
+    from services import zabbix_service
+
+    host_id = dataset.hosts[0]["hostid"]
+    builder = PromptBuilder()
+    # O prompt é medido sozinho, sobre um contexto já montado (sem chamadas ao Zabbix)
+    context_for_prompt = zabbix_service.get_full_zabbix_context(API_URL, TOKEN)
+    return [
+        ("get_key_metrics", lambda: zabbix_service.get_key_metrics(API_URL, TOKEN, host_id)),
+        ("get_top_consumers", lambda: zabbix_service.get_top_consumers(API_URL, TOKEN)),
+        ("get_company_inventory", lambda: zabbix_service.get_company_inventory(API_URL, TOKEN)),
+        ("get_full_zabbix_context", lambda: zabbix_service.get_full_zabbix_context(API_URL, TOKEN)),
+        ("build_prompt", lambda: builder.build_prompt(QUESTION, context_for_prompt)),
+    ]
+
+
+def clear_caches():
+    from utils.cache import _instances
+    for cache in _instances:
+        cache.clear()
+
+
+def _result_size(result: Any) -> int:
+    if isinstance(result, str):
+        return len(result)
+    return len(json.dumps(result, default=str))
+
+
+def profile_target(name: str, fn: Callable[[], Any], transport: ReplayTransport, repeat: int,
+                   profile_dir: str = None, scale: int = 0) -> Dict[str, Any]:
+    clear_caches()
+    fn()  # grava as respostas do Zabbix simulado
+
+    walls, cpus = [], []
+    for _ in range(repeat):
+        clear_caches()
+        transport.reset_counters()
+        gc.collect()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        result = fn()
+        walls.append(time.perf_counter() - wall_started)
+        cpus.append(time.process_time() - cpu_started)
+    calls, received = transport.calls, transport.bytes
+
+    # Memória numa passada separada: o tracemalloc deixa a execução bem mais lenta
+    clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    retained = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+
+    if profile_dir:
+        import cProfile
+        os.makedirs(profile_dir, exist_ok=True)
+        clear_caches()
+        cProfile.runctx("fn()", {"fn": fn}, {}, os.path.join(profile_dir, f"{scale}-{name}.prof"))
+
+    return {
+        "target": name,
+        "wall_ms": round(statistics.median(walls) * 1000, 2),
+        "cpu_ms": round(statistics.median(cpus) * 1000, 2),
+        "peak_mb": round(peak / 1e6, 2),
+        "retained_mb": round(current / 1e6, 2),
+        "zabbix_calls": calls,
+        "zabbix_kb": round(received / 1024, 1),
+        "result_kb": round(_result_size(result) / 1024, 1),
+    }
+
+
+def run(scales, extra_partitions: int, extra_interfaces: int, repeat: int, seed: int,
+        profile_dir: str = None, only: List[str] = None) -> List[Dict[str, Any]]:
+    from benchmarks.dataset import Dataset
+    from benchmarks.fake_zabbix import FakeZabbix
+    from services import zabbix_service
+
+    rows = []
+    print(TABLE_HEADER)
+    print("-" * len(TABLE_HEADER))
+    for hosts in scales:
+        started = time.perf_counter()
+        dataset = Dataset(hosts=hosts, seed=seed, extra_partitions=extra_partitions, extra_interfaces=extra_interfaces)
+        transport = ReplayTransport(FakeZabbix(dataset).transport)
+        zabbix_service.set_transport(transport)
+        try:
+            for name, fn in build_targets(dataset):
+                if only and name not in only:
+                    continue
+                row = {"hosts": hosts, "items": dataset.summary()["items"],
+                       **profile_target(name, fn, transport, repeat, profile_dir, hosts)}
+                rows.append(row)
+                print(format_row(row), flush=True)
+        finally:
+            zabbix_service.set_transport(None)
+            clear_caches()
+        print(f"{'':>8} (frota de {hosts} hosts gerada e medida em {time.perf_counter() - started:.1f}s)", flush=True)
+    return rows
+
+
+TABLE_HEADER = (f"{'hosts':>7} {'itens':>9}  {'alvo':<24} {'wall ms':>10} {'cpu ms':>10} {'pico MB':>9} "
+                f"{'chamadas':>8} {'zabbix KB':>10} {'saída KB':>9}")
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    return (f"{row['hosts']:>7} {row['items']:>9}  {row['target']:<24} {row['wall_ms']:>10.1f} {row['cpu_ms']:>10.1f} "
+            f"{row['peak_mb']:>9.1f} {row['zabbix_calls']:>8} {row['zabbix_kb']:>10.1f} {row['result_kb']:>9.1f}")
+
+
+# --- BASELINE ---
+
+def compare(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]], tolerance: float,
+            min_ms: float) -> List[str]:
+    """Regressões de tempo (wall_ms) e memória (peak_mb) acima da tolerância relativa."""
+    previous = {(row["hosts"], row["target"]): row for row in baseline}
+    problems = []
+    for row in current:
+        before = previous.get((row["hosts"], row["target"]))
+        if before is None:
+            continue
+        # Tempos muito curtos oscilam demais para uma tolerância relativa
+        if row["wall_ms"] > max(before["wall_ms"], min_ms) * (1 + tolerance):
+            problems.append(f"{row['target']} @ {row['hosts']} hosts: {before['wall_ms']:.1f} -> {row['wall_ms']:.1f} ms")
+        if row["peak_mb"] > max(before["peak_mb"], 1.0) * (1 + tolerance):
+            problems.append(f"{row['target']} @ {row['hosts']} hosts: {before['peak_mb']:.1f} -> {row['peak_mb']:.1f} MB de pico")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfis de CPU e memória do backend em frotas sintéticas.")
+    parser.add_argument("--scales", default=",".join(str(s) for s in DEFAULT_SCALES), help="tamanhos de frota (hosts), separados por vírgula")
+    parser.add_argument("--extra-partitions", type=int, default=1)
+    parser.add_argument("--extra-interfaces", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="passadas medidas por alvo (vale a mediana)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", action="append", default=[], help="mede só os alvos com este nome")
+    parser.add_argument("--profile-dir", help="grava um cProfile (.prof) por alvo e escala neste diretório")
+    parser.add_argument("--output", help="grava a tabela como baseline (JSON)")
+    parser.add_argument("--check", help="compara com uma baseline gravada e falha se houver regressão")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="regressão relativa aceita no --check (0.5 = +50%%)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="tempos abaixo disso não contam como regressão")
+    args = parser.parse_args()
+
+    prepare_environment()
+    baseline = None
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        params = baseline["params"]
+        scales = params["scales"]
+        args.extra_partitions, args.extra_interfaces = params["extra_partitions"], params["extra_interfaces"]
+        args.repeat, args.seed = params["repeat"], params["seed"]
+    else:
+        scales = [int(s) for s in args.scales.split(",") if s.strip()]
+
+    rows = run(scales, args.extra_partitions, args.extra_interfaces, args.repeat, args.seed,
+               args.profile_dir, args.only or None)
+
+    if args.output:
+        document = {
+            "params": {"scales": scales, "extra_partitions": args.extra_partitions,
+                       "extra_interfaces": args.extra_interfaces, "repeat": args.repeat, "seed": args.seed},
+            "environment": {"python": sys.version.split()[0], "platform": sys.platform},
+            "rows": rows,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nBaseline gravada em {args.output}")
+
+    if baseline is not None:
+        problems = compare(baseline["rows"], rows, args.tolerance, args.min_ms)
+        if problems:
+            print(f"\nRegressões acima de {args.tolerance:.0%}:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print(f"\nSem regressões acima de {args.tolerance:.0%} em relação a {args.check}")
+
+
+if __name__ == "__main__":
+    main()
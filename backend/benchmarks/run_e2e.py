@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# --- BENCHMARK PONTA A PONTA ---
+# Sobe a API (uvicorn, numa thread) contra o Zabbix simulado e mede p50/p95/p99
+# e vazão de cada rota /zabbix/*, /sla, /trends, /chat (com o modelo stub, sem
+# chamar o Gemini) e /reports. Roda num diretório temporário, com banco SQLite
+# e chave de criptografia próprios, sem tocar nos arquivos do backend.
+#
+#   python -m benchmarks.run_e2e --hosts 200 --requests 30 --concurrency 4
+#   python -m benchmarks.run_e2e --latency-ms 25 --cold --json resultado.json
+#   python -m benchmarks.run_e2e --only /zabbix/hosts --only /chat
+#   python -m benchmarks.run_e2e --cassette prod.jsonl.gz --timing compressed --time-scale 0.2
+#
+# --cold limpa os caches antes de cada requisição (mede o custo sem cache);
+# sem ele, a primeira requisição de cada rota aquece o cache e não é medida.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rotas medidas: (nome, método, caminho, parâmetros de query ou corpo JSON).
+# {e} é a empresa e {h} um host do dataset. A rota /zabbix/live (SSE) fica de fora.
+ENDPOINTS = [
+    ("zabbix.hosts", "GET", "/zabbix/hosts/{e}", None),
+    ("zabbix.hosts.search", "GET", "/zabbix/hosts/search/{e}", {"q": "srv-0001"}),
+    ("zabbix.history.aggregated", "GET", "/zabbix/history/aggregated/{e}", {"period": "24h"}),
+    ("zabbix.top_consumers", "GET", "/zabbix/metrics/top_consumers/{e}", None),
+    ("zabbix.context.full", "GET", "/zabbix/context/full/{e}", None),
+    ("zabbix.key_metrics", "GET", "/zabbix/metrics/key_metrics/{e}/{h}", None),
+    ("zabbix.anomalies", "GET", "/zabbix/metrics/anomalies/{e}", None),
+    ("zabbix.alerts.critical", "GET", "/zabbix/alerts/critical/{e}", None),
+    ("zabbix.triggers.host", "GET", "/zabbix/triggers/host/{e}/{h}", None),
+    ("zabbix.host.info", "GET", "/zabbix/host/info/{e}/{h}", None),
+    ("zabbix.alerts.history", "GET", "/zabbix/alerts/history/{e}", None),
+    ("zabbix.alerts.storms", "GET", "/zabbix/alerts/storms/{e}", None),
+    ("zabbix.events.log", "GET", "/zabbix/events/log/{e}", None),
+    ("zabbix.events.log.page", "GET", "/zabbix/events/log/{e}/page", None),
+    ("zabbix.inventory", "GET", "/zabbix/inventory/{e}", None),
+    ("zabbix.export.inventory", "GET", "/zabbix/export/inventory/{e}", {"format": "ndjson"}),
+    ("zabbix.export.events", "GET", "/zabbix/export/events/{e}", {"format": "csv"}),
+    ("zabbix.export.alerts", "GET", "/zabbix/export/alerts/{e}", {"format": "ndjson"}),
+    ("zabbix.inventory.pdf", "GET", "/zabbix/inventory/{e}/pdf", None),
+    ("sla.availability", "GET", "/sla/availability/{e}", None),
+    ("sla.incidents", "GET", "/sla/incidents/{e}", None),
+    ("trends.capacity", "GET", "/trends/capacity/{e}", {"days": 7}),
+    ("chat.intent", "POST", "/chat/", {"question": "quantos problemas ativos existem?", "empresa_id": "{e}"}),
+    ("chat.open_ended", "POST", "/chat/", {"question": "analise a saúde geral do ambiente e recomende ações", "empresa_id": "{e}"}),
+    ("reports.generate", "POST", "/api/v1/reports/generate",
+     {"host_id": "{h}", "empresa_id": "{e}", "user_query": "relatório semanal de desempenho", "period": "7d"}),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _fill(value, empresa_id: int, host_id: str):
+    if isinstance(value, dict):
+        return {k: _fill(v, empresa_id, host_id) for k, v in value.items()}
+    if value == "{e}":
+        return empresa_id
+    if isinstance(value, str):
+        return value.replace("{e}", str(empresa_id)).replace("{h}", host_id)
+    return value
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Percentil por interpolação linear (amostras já ordenadas)."""
+    if not samples:
+        return 0.0
+    position = (len(samples) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(samples) - 1)
+    return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+
+# --- AMBIENTE ---
+
+def prepare_environment(workdir: str):
+    """Variáveis e diretório de trabalho da API antes de importá-la (o banco e a chave são relativos ao cwd)."""
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("SLOW_REQUEST_SECONDS", "3600")
+    # Sem o poller de anomalias: só as rotas medidas chamam o Zabbix simulado
+    os.environ.setdefault("ANOMALY_POLL_SECONDS", "0")
+    os.chdir(workdir)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+
+def seed_database(api_url: str) -> Dict[str, Any]:
+    """Cria a empresa apontando para o Zabbix simulado e um super admin; devolve o cabeçalho de autenticação."""
+    from database.connection import SessionLocal, create_tables
+    from database.models import Empresa
+    from models.usuario import Usuario
+    from schemas.roles import UserRole
+    from utils.security import create_access_token, criptografar_token
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        empresa = Empresa(nome="Benchmark", url_zabbix=api_url, usuario_zabbix="bench",
+                          token_zabbix_criptografado=criptografar_token("bench-token"))
+        usuario = Usuario(email="bench@example.com", nome="Benchmark", role=UserRole.SUPER_ADMIN)
+        usuario.empresas.append(empresa)
+        db.add(usuario)
+        db.commit()
+        token = create_access_token({"sub": usuario.email, "user_id": usuario.id, "role": usuario.role.value})
+        return {"empresa_id": empresa.id, "headers": {"Authorization": f"Bearer {token}"}}
+    finally:
+        db.close()
+
+
+def start_api(port: int):
+    import uvicorn
+    import main
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("A API não subiu em 30s")
+        time.sleep(0.05)
+    return server
+
+
+def clear_caches():
+    from utils.cache import _instances
+    for cache in _instances:
+        cache.clear()
+
+
+# --- MEDIÇÃO ---
+
+def measure(session, base_url: str, endpoint, context: Dict[str, Any], requests_per_endpoint: int,
+            concurrency: int, cold: bool) -> Dict[str, Any]:
+    import requests
+
+    name, method, path, data = endpoint
+    url = base_url + _fill(path, context["empresa_id"], context["host_id"])
+    data = _fill(data, context["empresa_id"], context["host_id"]) if data else None
+    kwargs = {"headers": context["headers"], "timeout": 300}
+    if method == "GET":
+        kwargs["params"] = data
+    else:
+        kwargs["json"] = data
+
+    def one() -> tuple:
+        if cold:
+            clear_caches()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+            status, size = response.status_code, len(response.content)
+        except requests.RequestException:
+            # Conexão derrubada pelo servidor (ex.: exceção não tratada na rota): conta como erro
+            status, size = 0, 0
+        return time.perf_counter() - started, status, size
+
+    if not cold:
+        one()  # aquece caches e conexões
+
+    wall_started = time.perf_counter()
+    # Com --cold a limpeza de cache de uma requisição afetaria as outras: roda em série
+    workers = 1 if cold else concurrency
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda _: one(), range(requests_per_endpoint)))
+    wall = time.perf_counter() - wall_started
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = [r[1] for r in results if r[1] == 0 or r[1] >= 400]
+    return {
+        "endpoint": name,
+        "method": method,
+        "path": path,
+        "requests": len(results),
+        "errors": len(errors),
+        "status": sorted(set(r[1] for r in results)),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "rps": round(len(results) / wall, 2) if wall else 0.0,
+        "bytes": int(statistics.fmean(r[2] for r in results)),
+    }
+
+
+TABLE_HEADER = f"{'endpoint':<28} {'req':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'bytes':>9}"
+
+
+def format_row(row: Dict[str, Any]) -> str:
+    return (f"{row['endpoint']:<28} {row['requests']:>5} {row['errors']:>4} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['rps']:>8.1f} {row['bytes']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta da API contra o Zabbix simulado.")
+    parser.add_argument("--hosts", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência injetada em cada chamada ao Zabbix")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--transport", choices=("http", "inproc"), default="http",
+                        help="http: Zabbix simulado num servidor HTTP; inproc: chamado direto, sem rede")
+    parser.add_argument("--requests", type=int, default=20, help="requisições medidas por rota")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cold", action="store_true", help="limpa os caches antes de cada requisição")
+    parser.add_argument("--only", action="append", default=[], help="mede só as rotas cujo nome ou caminho contém o texto")
+    parser.add_argument("--json", dest="json_path", help="grava os resultados em JSON")
+    parser.add_argument("--cassette", help="reproduz um cassete gravado (services/zabbix_cassette) no lugar do Zabbix simulado")
+    parser.add_argument("--timing", choices=("original", "compressed", "none"), default="original",
+                        help="tempo de resposta na reprodução do cassete")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="fator do --timing compressed")
+    parser.add_argument("--host-id", help="host usado nas rotas por host (padrão: o primeiro do dataset ou do cassete)")
+    parser.add_argument("--record", help="grava as chamadas ao Zabbix desta execução num cassete")
+    args = parser.parse_args()
+
+    output_path = os.path.abspath(args.json_path) if args.json_path else None
+    cassette_path = os.path.abspath(args.cassette) if args.cassette else None
+    record_path = os.path.abspath(args.record) if args.record else None
+    workdir = tempfile.mkdtemp(prefix="agno-bench-")
+    prepare_environment(workdir)
+
+    import requests
+    from benchmarks.dataset import Dataset
+    from benchmarks.fake_zabbix import FakeZabbix, start_in_background
+    from services import zabbix_cassette, zabbix_service
+
+    fake = fake_server = None
+    if cassette_path:
+        replay = zabbix_cassette.CassetteTransport(cassette_path, timing=args.timing, time_scale=args.time_scale)
+        zabbix_service.set_transport(replay)
+        api_url = "http://cassette.invalid/api_jsonrpc.php"
+        host_id = args.host_id or next(replay.hostids(), "")
+        source = replay.summary()
+    else:
+        dataset = Dataset(hosts=args.hosts, seed=args.seed, days=args.days)
+        fake = FakeZabbix(dataset, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+        if args.transport == "http":
+            fake_server, api_url = start_in_background(fake)
+        else:
+            api_url = "http://fake-zabbix.invalid/api_jsonrpc.php"
+            zabbix_service.set_transport(fake.transport)
+        host_id = args.host_id or dataset.hosts[0]["hostid"]
+        source = dataset.summary()
+    if record_path:
+        zabbix_service.start_recording(record_path)
+
+    context = seed_database(api_url)
+    context["host_id"] = host_id
+    port = _free_port()
+    server = start_api(port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    endpoints = [e for e in ENDPOINTS if not args.only or any(o in e[0] or o in e[2] for o in args.only)]
+    if cassette_path:
+        print(f"Cassete: {source}")
+        zabbix_mode = f"cassete, tempo {args.timing}" + (f" x{args.time_scale}" if args.timing == "compressed" else "")
+    else:
+        print(f"Dataset: {source}")
+        zabbix_mode = f"{args.transport}, latência {args.latency_ms}ms (+{args.jitter_ms}ms)"
+    print(f"Zabbix: {zabbix_mode}; {args.requests} req/rota, concorrência {1 if args.cold else args.concurrency}, "
+          f"{'sem cache' if args.cold else 'cache quente'}\n")
+
+    rows = []
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency)
+        session.mount("http://", adapter)
+        print(TABLE_HEADER)
+        print("-" * len(TABLE_HEADER))
+        for endpoint in endpoints:
+            rows.append(measure(session, base_url, endpoint, context, args.requests, args.concurrency, args.cold))
+            print(format_row(rows[-1]), flush=True)
+    if fake is not None:
+        print(f"\nChamadas ao Zabbix simulado: {dict(sorted(fake.calls.items()))}")
+    else:
+        print(f"\nReprodução do cassete: {replay.stats}")
+    if record_path:
+        zabbix_service.stop_recording()
+        print(f"Cassete gravado em {record_path}")
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "source": source, "results": rows}, f, indent=2)
+        print(f"Resultados gravados em {output_path}")
+
+    server.should_exit = True
+    if fake_server is not None:
+        fake_server.shutdown()
+    zabbix_service.set_transport(None)
+
+
+if __name__ == "__main__":
+    main()
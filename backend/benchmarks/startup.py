@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import requests
+
+# --- TEMPO DE SUBIDA DA API ---
+# Mede, num interpretador novo e num diretório vazio (sem encryption.key nem
+# banco), o tempo até a primeira requisição respondida: é a latência que o
+# usuário vê num cold start do Cloud Run. Cada rodada separa o import de
+# `main` (montagem da aplicação) do resto (uvicorn, lifespan, primeira resposta).
+#
+#   python -m benchmarks.startup                  # 5 rodadas, mediana
+#   python -m benchmarks.startup --check          # falha (código 1) acima de --target segundos
+#   python -m benchmarks.startup --imports 15     # os imports mais lentos (python -X importtime)
+#
+# Meta: primeira requisição em menos de 1s (padrão de --target).
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATUS_PATH = "/api/v1/status"
+
+# Roda no processo filho: importa `main`, informa o tempo e sobe o uvicorn
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({"import_ms": (time.perf_counter() - started) * 1000}), flush=True)
+import uvicorn
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning", access_log=False)
+"""
+
+
+def child_environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    env.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_once(timeout: float) -> Dict[str, Any]:
+    """Uma subida completa: do spawn do interpretador até o primeiro 200 em /api/v1/status."""
+    port = _free_port()
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as workdir:
+        started = time.perf_counter()
+        child = subprocess.Popen([sys.executable, "-c", CHILD_SCRIPT, str(port)], cwd=workdir,
+                                 env=child_environment(), stdout=subprocess.PIPE, text=True)
+        try:
+            line = child.stdout.readline()
+            if not line:
+                raise RuntimeError(f"A API terminou antes de subir (código {child.wait()})")
+            imported = time.perf_counter()
+            import_ms = json.loads(line)["import_ms"]
+            url = f"http://127.0.0.1:{port}{STATUS_PATH}"
+            while True:
+                try:
+                    if requests.get(url, timeout=1).status_code == 200:
+                        break
+                except requests.ConnectionError:
+                    pass
+                if child.poll() is not None:
+                    raise RuntimeError(f"A API terminou antes de responder (código {child.returncode})")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError(f"A API não respondeu em {timeout}s")
+                time.sleep(0.005)
+            ready = time.perf_counter()
+        finally:
+            child.terminate()
+            try:
+                child.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                child.kill()
+    return {
+        "first_request_ms": round((ready - started) * 1000, 1),
+        "interpreter_ms": round((imported - started) * 1000 - import_ms, 1),
+        "import_main_ms": round(import_ms, 1),
+        "serve_ms": round((ready - imported) * 1000, 1),
+    }
+
+
+def slowest_imports(limit: int) -> List[Dict[str, Any]]:
+    """Imports de primeiro nível de `main` ordenados pelo tempo acumulado (python -X importtime)."""
+    with tempfile.TemporaryDirectory(prefix="startup-bench-") as workdir:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=workdir,
+                                env=child_environment(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        if not cumulative_us.strip().isdigit():
+            continue  # cabeçalho da saída
+        # Os filhos são listados antes do pai: guarda o primeiro nível (dois
+        # espaços de indentação) até chegar à linha do próprio `main`
+        if not name.startswith(" "):
+            if name.strip() == "main":
+                break
+            rows = []
+        elif name.startswith("  ") and not name.startswith("   "):
+            rows.append({"module": name.strip(), "cumulative_ms": round(int(cumulative_us) / 1000, 1)})
+    return sorted(rows, key=lambda r: -r["cumulative_ms"])[:limit]
+
+
+TABLE_HEADER = f"{'rodada':>6} {'1ª requisição ms':>17} {'interpretador ms':>17} {'import main ms':>15} {'servir ms':>10}"
+
+
+def format_row(label: str, row: Dict[str, Any]) -> str:
+    return (f"{label:>6} {row['first_request_ms']:>17.1f} {row['interpreter_ms']:>17.1f} "
+            f"{row['import_main_ms']:>15.1f} {row['serve_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de subida da API até a primeira requisição.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="espera máxima por rodada (s)")
+    parser.add_argument("--target", type=float, default=1.0, help="meta para a mediana da primeira requisição (s)")
+    parser.add_argument("--check", action="store_true", help="falha se a mediana passar de --target")
+    parser.add_argument("--imports", type=int, default=0, help="mostra os N imports mais lentos de main")
+    parser.add_argument("--json", dest="output", help="grava as rodadas em JSON")
+    args = parser.parse_args()
+
+    print(TABLE_HEADER)
+    print("-" * len(TABLE_HEADER))
+    rows = []
+    for run in range(1, args.runs + 1):
+        rows.append(measure_once(args.timeout))
+        print(format_row(str(run), rows[-1]), flush=True)
+    median = {key: round(statistics.median(r[key] for r in rows), 1) for key in rows[0]}
+    print("-" * len(TABLE_HEADER))
+    print(format_row("med.", median))
+
+    if args.imports:
+        print("\nImports mais lentos de main (acumulado):")
+        for row in slowest_imports(args.imports):
+            print(f"  {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"target_s": args.target, "median": median, "runs": rows}, f, indent=2)
+        print(f"\nResultados gravados em {args.output}")
+
+    within = median["first_request_ms"] <= args.target * 1000
+    print(f"\nMediana até a primeira requisição: {median['first_request_ms'] / 1000:.2f}s "
+          f"({'dentro' if within else 'acima'} da meta de {args.target:.2f}s)")
+    if args.check and not within:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
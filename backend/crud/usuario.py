@@ -3,6 +3,9 @@ from models.usuario import Usuario
 from database.models import Empresa
 from schemas.roles import UserRole
 from schemas.usuario import UsuarioUpdate
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 # 1. MAPEAMENTO DE DOMÍNIO PARA EMPRESA
 # Mapeia um domínio de e-mail para o ID da empresa no banco de dados.
@@ -42,10 +45,10 @@ def get_or_create_user(db: Session, google_id: str, email: str, nome: str):
                     db_user.empresas.append(empresa)
                     db.commit()
                     db.refresh(db_user)
-                    print(f"Novo usuário '{email}' associado automaticamente à empresa '{empresa.nome}'.")
+                    logger.info("Novo usuário associado automaticamente à empresa", extra={"email": email, "empresa": empresa.nome})
 
         except IndexError:
-            print(f"Não foi possível extrair o domínio do e-mail '{email}'.")
+            logger.warning("Não foi possível extrair o domínio do e-mail", extra={"email": email})
             pass
 
     return db_user
@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from utils.metrics import registry, gauge_lines
+from utils.timing import add_phase
 
 # --- Lógica de conexão para Produção (Cloud Run) e Desenvolvimento (Local) ---
 
@@ -41,6 +44,60 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# --- MÉTRICAS DO BANCO ---
+# Tempo que cada conexão fica emprestada do pool (do checkout ao checkin) e
+# sessões abertas por get_db; o estado do pool é lido só na hora da coleta.
+
+_connection_hold = registry.histogram(
+    "db_connection_hold_seconds", "Tempo em que uma conexão fica fora do pool."
+)
+_sessions_opened = registry.counter("db_sessions_opened_total", "Sessões de banco abertas por requisição (get_db).")
+_sessions_active = registry.gauge("db_sessions_active", "Sessões de banco abertas no momento (get_db).")
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop("checked_out_at", None)
+    if started is not None:
+        _connection_hold.observe(time.perf_counter() - started)
+
+
+# Tempo das consultas somado à fase "db" da requisição (cabeçalho Server-Timing)
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    add_phase("db", time.perf_counter() - conn.info["query_started_at"].pop())
+
+
+@event.listens_for(engine, "handle_error")
+def _on_query_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started_at"):
+        add_phase("db", time.perf_counter() - conn.info["query_started_at"].pop())
+
+
+def _collect_pool_metrics():
+    pool = engine.pool
+    samples = []
+    for field in ("size", "checkedin", "checkedout", "overflow"):
+        reader = getattr(pool, field, None)
+        if callable(reader):
+            samples.append(({"state": field}, reader()))
+    return gauge_lines("db_pool_connections", "Estado do pool de conexões (size, checkedin, checkedout, overflow).", samples)
+
+
+registry.register_collector(_collect_pool_metrics)
+
 Base = declarative_base()
 
 def create_tables():
@@ -55,7 +112,10 @@ def get_db():
     Função geradora para fornecer uma sessão de banco de dados por requisição.
     """
     db = SessionLocal()
+    _sessions_opened.inc()
+    _sessions_active.inc()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        _sessions_active.dec()
\ No newline at end of file
@@ -1,42 +1,51 @@
 import os
-import google.generativeai as genai
+import threading
 from dotenv import load_dotenv
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# O SDK do Gemini é pesado de importar: ele e a configuração só são carregados
+# na primeira vez que um modelo é pedido (ver get_gemini_model)
+_configured = False
+_configure_lock = threading.Lock()
 
 def configure_gemini():
     """
     Configura e inicializa a API do Google Gemini.
     """
     # --- Bloco de Diagnóstico ---
-    print("\n--- INICIANDO DIAGNÓSTICO DE AMBIENTE ---")
-    print(f"Diretório de trabalho atual (CWD): {os.getcwd()}")
-    
     # A função load_dotenv() retorna True se encontrou e carregou o arquivo .env
     foi_carregado = load_dotenv()
     
     if foi_carregado:
-        print("SUCESSO: O arquivo .env foi encontrado e carregado.")
+        logger.info("Arquivo .env encontrado e carregado", extra={"cwd": os.getcwd()})
     else:
-        print("AVISO: Nenhum arquivo .env foi encontrado no diretório de trabalho ou nos diretórios pais.")
-    print("-------------------------------------------\n")
+        logger.warning("Nenhum arquivo .env foi encontrado no diretório de trabalho ou nos diretórios pais", extra={"cwd": os.getcwd()})
     # --- Fim do Bloco de Diagnóstico ---
 
     google_api_key = os.getenv("GOOGLE_API_KEY")
     if not google_api_key:
         raise ValueError("A chave da API do Google não foi encontrada. Verifique se o arquivo .env está no diretório 'backend' e se a variável GOOGLE_API_KEY está definida corretamente.")
     
+    import google.generativeai as genai
     genai.configure(api_key=google_api_key)
-    print("Cliente Gemini inicializado com sucesso!")
+    logger.info("Cliente Gemini inicializado com sucesso")
 
 def get_gemini_model(model_name="gemini-2.5-pro"):
     """
     Retorna uma instância do modelo generativo do Gemini.
     """
+    global _configured
+    if not _configured:
+        with _configure_lock:
+            if not _configured:
+                configure_gemini()
+                _configured = True
+    import google.generativeai as genai
     try:
         model = genai.GenerativeModel(model_name)
         return model
     except Exception as e:
-        print(f"Erro ao obter o modelo Gemini: {e}")
+        logger.exception("Erro ao obter o modelo Gemini", extra={"model": model_name})
         raise
-
-# Configura o Gemini quando o módulo é carregado
-configure_gemini()
\ No newline at end of file
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from utils.metrics import registry
+from utils.timing import phase
+
+# --- ROTEAMENTO DE MODELOS ---
+# Nem toda chamada precisa do modelo grande. Cada requisição é classificada:
+# relatórios e pedidos de análise longos vão para o modelo "pro"; turnos
+# curtos de chat vão para o modelo rápido. Toda chamada tem um prazo; se o
+# modelo pro estoura o prazo, a mesma requisição é refeita no modelo rápido.
+# Latência, tokens, timeouts e fallbacks ficam registrados por modelo.
+#
+# Cada modelo tem o seu pool de threads. Uma chamada ao pro que estourou o
+# prazo segue ocupando a thread até a API responder; num pool compartilhado,
+# chamadas pro travadas deixariam o fallback para o rápido esperando na fila.
+#
+#   GEMINI_FAST_MAX_CONCURRENCY  chamadas simultâneas ao modelo rápido (padrão: GEMINI_MAX_CONCURRENCY ou 8)
+#   GEMINI_PRO_MAX_CONCURRENCY   chamadas simultâneas ao modelo pro (padrão 4)
+
+PRO_MODEL = os.getenv("GEMINI_PRO_MODEL", "gemini-2.5-pro")
+FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash")
+
+DEADLINES = {
+    "fast": float(os.getenv("GEMINI_FAST_DEADLINE_SECONDS", "20")),
+    "pro": float(os.getenv("GEMINI_PRO_DEADLINE_SECONDS", "90")),
+}
+MAX_CONCURRENCY = {
+    "fast": int(os.getenv("GEMINI_FAST_MAX_CONCURRENCY", os.getenv("GEMINI_MAX_CONCURRENCY", "8"))),
+    "pro": int(os.getenv("GEMINI_PRO_MAX_CONCURRENCY", "4")),
+}
+HEAVY_PROMPT_CHARS = int(os.getenv("GEMINI_HEAVY_PROMPT_CHARS", "40000"))
+_LATENCY_WINDOW = 200  # Últimas chamadas usadas nos percentis
+
+_call_duration = registry.histogram(
+    "llm_request_duration_seconds", "Duração das chamadas ao modelo, por resultado (ok, error, timeout).", ["model", "outcome"]
+)
+_tokens = registry.counter("llm_tokens_total", "Tokens de prompt e de saída por modelo.", ["model", "direction"])
+_fallbacks = registry.counter("llm_fallbacks_total", "Chamadas refeitas no modelo rápido após timeout.", ["model"])
+
+
+class ModelTimeout(Exception):
+    pass
+
+
+class _ModelMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.fallbacks = 0  # Chamadas que este modelo recebeu como fallback
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=_LATENCY_WINDOW)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "fallbacks_received": self.fallbacks,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo por requisição e aplica prazo e fallback. `models` permite
+    injetar modelos (ex.: StubModel) no lugar dos do Gemini: {"fast": m, "pro": m}.
+    """
+
+    def __init__(self, models: Optional[Dict[str, Any]] = None, model_factory: Callable[[str], Any] = None,
+                 deadlines: Optional[Dict[str, float]] = None):
+        self._models = dict(models or {})
+        self._model_factory = model_factory
+        self.model_names = {"fast": FAST_MODEL, "pro": PRO_MODEL}
+        self.deadlines = {**DEADLINES, **(deadlines or {})}
+        # Threads próprias, um pool por modelo: uma chamada que estourou o prazo
+        # continua rodando até a API responder, mas não prende a requisição, o pool
+        # padrão do FastAPI nem as chamadas (e fallbacks) do outro modelo
+        self._executors = {
+            tier: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"gemini-{tier}")
+            for tier, workers in MAX_CONCURRENCY.items()
+        }
+        self._metrics = {tier: _ModelMetrics() for tier in ("fast", "pro")}
+        self._lock = threading.Lock()
+
+    def _model(self, tier: str):
+        model = self._models.get(tier)
+        if model is None:
+            with self._lock:
+                model = self._models.get(tier)
+                if model is None:
+                    factory = self._model_factory
+                    if factory is None:
+                        from llm.gemini_client import get_gemini_model
+                        factory = get_gemini_model
+                    model = self._models[tier] = factory(self.model_names[tier])
+        return model
+
+    @staticmethod
+    def classify(kind: str, prompt: str, heavy: bool = False) -> str:
+        """'pro' para relatórios, análises pedidas explicitamente e prompts grandes; senão 'fast'."""
+        if kind == "report" or heavy or len(prompt) > HEAVY_PROMPT_CHARS:
+            return "pro"
+        return "fast"
+
+    def _call(self, tier: str, prompt: str, deadline: float):
+        metrics = self._metrics[tier]
+        started = time.perf_counter()
+        future = self._executors[tier].submit(self._model(tier).generate_content, prompt)
+        try:
+            response = future.result(timeout=deadline)
+        except FutureTimeoutError:
+            # Se ainda estava na fila do pool, não chega a ser enviada
+            future.cancel()
+            _call_duration.observe(time.perf_counter() - started, self.model_names[tier], "timeout")
+            with self._lock:
+                metrics.calls += 1
+                metrics.timeouts += 1
+            raise ModelTimeout(f"{self.model_names[tier]} excedeu o prazo de {deadline:g}s")
+        except Exception:
+            _call_duration.observe(time.perf_counter() - started, self.model_names[tier], "error")
+            with self._lock:
+                metrics.calls += 1
+                metrics.errors += 1
+            raise
+
+        elapsed = time.perf_counter() - started
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = (getattr(usage, "prompt_token_count", 0) or 0) if usage is not None else 0
+        output_tokens = (getattr(usage, "candidates_token_count", 0) or 0) if usage is not None else 0
+        _call_duration.observe(elapsed, self.model_names[tier], "ok")
+        _tokens.inc(self.model_names[tier], "prompt", amount=prompt_tokens)
+        _tokens.inc(self.model_names[tier], "output", amount=output_tokens)
+        with self._lock:
+            metrics.calls += 1
+            metrics.latencies.append(elapsed)
+            metrics.prompt_tokens += prompt_tokens
+            metrics.output_tokens += output_tokens
+        return response
+
+    def generate(self, prompt: str, kind: str = "chat", heavy: bool = False, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Gera a resposta no modelo escolhido. Retorna {'text', 'model', 'fallback'}.
+        Em timeout do modelo pro, refaz no modelo rápido; o timeout do rápido é propagado.
+        """
+        with phase("model"):
+            return self._generate(prompt, self.classify(kind, prompt, heavy), deadline)
+
+    def _generate(self, prompt: str, tier: str, deadline: Optional[float]) -> Dict[str, Any]:
+        try:
+            response = self._call(tier, prompt, deadline or self.deadlines[tier])
+            return {"text": response.text, "model": self.model_names[tier], "fallback": False}
+        except ModelTimeout:
+            if tier == "fast":
+                raise
+        _fallbacks.inc(self.model_names["fast"])
+        with self._lock:
+            self._metrics["fast"].fallbacks += 1
+        response = self._call("fast", prompt, self.deadlines["fast"])
+        return {"text": response.text, "model": self.model_names["fast"], "fallback": True}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {self.model_names[tier]: {"tier": tier, **m.snapshot()} for tier, m in self._metrics.items()}
+
+
+# --- ROTEADOR PADRÃO (COMPARTILHADO) ---
+_default_router: Optional[ModelRouter] = None
+_default_lock = threading.Lock()
+
+
+def get_default_router() -> ModelRouter:
+    """
+    Roteador único do processo, para que as métricas somem chat e relatórios.
+    Com LLM_BACKEND=stub, usa o StubModel local em vez da API do Gemini.
+    """
+    global _default_router
+    with _default_lock:
+        if _default_router is None:
+            if os.getenv("LLM_BACKEND") == "stub":
+                from llm.stub_model import StubModel
+                latency = float(os.getenv("LLM_STUB_LATENCY_SECONDS", "0"))
+                _default_router = ModelRouter(model_factory=lambda name: StubModel(name, latency_seconds=latency))
+            else:
+                _default_router = ModelRouter()
+        return _default_router
@@ -1,5 +1,10 @@
 import json
 
+from services import correlation_service
+
+# Chaves do contexto com listas de alertas no formato de get_active_triggers/get_alert_history
+ALERT_LIST_KEYS = ("active_triggers", "alert_history")
+
 class PromptBuilder:
     def __init__(self):
         self.base_prompt = """
@@ -9,8 +14,11 @@ Você é o "InfraSense AI", um especialista em análise de infraestrutura de TI
 **Contexto Fornecido:**
 - `hosts`: Lista de todos os hosts monitorados.
 - `triggers`: Lista de todos os alertas (problemas) atualmente ativos.
+- `active_triggers` / `alert_history`: Alertas já agrupados: cada grupo reúne alertas equivalentes (mesmo tipo de problema, próximos no tempo) com `count`, `host_count`, alguns `hosts` e um alerta `representative`. Trate um grupo grande como um único incidente de grande alcance.
 - `top_cpu`, `top_memory`, `top_disk`: Listas dos 5 hosts que mais consomem esses recursos.
 - `general_stats`: Um resumo estatístico do ambiente (total de hosts, itens, triggers, problemas).
+- `alert_analysis`: Pré-análise do histórico de alertas do período: `top_recurring_triggers` (problemas mais recorrentes), `severity_mix`, `alerts_by_hour_of_day`, `alerts_by_day` e `daily_trend`. Use estes números diretamente, sem recalcular.
+- `incident_stats`: MTTR/MTBF, número de incidentes e percentis de duração (em segundos) por severidade, host e trigger no período.
 - `specific_host_metrics`: Métricas detalhadas para um host específico, se a pergunta for sobre ele.
 
 **Regras para a Resposta:**
@@ -32,6 +40,7 @@ Você é o "InfraSense AI", um especialista em análise de infraestrutura de TI
 """
 
     def build_prompt(self, question: str, zabbix_context: dict) -> str:
+        zabbix_context = self._compress_alerts(zabbix_context)
         context_str = json.dumps(zabbix_context, indent=2, ensure_ascii=False)
         
         full_prompt = (
@@ -42,4 +51,42 @@ Você é o "InfraSense AI", um especialista em análise de infraestrutura de TI
             f"{question}\n\n"
             "## Sua Análise (siga as regras e a formatação definidas):\n"
         )
-        return full_prompt
\ No newline at end of file
+        return full_prompt
+
+    def build_session_prompt(self, question: str, zabbix_context: dict, summary: str = "",
+                             recent_turns: str = "", changes: dict = None) -> str:
+        """Prompt de uma sessão de chat: contexto reaproveitado + resumo e últimas mensagens da conversa."""
+        zabbix_context = self._compress_alerts(zabbix_context)
+        context_str = json.dumps(zabbix_context, indent=2, ensure_ascii=False)
+
+        parts = [
+            f"{self.base_prompt}\n\n",
+            "## Contexto de Dados do Zabbix (em formato JSON):\n",
+            f"```json\n{context_str}\n```\n\n",
+        ]
+        if changes:
+            parts.append(
+                "## Mudanças nos alertas desde a pergunta anterior:\n"
+                f"```json\n{json.dumps(changes, indent=2, ensure_ascii=False)}\n```\n\n"
+            )
+        if summary:
+            parts.append(f"## Resumo da conversa até aqui:\n{summary}\n\n")
+        if recent_turns:
+            parts.append(f"## Mensagens mais recentes da conversa:\n{recent_turns}\n\n")
+        parts.append(
+            "## Pergunta do Usuário:\n"
+            f"{question}\n\n"
+            "## Sua Análise (siga as regras e a formatação definidas; não se apresente de novo se a conversa já começou):\n"
+        )
+        return "".join(parts)
+
+    @staticmethod
+    def _compress_alerts(zabbix_context: dict) -> dict:
+        # Alertas duplicados viram grupos: o prompt não cresce com o tamanho da tempestade
+        if not isinstance(zabbix_context, dict):
+            return zabbix_context
+        compressed = dict(zabbix_context)
+        for key in ALERT_LIST_KEYS:
+            if isinstance(compressed.get(key), list):
+                compressed[key] = correlation_service.compress_alerts(compressed[key])
+        return compressed
@@ -0,0 +1,30 @@
+import time
+from types import SimpleNamespace
+
+
+class StubModel:
+    """
+    Modelo local com a mesma interface usada do GenerativeModel
+    (generate_content -> objeto com .text e .usage_metadata), para testes e
+    benchmarks sem chamar a API do Gemini. A latência é simulada com sleep.
+    """
+
+    def __init__(self, model_name: str = "stub", latency_seconds: float = 0.0, text: str = None):
+        self.model_name = model_name
+        self.latency_seconds = latency_seconds
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt: str, **kwargs):
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        text = self.text or f"## Resposta simulada ({self.model_name})\n\nPrompt com {len(prompt)} caracteres."
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                # Aproximação de ~4 caracteres por token, suficiente para as métricas
+                prompt_token_count=len(prompt) // 4,
+                candidates_token_count=len(text) // 4,
+            ),
+        )
@@ -1,75 +1,134 @@
 # 1. Importações de bibliotecas padrão e de terceiros
-import uvicorn
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from rich import print
+
+# Carrega as variáveis de ambiente do arquivo .env antes dos módulos locais,
+# que leem o ambiente (JWT_SECRET_KEY, LOG_LEVEL...) ao serem importados
+load_dotenv()
 
 # 2. Importações de módulos locais da aplicação
-from api import auth, chat, empresas, me, usuarios, zabbix
+from api import auth, chat, empresas, me, metrics, profiling, sla, trends, usuarios, zabbix
 from api.routers import reports as reports_router
 from database.connection import create_tables
+from services import anomaly_service, pdf_service, zabbix_service
+from utils import cache
+from utils.logger import RequestIdMiddleware, get_logger, setup_logging
+from utils.metrics import instrument_routes
+from utils.profiling import ProfilingMiddleware
+from utils.timing import ServerTimingMiddleware, TimedJSONResponse
 
 # --- INICIALIZAÇÃO DA APLICAÇÃO ---
+# Importar este módulo só monta a aplicação: nada de banco, disco ou rede.
+# O que precisa rodar antes da primeira requisição fica no lifespan; o cliente
+# do Gemini, a chave Fernet e o reportlab são carregados no primeiro uso.
 
-# Carrega as variáveis de ambiente do arquivo .env
-load_dotenv()
-
-# Cria as tabelas do banco de dados (especialmente útil para o SQLite local)
-create_tables()
-
-# Cria a instância principal do FastAPI
-app = FastAPI(
-    title="Zabbix Copilot API",
-    description="API para análise de dados do Zabbix com IA.",
-    version="0.1.0",
-)
-
-
-# --- CONFIGURAÇÃO DE MIDDLEWARE ---
+logger = get_logger("main")
 
 # Lista de origens permitidas para fazer requisições a esta API
 origins = [
     "http://localhost:9010",  # Endereço do contêiner do frontend
     "http://127.0.0.1:9010",
     # Quando for para produção, adicione a URL do seu frontend aqui
-    # "https://seu-frontend-em-producao.com" 
+    # "https://seu-frontend-em-producao.com"
     #"https://ipnet-msp-infra-lab.web.app"
 ]
 
-# Adiciona o middleware de CORS para permitir a comunicação entre domínios
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],  # Permite todos os métodos (POST, GET, etc.)
-    allow_headers=["*"],  # Permite todos os cabeçalhos
-)
-
-
-# --- REGISTRO DAS ROTAS (ENDPOINTS) ---
-
-app.include_router(auth.router)
-app.include_router(me.router)
-app.include_router(usuarios.router)
-app.include_router(zabbix.router)
-app.include_router(chat.router)
-app.include_router(empresas.router)
-app.include_router(reports_router.router, prefix="/api/v1")
-
-
-# --- ROTAS BÁSICAS ---
-
-@app.get("/")
-def read_root():
-    """Endpoint raiz para verificar se a API está no ar."""
-    return {"status": "ok", "message": "Bem-vindo ao Zabbix Copilot API!"}
 
-@app.get("/api/v1/status")
-def get_status():
-    """Endpoint de status para monitoramento."""
-    print("[bold green]Requisição recebida em /api/v1/status[/bold green]")
-    return {"status": "running"}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log estruturado em JSON, escrito por uma thread separada (ver utils/logger.py).
+    # Fica aqui, e não no import, para que importar `main` não inicie threads.
+    setup_logging()
+    # Cria as tabelas do banco de dados (especialmente útil para o SQLite local)
+    create_tables()
+    # Antes do yield fica só o que a primeira requisição precisa. O snapshot do
+    # cache (CACHE_SNAPSHOT_PATH) é carregado numa thread, e o poller de anomalias
+    # (opcional, só com ANOMALY_POLL_SECONDS) faz a primeira coleta depois de um intervalo
+    cache.start_snapshots()
+    anomaly_service.start_poller()
+    # Cassete das chamadas ao Zabbix, se ZABBIX_CASSETTE_RECORD estiver definido (um arquivo por processo)
+    zabbix_service.start_recording_from_env()
+    logger.info("Aplicação pronta para receber requisições")
+    yield
+    zabbix_service.stop_recording()
+    anomaly_service.stop_poller()
+    cache.stop_snapshots()
+    # Encerra os processos de renderização de PDF, se algum foi criado
+    pdf_service.shutdown_executor()
+
+
+def create_app() -> FastAPI:
+    """Monta a aplicação: middlewares, rotas e instrumentação."""
+    app = FastAPI(
+        title="Zabbix Copilot API",
+        description="API para análise de dados do Zabbix com IA.",
+        version="0.1.0",
+        default_response_class=TimedJSONResponse,
+        lifespan=lifespan,
+    )
+
+    # --- CONFIGURAÇÃO DE MIDDLEWARE ---
+
+    # Adiciona o middleware de CORS para permitir a comunicação entre domínios
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],  # Permite todos os métodos (POST, GET, etc.)
+        allow_headers=["*"],  # Permite todos os cabeçalhos
+        expose_headers=["X-Request-ID", "Server-Timing"],
+    )
+
+    # Tempo por fase (jwt, db, fernet, zabbix, model, serialize) no cabeçalho
+    # Server-Timing e no log das requisições lentas (ver utils/timing.py)
+    app.add_middleware(ServerTimingMiddleware)
+
+    # Marca início e fim das requisições para as capturas de CPU sob demanda
+    # (/admin/profiling); sem captura ativa não faz nada
+    app.add_middleware(ProfilingMiddleware)
+
+    # Id de correlação por requisição (X-Request-ID), incluído em todos os logs.
+    # Adicionado por último para ficar por fora e valer também no log de lentidão.
+    app.add_middleware(RequestIdMiddleware)
+
+    # --- REGISTRO DAS ROTAS (ENDPOINTS) ---
+
+    app.include_router(auth.router)
+    app.include_router(me.router)
+    app.include_router(usuarios.router)
+    app.include_router(zabbix.router)
+    app.include_router(sla.router)
+    app.include_router(trends.router)
+    app.include_router(chat.router)
+    app.include_router(empresas.router)
+    app.include_router(reports_router.router, prefix="/api/v1")
+    app.include_router(metrics.router)
+    app.include_router(profiling.router)
+
+    # --- ROTAS BÁSICAS ---
+
+    @app.get("/")
+    def read_root():
+        """Endpoint raiz para verificar se a API está no ar."""
+        return {"status": "ok", "message": "Bem-vindo ao Zabbix Copilot API!"}
+
+    @app.get("/api/v1/status")
+    def get_status():
+        """Endpoint de status para monitoramento."""
+        logger.debug("Requisição recebida em /api/v1/status")
+        return {"status": "running"}
+
+    # Requisições em andamento e duração por rota, expostas em /metrics.
+    # Fica depois de todas as rotas para alcançar cada uma delas.
+    instrument_routes(app)
+
+    return app
+
+
+app = create_app()
 
 
 # --- EXECUÇÃO PARA DESENVOLVIMENTO LOCAL ---
@@ -77,5 +136,7 @@ def get_status():
 if __name__ == "__main__":
     # Este bloco só é executado quando você roda o script diretamente (ex: `python main.py`)
     # O Docker NÃO usa este bloco. Ele usa o comando do Dockerfile.
-    print("[bold yellow]Iniciando o servidor FastAPI para desenvolvimento local...[/bold yellow]")
-    uvicorn.run("main:app", host="0.0.0.0", port=8002, reload=True)
\ No newline at end of file
+    import uvicorn
+    setup_logging()
+    logger.info("Iniciando o servidor FastAPI para desenvolvimento local...")
+    uvicorn.run("main:app", host="0.0.0.0", port=8002, reload=True)
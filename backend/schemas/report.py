@@ -12,6 +12,7 @@ class ReportResponse(BaseModel):
     host_info: Dict[str, Any]
     metrics: Dict[str, Any]
     triggers: Dict[str, Any]
+    event_summary: Dict[str, Any]
     generated_at: str
     period_analyzed: str
     user_query: str
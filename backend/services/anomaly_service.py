@@ -0,0 +1,339 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from crud.empresa import get_empresas
+from database.connection import SessionLocal
+from services import zabbix_cassette, zabbix_service
+from utils.logger import get_logger
+from utils.security import descriptografar_token
+
+logger = get_logger(__name__)
+
+# --- DETECÇÃO DE ANOMALIAS EM STREAMING ---
+# Cada série (host, métrica) ocupa um slot em arrays numpy compactos com a
+# média e a variância exponenciais (EWMA) e o último instante visto. Uma nova
+# amostra atualiza o seu slot em tempo constante: o z-score é calculado contra
+# o estado anterior e em seguida o estado é atualizado. Não se guarda janela
+# de amostras, então o custo por série é fixo e o detector cobre todos os itens
+# do tenant. A alimentação vem dos mesmos itens de CPU, memória e rede usados
+# por get_key_metrics (lastvalue/lastclock) e, no aquecimento, do history.get.
+#
+# Um poller em segundo plano (start_poller, no lifespan) pode observar todas
+# as empresas a cada ANOMALY_POLL_SECONDS, para que o estado avance mesmo sem
+# ninguém consultando /metrics/anomalies. Ele é opcional e vem desligado (0):
+# cada worker e cada instância teria o seu poller, multiplicando a carga no
+# Zabbix e o estado dos detectores. Ligue em um único processo (ex.: um worker
+# dedicado ou uma instância com mínimo de 1); nos demais, só as consultas alimentam.
+#
+# O aquecimento é limitado: os itens vão em lotes de WARMUP_BATCH_ITEMS, cada
+# lote traz no máximo WARMUP_POINTS_PER_ITEM pontos por item (os mais novos)
+# e os lotes param depois de WARMUP_MAX_SECONDS; as séries que ficarem de fora
+# aquecem com as coletas ao vivo.
+
+EWMA_ALPHA = 0.05
+Z_THRESHOLD = 3.5
+MIN_SAMPLES = 30  # Amostras antes de um slot poder sinalizar anomalia
+WARMUP_SECONDS = 3600
+WARMUP_BATCH_ITEMS = 100
+WARMUP_POINTS_PER_ITEM = MIN_SAMPLES * 4
+WARMUP_MAX_SECONDS = float(os.getenv("ANOMALY_WARMUP_MAX_SECONDS", "15"))
+ANOMALY_POLL_SECONDS = float(os.getenv("ANOMALY_POLL_SECONDS", "0"))
+MAX_RECENT_ANOMALIES = 500
+_INITIAL_CAPACITY = 256
+
+METRIC_KEY_PREFIXES = ("system.cpu.util", "vm.memory.utilization", "vm.memory.size[pavailable]", "net.if.in[", "net.if.out[")
+
+
+class AnomalyDetector:
+    """Estado EWMA por (host, métrica) em arrays, com atualização O(1) por amostra."""
+
+    def __init__(self, alpha: float = EWMA_ALPHA, z_threshold: float = Z_THRESHOLD, min_samples: int = MIN_SAMPLES):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_samples = min_samples
+        self._slots: Dict[Tuple[str, str], int] = {}
+        self._labels: List[Dict[str, Any]] = []
+        self.mean = np.zeros(_INITIAL_CAPACITY)
+        self.var = np.zeros(_INITIAL_CAPACITY)
+        self.count = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self.last_clock = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self.last_value = np.zeros(_INITIAL_CAPACITY)
+        self.last_z = np.zeros(_INITIAL_CAPACITY)
+        self.last_expected = np.zeros(_INITIAL_CAPACITY)  # Média antes da última amostra
+        self.recent = deque(maxlen=MAX_RECENT_ANOMALIES)
+        self._lock = threading.Lock()
+        self.warmup_lock = threading.Lock()
+        self.warmed_up = False
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self, needed: int):
+        capacity = self.mean.size
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name in ("mean", "var", "count", "last_clock", "last_value", "last_z", "last_expected"):
+            old = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=old.dtype)
+            grown[:capacity] = old
+            setattr(self, name, grown)
+
+    def _slot(self, hostid: str, metric: str, label: Dict[str, Any]) -> int:
+        slot = self._slots.get((hostid, metric))
+        if slot is None:
+            slot = self._slots[(hostid, metric)] = len(self._labels)
+            self._grow(slot + 1)
+            self._labels.append({"hostid": hostid, "metric": metric, **label})
+        return slot
+
+    def _apply(self, slots: np.ndarray, values: np.ndarray, clocks: np.ndarray) -> np.ndarray:
+        """Atualiza os slots (únicos) com uma amostra cada. Retorna os z-scores calculados."""
+        fresh = clocks > self.last_clock[slots]  # Ignora amostras já vistas (lastvalue repetido)
+        slots, values, clocks = slots[fresh], values[fresh], clocks[fresh]
+
+        mean, var, count = self.mean[slots], self.var[slots], self.count[slots]
+        delta = values - mean
+        std = np.sqrt(var)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where((count >= self.min_samples) & (std > 1e-9), delta / std, 0.0)
+
+        first = count == 0
+        self.mean[slots] = np.where(first, values, mean + self.alpha * delta)
+        self.var[slots] = np.where(first, 0.0, (1 - self.alpha) * (var + self.alpha * delta * delta))
+        self.count[slots] = count + 1
+        self.last_clock[slots] = clocks
+        self.last_value[slots] = values
+        self.last_z[slots] = z
+        self.last_expected[slots] = mean
+
+        for i in np.flatnonzero(np.abs(z) >= self.z_threshold):
+            slot = int(slots[i])
+            self.recent.append({
+                **self._labels[slot],
+                "clock": int(clocks[i]),
+                "value": float(values[i]),
+                "expected": round(float(mean[i]), 4),
+                "zscore": round(float(z[i]), 2),
+            })
+        return z
+
+    def update(self, hostid: str, metric: str, value: float, clock: int, **label) -> float:
+        """Uma amostra de uma série; devolve o z-score em relação ao estado anterior."""
+        with self._lock:
+            slot = self._slot(hostid, metric, label)
+            z = self._apply(np.array([slot]), np.array([float(value)]), np.array([int(clock)]))
+            return float(z[0]) if z.size else 0.0
+
+    def update_many(self, samples: List[Tuple[str, str, float, int, Dict[str, Any]]]) -> int:
+        """
+        Lote de amostras (hostid, métrica, valor, clock, rótulo) aplicado de forma
+        vetorizada. Amostras da mesma série são aplicadas em ordem de clock.
+        Retorna quantas amostras novas foram aplicadas.
+        """
+        if not samples:
+            return 0
+        with self._lock:
+            slots = np.fromiter((self._slot(h, m, label) for h, m, _, _, label in samples), dtype=np.int64, count=len(samples))
+            values = np.fromiter((float(s[2]) for s in samples), dtype=np.float64, count=len(samples))
+            clocks = np.fromiter((int(s[3]) for s in samples), dtype=np.int64, count=len(samples))
+
+            # Cada rodada aplica no máximo uma amostra por slot (ordem de clock preservada)
+            order = np.lexsort((clocks, slots))
+            slots, values, clocks = slots[order], values[order], clocks[order]
+            is_first = np.empty(slots.size, dtype=bool)
+            is_first[0] = True
+            is_first[1:] = slots[1:] != slots[:-1]
+            group_start = np.maximum.accumulate(np.where(is_first, np.arange(slots.size), 0))
+            rank = np.arange(slots.size) - group_start
+
+            applied = 0
+            for r in range(int(rank.max()) + 1):
+                sel = rank == r
+                applied += self._apply(slots[sel], values[sel], clocks[sel]).size
+            return applied
+
+    def current_anomalies(self, max_age: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Séries cuja última amostra está fora do padrão, da maior para a menor |z|."""
+        with self._lock:
+            n = len(self._labels)
+            z = self.last_z[:n]
+            hits = np.abs(z) >= self.z_threshold
+            if max_age is not None:
+                hits &= self.last_clock[:n] >= int(time.time()) - max_age
+            idx = np.flatnonzero(hits)
+            idx = idx[np.argsort(-np.abs(z[idx]), kind="stable")]
+            return [{
+                **self._labels[i],
+                "value": float(self.last_value[i]),
+                "expected": round(float(self.last_expected[i]), 4),
+                "zscore": round(float(z[i]), 2),
+                "clock": int(self.last_clock[i]),
+            } for i in idx]
+
+    def recent_anomalies(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.recent)[-limit:][::-1]
+
+
+# --- REGISTRO POR TENANT ---
+_detectors: Dict[str, AnomalyDetector] = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(tenant_key: str) -> AnomalyDetector:
+    with _detectors_lock:
+        detector = _detectors.get(tenant_key)
+        if detector is None:
+            detector = _detectors[tenant_key] = AnomalyDetector()
+        return detector
+
+
+# --- ALIMENTAÇÃO A PARTIR DO ZABBIX ---
+
+def get_metric_items(api_url: str, token: str) -> List[Dict[str, Any]]:
+    """Itens de CPU, memória e rede do tenant com o último valor (mesmas chaves de get_key_metrics)."""
+    items = zabbix_service.call_zabbix_api(api_url, token, "item.get", {
+        "output": ["itemid", "key_", "lastvalue", "lastclock", "value_type"],
+        "selectHosts": ["hostid", "name"],
+        "monitored": True,
+        "search": {"key_": list(METRIC_KEY_PREFIXES)},
+        "searchByAny": True,
+    }, ttl_seconds=30)
+    return [
+        item for item in items
+        if item.get('hosts') and item['key_'].startswith(METRIC_KEY_PREFIXES)
+        and not ('net.if.' in item['key_'] and 'lo' in item['key_'])
+    ]
+
+
+def _label(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {"host": item['hosts'][0]['name'], "itemid": item['itemid']}
+
+
+def _warm_up(api_url: str, token: str, detector: AnomalyDetector, items: List[Dict[str, Any]]):
+    """Aquece o estado com o histórico recente, para não esperar MIN_SAMPLES coletas ao vivo."""
+    started = time.monotonic()
+    time_till = int(time.time())
+    by_item = {item['itemid']: item for item in items}
+    by_type: Dict[str, List[str]] = {}
+    for item in items:
+        by_type.setdefault(item.get('value_type', '0'), []).append(item['itemid'])
+
+    batches = [(value_type, itemids[i:i + WARMUP_BATCH_ITEMS])
+               for value_type, itemids in by_type.items() if value_type in ("0", "3")  # Apenas numéricos (float e inteiro)
+               for i in range(0, len(itemids), WARMUP_BATCH_ITEMS)]
+    for done, (value_type, itemids) in enumerate(batches):
+        if time.monotonic() - started > WARMUP_MAX_SECONDS:
+            logger.warning("Aquecimento do detector de anomalias interrompido pelo limite de tempo", extra={
+                "batches_done": done, "batches_total": len(batches), "max_seconds": WARMUP_MAX_SECONDS,
+            })
+            break
+        # Os mais novos primeiro, para o limite cortar o começo da janela e não o fim
+        history = zabbix_service.call_zabbix_api(api_url, token, "history.get", {
+            "output": ["itemid", "clock", "value"], "history": int(value_type), "itemids": itemids,
+            "time_from": time_till - WARMUP_SECONDS, "time_till": time_till,
+            "sortfield": "clock", "sortorder": "DESC", "limit": len(itemids) * WARMUP_POINTS_PER_ITEM,
+        })
+        samples = []
+        for point in history:
+            item = by_item[point['itemid']]
+            samples.append((item['hosts'][0]['hostid'], item['key_'], point['value'], point['clock'], _label(item)))
+        detector.update_many(samples)
+
+
+def observe_tenant(api_url: str, token: str) -> AnomalyDetector:
+    """Coleta os últimos valores do tenant e os aplica ao detector (aquecendo-o na primeira vez)."""
+    detector = get_detector(api_url)
+    items = get_metric_items(api_url, token)
+    if not detector.warmed_up:
+        # Poller e requisições podem chegar juntos: só um aquece
+        with detector.warmup_lock:
+            if not detector.warmed_up:
+                _warm_up(api_url, token, detector, items)
+                detector.warmed_up = True
+
+    samples = []
+    for item in items:
+        try:
+            value = float(item.get('lastvalue'))
+        except (TypeError, ValueError):
+            continue
+        if int(item.get('lastclock') or 0) > 0:
+            samples.append((item['hosts'][0]['hostid'], item['key_'], value, item['lastclock'], _label(item)))
+    detector.update_many(samples)
+    return detector
+
+
+# --- POLLER EM SEGUNDO PLANO ---
+
+_poller_stop = threading.Event()
+_poller_thread: Optional[threading.Thread] = None
+
+
+def _tenant_credentials() -> List[Tuple[str, str]]:
+    """(api_url, token) de cada empresa, sem repetir o mesmo Zabbix."""
+    db = SessionLocal()
+    try:
+        empresas = get_empresas(db)
+        tenants = {}
+        for empresa in empresas:
+            if empresa.url_zabbix and empresa.url_zabbix not in tenants:
+                tenants[empresa.url_zabbix] = descriptografar_token(empresa.token_zabbix_criptografado)
+        return list(tenants.items())
+    finally:
+        db.close()
+
+
+def _poll_loop(interval: float):
+    # A primeira coleta espera um intervalo: logo após a subida, a CPU é das primeiras requisições
+    while not _poller_stop.wait(interval):
+        try:
+            tenants = _tenant_credentials()
+        except Exception:
+            logger.exception("Falha ao listar as empresas para o detector de anomalias")
+            tenants = []
+        for api_url, token in tenants:
+            if _poller_stop.is_set():
+                return
+            try:
+                observe_tenant(api_url, token)
+            except Exception as e:
+                logger.warning("Falha ao coletar métricas para o detector de anomalias", extra={
+                    "tenant": zabbix_cassette.redact_url(api_url), "error": str(e),
+                })
+
+
+def start_poller(interval: float = None):
+    """Passa a alimentar os detectores de todas as empresas a cada `interval` segundos (0 desliga)."""
+    global _poller_thread
+    interval = ANOMALY_POLL_SECONDS if interval is None else interval
+    if interval <= 0 or _poller_thread is not None:
+        return
+    _poller_stop.clear()
+    _poller_thread = threading.Thread(target=_poll_loop, args=(interval,), name="anomaly-poller", daemon=True)
+    _poller_thread.start()
+
+
+def stop_poller():
+    global _poller_thread
+    if _poller_thread is None:
+        return
+    _poller_stop.set()
+    _poller_thread.join(timeout=10)
+    _poller_thread = None
+
+
+def get_anomalies(api_url: str, token: str, limit: int = 100) -> Dict[str, Any]:
+    detector = observe_tenant(api_url, token)
+    return {
+        "series": len(detector),
+        "z_threshold": detector.z_threshold,
+        "anomalies": detector.current_anomalies(max_age=WARMUP_SECONDS)[:limit],
+        "recent": detector.recent_anomalies(limit),
+    }
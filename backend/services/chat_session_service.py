@@ -0,0 +1,229 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from llm.model_router import ModelRouter, get_default_router
+from llm.prompts import PromptBuilder
+from services import zabbix_service, intent_service
+from services.live_updates import compute_diff
+
+# --- SESSÕES DE CHAT ---
+# Uma sessão guarda, em memória, o contexto do Zabbix montado na primeira
+# pergunta e o histórico da conversa. Perguntas seguintes reaproveitam esse
+# contexto: os triggers ativos são atualizados por diferença (só o que entrou
+# ou saiu) e o contexto completo só é remontado de tempos em tempos. O
+# histórico fica limitado: as últimas trocas vão literais no prompt e as mais
+# antigas são condensadas num resumo que rola junto com a conversa. O resumo
+# é feito em segundo plano, depois da resposta: enquanto ele não fica pronto,
+# as mensagens antigas continuam indo literais no prompt.
+
+SESSION_IDLE_TTL = 60 * 60
+TRIGGERS_REFRESH_SECONDS = 30  # Igual ao TTL de get_active_triggers
+FULL_CONTEXT_REFRESH_SECONDS = 15 * 60
+MAX_RECENT_TURNS = 6  # Mensagens (pergunta ou resposta) mantidas literalmente
+SUMMARY_BATCH_TURNS = 4  # Mensagens excedentes acumuladas antes de cada chamada de resumo
+MAX_TURN_CHARS = 1500  # Respostas longas entram truncadas no histórico do prompt
+SUMMARY_MAX_CHARS = 2000
+MAX_SESSIONS = 1000
+SUMMARY_WORKERS = 2
+
+_SUMMARY_PROMPT = """Você mantém o resumo de uma conversa entre um administrador de sistemas e o assistente "InfraSense AI" sobre o ambiente Zabbix.
+Atualize o resumo abaixo incorporando as novas mensagens. Preserve hosts, problemas, números e conclusões citados; descarte cumprimentos e formatação.
+Responda apenas com o novo resumo, em português, com no máximo {max_chars} caracteres.
+
+## Resumo atual:
+{summary}
+
+## Novas mensagens:
+{messages}
+"""
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + " [...]"
+
+
+class ChatSession:
+    def __init__(self, empresa_id: int, user_id: int, api_url: str, token: str):
+        self.id = uuid.uuid4().hex
+        self.empresa_id = empresa_id
+        self.user_id = user_id
+        self.api_url = api_url
+        self.token = token
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.context: Optional[Dict[str, Any]] = None
+        self.context_built_at = 0.0
+        self.triggers_refreshed_at = 0.0
+        self.triggers: Dict[str, Dict[str, Any]] = {}
+        self.summary = ""
+        self.turns: List[Dict[str, str]] = []
+        self.summarizing = False
+        self.messages = 0
+        # Mensagens da mesma sessão são processadas uma por vez
+        self.lock = threading.Lock()
+
+    # --- CONTEXTO ---
+
+    def _set_triggers(self, triggers: List[Dict[str, Any]]):
+        self.triggers = {str(t['triggerid']): t for t in triggers}
+        self.context["active_triggers"] = triggers
+        self.triggers_refreshed_at = time.time()
+
+    def refresh_context(self) -> Optional[Dict[str, Any]]:
+        """
+        Garante um contexto atual e devolve as mudanças de triggers desde a
+        pergunta anterior (None quando não houve atualização por diferença).
+        """
+        now = time.time()
+        if self.context is None or now - self.context_built_at > FULL_CONTEXT_REFRESH_SECONDS:
+            self.context = zabbix_service.get_full_zabbix_context(self.api_url, self.token)
+            self.context_built_at = now
+            self._set_triggers(self.context.get("active_triggers", []))
+            return None
+
+        if now - self.triggers_refreshed_at <= TRIGGERS_REFRESH_SECONDS:
+            return None
+        current = zabbix_service.get_active_triggers(self.api_url, self.token)
+        diff = compute_diff(self.triggers, {str(t['triggerid']): t for t in current})
+        resolved = [self.triggers[tid] for tid in diff["removed"]]
+        self._set_triggers(current)
+        self.context["general_stats"] = {**self.context.get("general_stats", {}), "active_problems": len(current)}
+        if not (diff["added"] or resolved):
+            return None
+        return {
+            "novos_problemas": [
+                {"description": t.get('description'), "priority": t.get('priority'), "hosts": [h.get('name') for h in t.get('hosts', [])]}
+                for t in diff["added"]
+            ],
+            "problemas_resolvidos": [t.get('description') for t in resolved],
+        }
+
+    # --- HISTÓRICO ---
+
+    def add_turn(self, role: str, text: str):
+        self.turns.append({"role": role, "text": _truncate(text, MAX_TURN_CHARS)})
+        self.messages += 1
+
+    def overflow(self) -> List[Dict[str, str]]:
+        """
+        Mensagens que passaram do limite do histórico literal, a resumir. Elas só
+        saem de `turns` quando o resumo fica pronto (apply_summary); com um resumo
+        já em andamento, espera a próxima pergunta.
+        """
+        if self.summarizing or len(self.turns) <= MAX_RECENT_TURNS + SUMMARY_BATCH_TURNS:
+            return []
+        self.summarizing = True
+        return self.turns[:-MAX_RECENT_TURNS]
+
+    def apply_summary(self, summary: str, summarized: int):
+        """Troca as `summarized` mensagens mais antigas pelo novo resumo (chamado com `lock`)."""
+        self.summary = summary[-SUMMARY_MAX_CHARS:]
+        # Mensagens novas só entram no fim, então as resumidas continuam no começo
+        self.turns = self.turns[summarized:]
+        self.summarizing = False
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "empresa_id": self.empresa_id,
+            "created_at": int(self.created_at),
+            "last_used": int(self.last_used),
+            "messages": self.messages,
+            "context_age_seconds": int(time.time() - self.context_built_at) if self.context else None,
+            "summary": self.summary,
+            "recent_turns": self.turns,
+        }
+
+
+def _format_turns(turns: List[Dict[str, str]]) -> str:
+    return "\n\n".join(f"{'Usuário' if t['role'] == 'user' else 'InfraSense AI'}: {t['text']}" for t in turns)
+
+
+class ChatSessionManager:
+    def __init__(self, router: ModelRouter = None, prompt_builder: PromptBuilder = None):
+        self._sessions: Dict[str, ChatSession] = {}
+        self._lock = threading.Lock()
+        # Resumos rodam fora da requisição, sem atrasar a resposta ao usuário
+        self._summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="chat-summary")
+        self._router = router
+        self.prompt_builder = prompt_builder or PromptBuilder()
+
+    @property
+    def router(self) -> ModelRouter:
+        return self._router or get_default_router()
+
+    def _expire(self):
+        cutoff = time.time() - SESSION_IDLE_TTL
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+            del self._sessions[session_id]
+        # Limite de memória: descarta as sessões ociosas há mais tempo
+        if len(self._sessions) > MAX_SESSIONS:
+            for session in sorted(self._sessions.values(), key=lambda s: s.last_used)[:len(self._sessions) - MAX_SESSIONS]:
+                del self._sessions[session.id]
+
+    def create(self, empresa_id: int, user_id: int, api_url: str, token: str) -> ChatSession:
+        session = ChatSession(empresa_id, user_id, api_url, token)
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str, user_id: int) -> Optional[ChatSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        return session
+
+    def delete(self, session_id: str, user_id: int) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.user_id != user_id:
+                return False
+            del self._sessions[session_id]
+            return True
+
+    def _summarize(self, session: ChatSession, old_turns: List[Dict[str, str]]):
+        """Incorpora as mensagens antigas ao resumo da sessão (modelo rápido, com fallback extrativo)."""
+        prompt = _SUMMARY_PROMPT.format(
+            max_chars=SUMMARY_MAX_CHARS, summary=session.summary or "(vazio)", messages=_format_turns(old_turns)
+        )
+        try:
+            summary = self.router.generate(prompt, kind="chat")["text"]
+        except Exception:
+            # Sem o modelo, guarda só o início de cada mensagem antiga
+            summary = "\n".join(filter(None, [session.summary] + [
+                f"- {t['role']}: {_truncate(t['text'], 200)}" for t in old_turns
+            ]))
+        with session.lock:
+            session.apply_summary(summary, len(old_turns))
+
+    def ask(self, session: ChatSession, question: str) -> Dict[str, Any]:
+        with session.lock:
+            session.last_used = time.time()
+
+            quick_answer = intent_service.answer(question, session.api_url, session.token)
+            if quick_answer is not None:
+                result = quick_answer
+            else:
+                changes = session.refresh_context()
+                prompt = self.prompt_builder.build_session_prompt(
+                    question, session.context, summary=session.summary,
+                    recent_turns=_format_turns(session.turns), changes=changes
+                )
+                response = self.router.generate(prompt, kind="chat", heavy=intent_service.is_open_ended(question))
+                result = {"response": response["text"], "model": response["model"]}
+
+            session.add_turn("user", question)
+            session.add_turn("assistant", result["response"])
+            old_turns = session.overflow()
+            if old_turns:
+                self._summary_executor.submit(self._summarize, session, old_turns)
+            return {**result, "session_id": session.id}
+
+
+manager = ChatSessionManager()
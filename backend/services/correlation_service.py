@@ -0,0 +1,110 @@
+import hashlib
+import re
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable
+
+# --- CORRELAÇÃO DE EVENTOS / AGRUPAMENTO DE TEMPESTADES ---
+# Em uma queda, centenas de problemas quase idênticos chegam juntos (o mesmo
+# trigger de template em vários hosts, ou o mesmo texto com números
+# diferentes). Cada alerta recebe uma assinatura: a descrição normalizada
+# (nome do host, IPs, números e identificadores trocados por marcadores)
+# com hash. Alertas com a mesma assinatura são ordenados pelo horário e
+# partidos em grupos sempre que o intervalo entre dois alertas passa da
+# janela. O resultado tem tamanho proporcional ao número de grupos, não ao
+# número de alertas duplicados.
+
+DEFAULT_WINDOW_SECONDS = 15 * 60
+DEFAULT_MAX_GROUPS = 50
+MAX_HOSTS_PER_GROUP = 5
+
+_IP_RE = re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b")
+_HEX_RE = re.compile(r"\b(?:0x)?[0-9a-f]{8,}\b")
+_QUOTED_RE = re.compile(r"(\"[^\"]*\"|'[^']*')")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_description(description: str, host_names: Iterable[str] = ()) -> str:
+    """Descrição sem as partes que variam entre alertas do mesmo tipo."""
+    text = (description or "").lower()
+    for name in sorted({n.lower() for n in host_names if n}, key=len, reverse=True):
+        text = text.replace(name, "<host>")
+    text = _IP_RE.sub("<ip>", text)
+    text = _HEX_RE.sub("<id>", text)
+    text = _QUOTED_RE.sub("<str>", text)
+    text = _NUMBER_RE.sub("#", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def alert_signature(alert: Dict[str, Any]) -> str:
+    host_names = [h.get('name', '') for h in alert.get('hosts') or []]
+    normalized = normalize_description(alert.get('description'), host_names)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _clock(alert: Dict[str, Any]) -> int:
+    return int(alert.get('lastchange') or alert.get('clock') or 0)
+
+
+def group_alerts(alerts: List[Dict[str, Any]], window_seconds: int = DEFAULT_WINDOW_SECONDS) -> List[Dict[str, Any]]:
+    """
+    Agrupa alertas no formato de get_active_triggers/get_alert_history
+    (description, priority, hosts, lastchange). Grupos maiores primeiro.
+    """
+    by_signature: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for alert in alerts:
+        by_signature[alert_signature(alert)].append(alert)
+
+    groups = []
+    for signature, members in by_signature.items():
+        members.sort(key=_clock)
+        session = [members[0]]
+        for alert in members[1:]:
+            if _clock(alert) - _clock(session[-1]) > window_seconds:
+                groups.append(_summarize_group(signature, session))
+                session = []
+            session.append(alert)
+        groups.append(_summarize_group(signature, session))
+
+    groups.sort(key=lambda g: (-g["count"], -g["max_priority"], -g["last_clock"]))
+    return groups
+
+
+def _summarize_group(signature: str, members: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Representante: o alerta mais grave e, entre eles, o mais recente
+    representative = max(members, key=lambda a: (int(a.get('priority') or 0), _clock(a)))
+    hosts = {}
+    for alert in members:
+        for host in alert.get('hosts') or []:
+            hosts.setdefault(host.get('name'), None)
+    return {
+        "signature": signature,
+        "count": len(members),
+        "host_count": len(hosts),
+        "hosts": list(hosts)[:MAX_HOSTS_PER_GROUP],
+        "max_priority": max(int(a.get('priority') or 0) for a in members),
+        "first_clock": _clock(members[0]),
+        "last_clock": _clock(members[-1]),
+        "representative": {
+            "triggerid": representative.get('triggerid'),
+            "description": representative.get('description'),
+            "priority": representative.get('priority'),
+            "hosts": [h.get('name') for h in representative.get('hosts') or []],
+            "lastchange": representative.get('lastchange'),
+        },
+    }
+
+
+def compress_alerts(alerts: List[Dict[str, Any]], window_seconds: int = DEFAULT_WINDOW_SECONDS,
+                    max_groups: int = DEFAULT_MAX_GROUPS) -> Dict[str, Any]:
+    """Visão compacta dos alertas: no máximo `max_groups` grupos, com o restante apenas contado."""
+    groups = group_alerts(alerts, window_seconds)
+    shown, omitted = groups[:max_groups], groups[max_groups:]
+    return {
+        "total_alerts": len(alerts),
+        "total_groups": len(groups),
+        "storms": sum(1 for g in groups if g["count"] > 1),
+        "groups": shown,
+        "omitted_groups": len(omitted),
+        "omitted_alerts": sum(g["count"] for g in omitted),
+    }
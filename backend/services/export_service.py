@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, List, Dict, Any
+
+from services import zabbix_service
+
+# --- EXPORTAÇÕES EM STREAMING (NDJSON / CSV) ---
+# Cada exportação é um pipeline de geradores: fonte paginada do Zabbix ->
+# formatação da linha -> serialização. Nada é materializado por completo, então
+# exportar centenas de milhares de eventos usa memória constante.
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+INVENTORY_COLUMNS = [
+    "hostid", "host", "name", "status", "available", "ip", "groups", "templates",
+    "tags", "item_count", "active_problems", "os_full", "model", "vendor", "location", "contact"
+]
+EVENT_COLUMNS = ["eventid", "clock", "time", "host", "description", "priority", "status"]
+ALERT_COLUMNS = ["triggerid", "clock", "time", "hosts", "description", "priority"]
+
+
+def _iso(clock) -> str:
+    return datetime.fromtimestamp(int(clock)).isoformat()
+
+
+# --- FONTES + FORMATAÇÃO DE LINHAS ---
+
+def iter_inventory_rows(api_url: str, token: str, filter_text: str = None) -> Iterator[Dict[str, Any]]:
+    # O inventário já vem do host.get em cache (uma linha por host); aqui só se achata cada host.
+    for host in zabbix_service.get_company_inventory(api_url, token, filter_text=filter_text, include_heavy=True):
+        inv = host.get('inventory') or {}
+        yield {
+            "hostid": host.get('hostid'),
+            "host": host.get('host'),
+            "name": host.get('name'),
+            "status": host.get('status'),
+            "available": host.get('available'),
+            "ip": ", ".join(i.get('ip') for i in (host.get('interfaces') or []) if i.get('ip')),
+            "groups": "; ".join(host.get('groups', [])),
+            "templates": "; ".join(host.get('templates', [])),
+            "tags": "; ".join(host.get('tags', [])),
+            "item_count": host.get('item_count'),
+            "active_problems": host.get('active_problems'),
+            "os_full": inv.get('os_full', ''),
+            "model": inv.get('model', ''),
+            "vendor": inv.get('vendor', ''),
+            "location": inv.get('location', ''),
+            "contact": inv.get('contact', ''),
+        }
+
+
+def iter_event_rows(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None) -> Iterator[Dict[str, Any]]:
+    for event in zabbix_service.iter_events(api_url, token, time_from, time_till, hostids=hostids):
+        entry = zabbix_service.format_event_log_entry(event)
+        if entry is None:
+            continue
+        entry["clock"] = event.get('clock')
+        entry["time"] = _iso(event.get('clock'))
+        yield entry
+
+
+def iter_alert_rows(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None) -> Iterator[Dict[str, Any]]:
+    for alert in zabbix_service.iter_alert_history(api_url, token, time_from, time_till, hostids=hostids):
+        yield {
+            "triggerid": alert["triggerid"],
+            "clock": alert["lastchange"],
+            "time": _iso(alert["lastchange"]),
+            "hosts": ", ".join(h.get('name', '') for h in alert.get("hosts", [])),
+            "description": alert["description"],
+            "priority": alert["priority"],
+        }
+
+
+# --- SERIALIZAÇÃO ---
+
+def to_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def to_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    # Um único buffer pequeno é reaproveitado: cada linha é escrita, lida e descartada.
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def serialize(rows: Iterable[Dict[str, Any]], export_format: str, columns: List[str]) -> Iterator[bytes]:
+    if export_format == "csv":
+        return to_csv(rows, columns)
+    return to_ndjson(rows)
+
+
+def prime(generator: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Consome o primeiro bloco antes de a resposta começar, para que erros da
+    primeira página do Zabbix virem um HTTP 400 normal e não uma conexão cortada.
+    """
+    try:
+        first = next(generator)
+    except StopIteration:
+        return iter(())
+
+    def chained():
+        yield first
+        yield from generator
+    return chained()
+
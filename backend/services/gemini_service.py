@@ -1,16 +1,21 @@
 import re
-import traceback
 import json
-from llm.gemini_client import get_gemini_model
+import time
+from llm.model_router import ModelRouter, get_default_router
 from llm.prompts import PromptBuilder
 from crud.empresa import get_empresa_by_id
 from database.connection import SessionLocal
 from services.zabbix_service import get_full_zabbix_context
 from utils.security import descriptografar_token
+from services import intent_service
+from utils.logger import get_logger, log_payload
+
+logger = get_logger(__name__)
 
 class GeminiService:
-    def __init__(self, prompt_builder: PromptBuilder):
-        self.model = get_gemini_model()
+    def __init__(self, prompt_builder: PromptBuilder, router: ModelRouter = None):
+        # O roteador escolhe o modelo (rápido ou pro) e aplica prazo e fallback
+        self.router = router or get_default_router()
         self.prompt_builder = prompt_builder
 
     # --- NOVO MÉTODO ADICIONADO PARA A MIGRAÇÃO ---
@@ -24,24 +29,23 @@ class GeminiService:
             # A lógica do prompt em si fica encapsulada no PromptBuilder
             full_prompt = self.prompt_builder.build_prompt(user_query, zabbix_context_data)
 
-            print("\n--- DEBUG: PROMPT DE RELATÓRIO ENVIADO PARA A IA ---")
-            print(full_prompt)
-            print("--- FIM PROMPT ---\n")
+            log_payload(logger, "Prompt de relatório enviado para a IA", full_prompt, kind="report")
 
             # Envia para a IA
-            response = self.model.generate_content(full_prompt)
-            
-            print("--- RESPOSTA DA IA (RELATÓRIO) ---")
-            print(response.text)
-            print("---------------------------------")
+            started = time.perf_counter()
+            response = self.router.generate(full_prompt, kind="report")
+            logger.info("Relatório gerado pela IA", extra={
+                "kind": "report", "model": response["model"], "fallback": response["fallback"],
+                "prompt_chars": len(full_prompt), "response_chars": len(response["text"]),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+            log_payload(logger, "Resposta da IA (relatório)", response["text"], kind="report")
 
             # Retorna apenas o texto do relatório, como esperado pelo report_service
-            return response.text
+            return response["text"]
         
         except Exception as e:
-            print("!!!!!!!!!!!!!! ERRO AO GERAR RELATÓRIO NO SERVIÇO GEMINI !!!!!!!!!!!!!!")
-            traceback.print_exc()
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            logger.exception("Erro ao gerar relatório no serviço Gemini")
             # Re-lança a exceção para ser tratada pela camada superior (report_service)
             raise e
 
@@ -55,29 +59,30 @@ class GeminiService:
 
             api_url = empresa.url_zabbix
             api_token = descriptografar_token(empresa.token_zabbix_criptografado)
+
+            # Consultas reconhecidas (top CPU, problemas ativos, status de um host...)
+            # são respondidas por template, sem passar pelo modelo
+            quick_answer = intent_service.answer(question, api_url, api_token)
+            if quick_answer is not None:
+                return quick_answer
             
-            print("\n--- DEBUG: BUSCANDO CONTEXTO ZABBIX (GERAL) ---")
             zabbix_data = get_full_zabbix_context(api_url, api_token)
-            print("--- FIM CONTEXTO ZABBIX ---\n")
-            
             full_prompt = self.prompt_builder.build_prompt(question, zabbix_data)
+            log_payload(logger, "Prompt geral enviado para a IA", full_prompt, kind="chat", empresa_id=empresa_id)
 
-            print("\n--- DEBUG: PROMPT GERAL ENVIADO PARA A IA ---")
-            print(full_prompt)
-            print("--- FIM PROMPT ---\n")
-
-            response = self.model.generate_content(full_prompt)
-            
-            print("--- RESPOSTA DA IA (GERAL) ---")
-            print(response.text)
-            print("-----------------------------")
+            started = time.perf_counter()
+            response = self.router.generate(full_prompt, kind="chat", heavy=intent_service.is_open_ended(question))
+            logger.info("Resposta gerada pela IA", extra={
+                "kind": "chat", "empresa_id": empresa_id, "model": response["model"], "fallback": response["fallback"],
+                "prompt_chars": len(full_prompt), "response_chars": len(response["text"]),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+            log_payload(logger, "Resposta da IA (geral)", response["text"], kind="chat", empresa_id=empresa_id)
 
-            return {"response": response.text}
+            return {"response": response["text"], "model": response["model"]}
         
         except Exception as e:
-            print("!!!!!!!!!!!!!! ERRO INESPERADO NO SERVIÇO GEMINI (GERAL) !!!!!!!!!!!!!!")
-            traceback.print_exc()
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            logger.exception("Erro inesperado no serviço Gemini (geral)", extra={"empresa_id": empresa_id})
             return {"error": f"Ocorreu um erro ao processar sua solicitação com o Gemini: {e}"}
         finally:
             db.close()
\ No newline at end of file
@@ -0,0 +1,159 @@
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from services import sla_service
+from utils.cache import TTLCache
+
+# --- MTTR / MTBF DE INCIDENTES ---
+# Cada evento de problema do período é pareado com a sua recuperação
+# (r_eventid), usando a mesma busca paginada do motor de SLA. Uma única
+# passada pelos eventos alimenta os acumuladores por host, por trigger e por
+# severidade: contagem, duração total, durações (para os percentis) e o
+# intervalo entre inícios consecutivos de incidentes (MTBF).
+#
+# MTTR: duração média dos incidentes já resolvidos.
+# MTBF: tempo médio entre o início de um incidente e o início do seguinte.
+#
+# Um intervalo só é tratado como fechado (cache longo) quando terminou há mais
+# de sla_service.CLOSED_PERIOD_MARGIN segundos e não tem incidente em aberto:
+# a recuperação de um incidente aberto ainda mudaria o MTTR.
+
+DEFAULT_TOP = 20
+CLOSED_RANGE_TTL = 7 * 24 * 60 * 60  # Um intervalo fechado não muda mais
+OPEN_RANGE_TTL = 60
+PERCENTILES = (50, 90, 95, 99)
+_CACHE_SIZE = 256
+
+_cache = TTLCache("incidents", max_entries=_CACHE_SIZE)
+
+SEVERITY_NAMES = {
+    "0": "Não classificada", "1": "Informação", "2": "Atenção",
+    "3": "Média", "4": "Alta", "5": "Desastre",
+}
+
+
+class _Accumulator:
+    __slots__ = ("incidents", "open", "durations", "gap_sum", "gaps", "last_start")
+
+    def __init__(self):
+        self.incidents = 0
+        self.open = 0
+        self.durations: List[int] = []
+        self.gap_sum = 0
+        self.gaps = 0
+        self.last_start = None
+
+    def add(self, start: int, duration):
+        self.incidents += 1
+        if duration is None:
+            self.open += 1
+        else:
+            self.durations.append(duration)
+        if self.last_start is not None:
+            self.gap_sum += abs(self.last_start - start)
+            self.gaps += 1
+        self.last_start = start
+
+    def result(self) -> Dict[str, Any]:
+        durations = np.asarray(self.durations, dtype=np.float64)
+        stats = {
+            "incidents": self.incidents,
+            "open": self.open,
+            "resolved": int(durations.size),
+            "mttr_seconds": round(float(durations.mean()), 1) if durations.size else None,
+            "mtbf_seconds": round(self.gap_sum / self.gaps, 1) if self.gaps else None,
+            "total_duration_seconds": int(durations.sum()),
+        }
+        values = np.percentile(durations, PERCENTILES) if durations.size else [None] * len(PERCENTILES)
+        for p, value in zip(PERCENTILES, values):
+            stats[f"p{p}_seconds"] = round(float(value), 1) if value is not None else None
+        return stats
+
+
+def aggregate_incidents(problems: List[Dict[str, Any]], recovery_clocks: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Agrega os eventos de problema em uma única passada. Os eventos chegam do
+    mais novo para o mais antigo (paginação por eventid), então os inícios de
+    cada chave já vêm em ordem e o MTBF sai sem ordenar nada.
+    """
+    overall = _Accumulator()
+    by_host: Dict[str, _Accumulator] = {}
+    by_trigger: Dict[str, _Accumulator] = {}
+    by_severity: Dict[str, _Accumulator] = {}
+    host_names: Dict[str, str] = {}
+    trigger_info: Dict[str, Tuple[str, str]] = {}
+    seen = set()
+
+    for event in problems:
+        if event["eventid"] in seen:
+            continue
+        seen.add(event["eventid"])
+        start = int(event["clock"])
+        r_eventid = event.get("r_eventid", "0")
+        recovery = recovery_clocks.get(r_eventid) if r_eventid != "0" else None
+        duration = max(0, recovery - start) if recovery is not None else None
+
+        overall.add(start, duration)
+        severity = str(event.get("severity", "0"))
+        by_severity.setdefault(severity, _Accumulator()).add(start, duration)
+        triggerid = event.get("objectid")
+        by_trigger.setdefault(triggerid, _Accumulator()).add(start, duration)
+        trigger_info.setdefault(triggerid, (event.get("name"), severity))
+        for host in event.get("hosts") or []:
+            by_host.setdefault(host["hostid"], _Accumulator()).add(start, duration)
+            host_names.setdefault(host["hostid"], host.get("name"))
+
+    return {
+        "overall": overall,
+        "by_host": by_host,
+        "by_trigger": by_trigger,
+        "by_severity": by_severity,
+        "host_names": host_names,
+        "trigger_info": trigger_info,
+    }
+
+
+def _ranked(accumulators: Dict[str, _Accumulator], top: int) -> List[Tuple[str, _Accumulator]]:
+    ranked = sorted(accumulators.items(), key=lambda kv: (-kv[1].incidents, -sum(kv[1].durations)))
+    return ranked[:top]
+
+
+def compute_incident_stats(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None,
+                           min_severity: int = 0, top: int = DEFAULT_TOP) -> Dict[str, Any]:
+    """MTTR, MTBF, contagens e percentis de duração por host, trigger e severidade no intervalo."""
+    period_key = (time_from, time_till) if sla_service.is_closed_period(time_till) \
+        else sla_service.open_period_key(time_from, time_till, OPEN_RANGE_TTL)
+    cache_key = f"{api_url}:{period_key[0]}:{period_key[1]}:{','.join(sorted(hostids or []))}:{min_severity}:{top}"
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    problems = sla_service.fetch_problem_events(api_url, token, time_from, time_till, min_severity, hostids,
+                                                include_open_before=False)
+    r_eventids = sorted({p["r_eventid"] for p in problems if p.get("r_eventid", "0") != "0"})
+    recovery_clocks = sla_service.fetch_recovery_clocks(api_url, token, r_eventids)
+    agg = aggregate_incidents(problems, recovery_clocks)
+
+    result = {
+        "time_from": time_from,
+        "time_till": time_till,
+        "min_severity": min_severity,
+        "overall": agg["overall"].result(),
+        "by_severity": [
+            {"severity": sev, "severity_name": SEVERITY_NAMES.get(sev, sev), **acc.result()}
+            for sev, acc in sorted(agg["by_severity"].items(), reverse=True)
+        ],
+        "by_host": [
+            {"hostid": hostid, "host": agg["host_names"].get(hostid), **acc.result()}
+            for hostid, acc in _ranked(agg["by_host"], top)
+        ],
+        "by_trigger": [
+            {"triggerid": triggerid, "description": agg["trigger_info"][triggerid][0],
+             "severity": agg["trigger_info"][triggerid][1], **acc.result()}
+            for triggerid, acc in _ranked(agg["by_trigger"], top)
+        ],
+    }
+    closed = sla_service.is_closed_period(time_till) and result["overall"]["open"] == 0
+    _cache.set(cache_key, result, CLOSED_RANGE_TTL if closed else OPEN_RANGE_TTL)
+    return result
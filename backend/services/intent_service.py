@@ -0,0 +1,243 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from services import zabbix_service
+from services.report_analysis import SEVERITY_NAMES
+
+# --- RESPOSTAS RÁPIDAS POR INTENÇÃO ---
+# Boa parte das perguntas do chat são consultas que o backend já calcula
+# ("quais hosts usam mais CPU", "quantos problemas ativos", "o que há com o
+# host X"). Um casamento de padrões roda antes do modelo: se a pergunta é uma
+# consulta reconhecida, a resposta sai de um template Markdown preenchido com
+# os dados em cache do Zabbix, em milissegundos. Perguntas abertas (por quê,
+# analise, recomende...) continuam indo para o modelo.
+
+MAX_LISTED_PROBLEMS = 10
+
+# Palavras que indicam pedido de análise: nesses casos o modelo é quem responde
+_OPEN_ENDED_RE = re.compile(
+    r"\b(por ?que|porque|analis\w*|explique|explica\w*|recomend\w*|sugir\w*|sugest\w*|compar\w*|"
+    r"tendencia\w*|causa\w*|why|explain|analy[sz]\w*|recommend\w*|suggest\w*|compare|trend\w*|cause\w*)\b"
+)
+
+# Artigos e preposições entre a palavra "host" e o nome ("o servidor de email",
+# "the server named web01") são pulados; o que sobra só vale se for o nome exato
+# de um host (ver _answer_host_status)
+_HOST_STOPWORDS = r"(?:de|do|da|dos|das|o|a|os|as|um|uma|chamad[oa]|nomead[oa]|the|an|named|called|of)"
+_HOST_RE = re.compile(r"\b(?:host|servidor|maquina|server|machine)\s+(?:" + _HOST_STOPWORDS + r"\s+)*[\"']?(?P<host>[\w.\-]+)")
+
+
+# --- PERGUNTAS SEM FILTRO ---
+# Contagem, lista e top N respondem sobre a frota inteira. Só valem para a
+# pergunta "pura": se sobra qualquer palavra fora do vocabulário da intenção
+# ("de disco", "críticos", um nome de host ou grupo), a pergunta pede um
+# recorte que o template não faz, e segue para o modelo.
+_FILLER_WORDS = frozenset("""
+    o a os as um uma uns umas de do da dos das no na nos nas em com e ou que qual quais
+    quem me eu voce agora atualmente momento hoje ai la
+    ha tem temos tenho existem existe estao esta sao ser
+    the an of in on with and or is are there do does we have has right now currently which what who
+""".split())
+_TOP_WORDS = frozenset("""
+    mais maior maiores top most highest usam usa uso usando consomem consome consumo consumindo
+    consumidores utilizacao alto alta altos altas
+    host hosts servidor servidores maquina maquinas server servers machine machines
+    use uses using usage consumers consumption
+""".split())
+_PROBLEM_WORDS = frozenset("""
+    problema problemas alerta alertas alarme alarmes incidente incidentes problem problems alert alerts
+    trigger triggers ativo ativos ativa ativas aberto abertos aberta abertas active open current atuais
+""".split())
+_VOCABULARY = {
+    "top_cpu": _FILLER_WORDS | _TOP_WORDS | {"cpu", "processador", "processamento"},
+    "top_memory": _FILLER_WORDS | _TOP_WORDS | {"memoria", "ram", "memory"},
+    "active_problem_count": _FILLER_WORDS | _PROBLEM_WORDS | {
+        "quantos", "quantas", "how", "many", "numero", "total"},
+    "active_problem_list": _FILLER_WORDS | _PROBLEM_WORDS | {
+        "liste", "listar", "lista", "mostre", "mostrar", "list", "show",
+        "host", "hosts", "servidor", "servidores", "maquina", "maquinas", "server", "servers"},
+}
+
+
+def _is_bare(name: str, text: str) -> bool:
+    """True se a pergunta não tem palavras além do vocabulário da intenção (intenções sem vocabulário sempre valem)."""
+    vocabulary = _VOCABULARY.get(name)
+    return vocabulary is None or all(word in vocabulary for word in re.findall(r"\w+", text))
+
+
+def _normalize(question: str) -> str:
+    text = unicodedata.normalize("NFKD", question.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _bar(value: float) -> str:
+    filled = max(0, min(10, round(value / 10)))
+    return "█" * filled + "░" * (10 - filled)
+
+
+# --- RESPOSTAS (TEMPLATES) ---
+
+def _answer_top(metric: str, title: str) -> Callable[[str, str, re.Match], Optional[str]]:
+    def answer(api_url: str, token: str, match: re.Match) -> Optional[str]:
+        top = zabbix_service.get_top_consumers(api_url, token).get(metric, [])
+        if not top:
+            return f"## {title}\n\nNenhum dado de {title.lower()} disponível no momento."
+        lines = [f"## {title}", "", "| # | Host | Uso | |", "|---|------|-----|---|"]
+        for position, record in enumerate(top, start=1):
+            lines.append(f"| {position} | **{record['name']}** | {record['value']:.2f}% | `{_bar(record['value'])}` |")
+        return "\n".join(lines)
+    return answer
+
+
+def _answer_problem_count(api_url: str, token: str, match: re.Match) -> str:
+    triggers = zabbix_service.get_active_triggers(api_url, token)
+    if not triggers:
+        return "## Problemas ativos\n\n✅ Não há nenhum problema ativo no momento."
+    counts = Counter(str(trigger.get('priority', '0')) for trigger in triggers)
+    lines = ["## Problemas ativos", "", f"Existem **{len(triggers)}** problemas ativos:", ""]
+    for severity in sorted(counts, reverse=True):
+        lines.append(f"- **{SEVERITY_NAMES.get(severity, severity)}**: {counts[severity]}")
+    return "\n".join(lines)
+
+
+def _format_problem(trigger: Dict[str, Any]) -> str:
+    hosts = ", ".join(h['name'] for h in trigger.get('hosts', []))
+    since = time.strftime('%d/%m %H:%M', time.localtime(int(trigger.get('lastchange') or 0)))
+    severity = SEVERITY_NAMES.get(str(trigger.get('priority', '0')), trigger.get('priority'))
+    return f"- **[{severity}]** {trigger.get('description')} — {hosts} (desde {since})"
+
+
+def _answer_problem_list(api_url: str, token: str, match: re.Match) -> str:
+    triggers = zabbix_service.get_active_triggers(api_url, token)
+    if not triggers:
+        return "## Problemas ativos\n\n✅ Não há nenhum problema ativo no momento."
+    ordered = sorted(triggers, key=lambda t: (-int(t.get('priority', 0)), -int(t.get('lastchange') or 0)))
+    lines = ["## Problemas ativos", "", f"**{len(triggers)}** problemas ativos, dos mais graves para os menos graves:", ""]
+    lines += [_format_problem(t) for t in ordered[:MAX_LISTED_PROBLEMS]]
+    if len(ordered) > MAX_LISTED_PROBLEMS:
+        lines.append(f"\n_... e mais {len(ordered) - MAX_LISTED_PROBLEMS} problemas._")
+    return "\n".join(lines)
+
+
+def _answer_host_status(api_url: str, token: str, match: re.Match) -> Optional[str]:
+    # Só responde se o texto é o nome técnico ou visível exato de um host. Com
+    # prefixo ou busca aproximada, "servidor de email" acabaria em "desktop01";
+    # sem certeza, a pergunta segue para o modelo
+    wanted = match.group("host").lower()
+    results = zabbix_service.search_hosts(api_url, token, wanted, limit=5)
+    host = next((r for r in results if wanted in ((r.get('name') or '').lower(), (r.get('host') or '').lower())), None)
+    if host is None:
+        return None
+
+    metrics = zabbix_service.get_key_metrics(api_url, token, host['hostid'])
+    problems = [t for t in zabbix_service.get_active_triggers(api_url, token)
+                if any(h.get('name') == host['name'] for h in t.get('hosts', []))]
+
+    lines = [f"## Host {host['name']}", ""]
+    if problems:
+        lines.append(f"⚠️ **{len(problems)}** problema(s) ativo(s):")
+        lines += [_format_problem(t) for t in problems[:MAX_LISTED_PROBLEMS]]
+    else:
+        lines.append("✅ Nenhum problema ativo neste host.")
+    lines += ["", "**Métricas atuais:**"]
+    if not metrics:
+        lines.append("- N/A")
+    for metric in metrics:
+        label = metric.get('label') or {
+            "cpu_util": "CPU", "memory_pused": "Memória", "network_in": "Rede (entrada)", "network_out": "Rede (saída)"
+        }.get(metric['key'], metric['key'])
+        unit = " bps" if metric['key'].startswith("network") else "%"
+        lines.append(f"- {label}: {metric['value']}{unit}")
+    return "\n".join(lines)
+
+
+# Ordem importa: as intenções são tentadas em ordem e vale a primeira que responder
+INTENTS: List[Tuple[str, re.Pattern, Callable[[str, str, re.Match], Optional[str]]]] = [
+    ("host_status", re.compile(r"(o que|que|what|status|situacao|como esta|how is|wrong|acontec\w*|problema\w* (do|no|with)).*" + _HOST_RE.pattern),
+     _answer_host_status),
+    ("top_cpu", re.compile(r"\b(cpu|processador|processamento)\b.*\b(mais|maior|top|most|highest)\b|\b(mais|maior|top|most|highest)\b.*\b(cpu|processador|processamento)\b"),
+     _answer_top("top_cpu", "Top consumidores de CPU")),
+    ("top_memory", re.compile(r"\b(memoria|ram|memory)\b.*\b(mais|maior|top|most|highest)\b|\b(mais|maior|top|most|highest)\b.*\b(memoria|ram|memory)\b"),
+     _answer_top("top_memory", "Top consumidores de memória")),
+    ("active_problem_count", re.compile(r"\b(quantos|quantas|how many|numero de|total de)\b.*\b(problemas?|alertas?|alarmes?|incidentes?|problems?|alerts?|triggers?)\b"),
+     _answer_problem_count),
+    ("active_problem_list", re.compile(r"\b(quais|liste|listar|mostre|mostrar|which|list|show)\b.*\b(problemas?|alertas?|alarmes?|problems?|alerts?)\b"),
+     _answer_problem_list),
+]
+
+
+# --- MÉTRICAS DE ACERTO ---
+
+class IntentStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.fallbacks = 0
+        self.hits: Dict[str, int] = {}
+        self.latency_ms: Dict[str, float] = {}
+
+    def record_hit(self, intent: str, elapsed_ms: float):
+        with self._lock:
+            self.questions += 1
+            self.hits[intent] = self.hits.get(intent, 0) + 1
+            self.latency_ms[intent] = self.latency_ms.get(intent, 0.0) + elapsed_ms
+
+    def record_fallback(self):
+        with self._lock:
+            self.questions += 1
+            self.fallbacks += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            answered = sum(self.hits.values())
+            return {
+                "questions": self.questions,
+                "answered_by_intent": answered,
+                "fallbacks": self.fallbacks,
+                "hit_rate": round(answered / self.questions, 4) if self.questions else 0.0,
+                "intents": {
+                    name: {"hits": count, "avg_latency_ms": round(self.latency_ms[name] / count, 2)}
+                    for name, count in sorted(self.hits.items())
+                },
+            }
+
+
+stats = IntentStats()
+
+
+def is_open_ended(question: str) -> bool:
+    """Pergunta que pede análise (por que, analise, recomende...), e não uma consulta."""
+    return bool(_OPEN_ENDED_RE.search(_normalize(question)))
+
+
+def match_intents(question: str) -> List[Tuple[str, Callable, re.Match]]:
+    """Intenções de consulta reconhecidas na pergunta, em ordem de prioridade (vazio se for aberta)."""
+    if is_open_ended(question):
+        return []
+    text = _normalize(question)
+    matches = []
+    for name, pattern, handler in INTENTS:
+        match = pattern.search(text)
+        if match and _is_bare(name, text):
+            matches.append((name, handler, match))
+    return matches
+
+
+def answer(question: str, api_url: str, token: str) -> Optional[Dict[str, Any]]:
+    """
+    Resposta pronta para a pergunta, ou None se ela deve ir para o modelo.
+    Erros do Zabbix seguem para quem chamou, como nas demais consultas.
+    """
+    started = time.perf_counter()
+    for name, handler, match in match_intents(question):
+        # Um handler pode desistir (ex.: host não identificado); tenta a próxima intenção
+        result = handler(api_url, token, match)
+        if result is not None:
+            stats.record_hit(name, (time.perf_counter() - started) * 1000)
+            return {"response": result, "intent": name}
+    stats.record_fallback()
+    return None
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from services import zabbix_service
+
+# --- ATUALIZAÇÕES AO VIVO (PUSH) ---
+# Em vez de cada aba fazer polling, existe UM poller por (empresa, tópico[, host])
+# enquanto houver inscritos. O poller busca os dados no intervalo do tópico,
+# calcula a diferença em relação ao último snapshot e envia apenas o diff para
+# todos os inscritos. Com 50 telas de NOC abertas, a carga no Zabbix é a mesma
+# de uma tela só.
+
+TOPICS = {
+    # tópico: (intervalo de polling em segundos, campo usado como identidade do registro)
+    "triggers": (30, "triggerid"),
+    "key_metrics": (10, "key"),
+    "host_triggers": (15, "triggerid"),
+}
+# Tópicos de um host só (exigem host_id)
+HOST_TOPICS = {"key_metrics", "host_triggers"}
+SUBSCRIBER_QUEUE_SIZE = 100
+
+ChannelKey = Tuple[int, str, Optional[str]]
+
+
+def _fetch_topic(topic: str, api_url: str, token: str, host_id: Optional[str]) -> List[Dict[str, Any]]:
+    if topic == "triggers":
+        return zabbix_service.get_active_triggers(api_url, token)
+    if topic == "host_triggers":
+        # Lista plana com o grupo (critical/warning/info/ok) de cada trigger; o cliente reagrupa
+        grouped = zabbix_service.get_host_triggers(api_url, token, host_id)
+        return [{**trigger, "group": group} for group, triggers in grouped.items() for trigger in triggers]
+    return zabbix_service.get_key_metrics(api_url, token, host_id)
+
+
+def compute_diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Diff entre dois snapshots indexados pela identidade do registro."""
+    added = [current[k] for k in current.keys() - previous.keys()]
+    removed = list(previous.keys() - current.keys())
+    changed = [current[k] for k in current.keys() & previous.keys() if current[k] != previous[k]]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+class _Channel:
+    def __init__(self, key: ChannelKey, credentials: Callable[[], Tuple[str, str]]):
+        self.key = key
+        self.credentials = credentials
+        self.subscribers: List[asyncio.Queue] = []
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def topic(self) -> str:
+        return self.key[1]
+
+    def _publish(self, message: Dict[str, Any]):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente lento: descarta a fila e força um snapshot completo no lugar dos diffs perdidos
+                while not queue.empty():
+                    queue.get_nowait()
+                if self.snapshot is not None:
+                    queue.put_nowait({"type": "snapshot", "topic": self.topic, "data": list(self.snapshot.values())})
+
+    async def _refresh(self):
+        _, id_field = TOPICS[self.topic]
+        api_url, token = await run_in_threadpool(self.credentials)
+        records = await run_in_threadpool(_fetch_topic, self.topic, api_url, token, self.key[2])
+        # Cópia via JSON: os objetos vêm do cache do zabbix_service e não podem ser compartilhados
+        current = {str(r[id_field]): json.loads(json.dumps(r)) for r in records}
+
+        if self.snapshot is None:
+            self.snapshot = current
+            self._publish({"type": "snapshot", "topic": self.topic, "data": list(current.values())})
+            return
+
+        diff = compute_diff(self.snapshot, current)
+        self.snapshot = current
+        if diff["added"] or diff["removed"] or diff["changed"]:
+            self._publish({"type": "diff", "topic": self.topic, **diff})
+
+    async def run(self):
+        interval, _ = TOPICS[self.topic]
+        while self.subscribers:
+            try:
+                await self._refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._publish({"type": "error", "topic": self.topic, "detail": str(e)})
+            await asyncio.sleep(interval)
+
+
+class LiveUpdateHub:
+    def __init__(self):
+        self._channels: Dict[ChannelKey, _Channel] = {}
+
+    def subscribe(self, empresa_id: int, topic: str, host_id: Optional[str],
+                  credentials: Callable[[], Tuple[str, str]]) -> asyncio.Queue:
+        key = (empresa_id, topic, host_id)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel(key, credentials)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        channel.subscribers.append(queue)
+        if channel.snapshot is not None:
+            # Novo inscrito recebe o estado atual de imediato, sem esperar o próximo ciclo
+            queue.put_nowait({"type": "snapshot", "topic": topic, "data": list(channel.snapshot.values())})
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.create_task(channel.run())
+        return queue
+
+    def unsubscribe(self, empresa_id: int, topic: str, host_id: Optional[str], queue: asyncio.Queue):
+        key = (empresa_id, topic, host_id)
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        if queue in channel.subscribers:
+            channel.subscribers.remove(queue)
+        if not channel.subscribers:
+            if channel.task is not None:
+                channel.task.cancel()
+            del self._channels[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+        }
+
+
+hub = LiveUpdateHub()
+
+
+def format_sse(message: Dict[str, Any]) -> str:
+    return f"event: {message['type']}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
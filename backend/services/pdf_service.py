@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Dict, Any, Iterator
+
+# --- GERAÇÃO DE PDF FORA DO EVENT LOOP ---
+# A renderização com reportlab é CPU-bound e pode levar segundos para milhares
+# de hosts. Ela roda em um pool de processos, grava o resultado em um arquivo
+# temporário (nada de BytesIO com o PDF inteiro em memória) e o arquivo é
+# devolvido em blocos. Os PDFs ficam em cache pelo hash dos dados do inventário,
+# então downloads repetidos do mesmo conteúdo não renderizam de novo.
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "zabbix_copilot_pdf"))
+PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", "32"))
+CHUNK_SIZE = 64 * 1024
+
+INVENTORY_HEADERS = [
+    "Host", "Nome", "Status", "IP(s)", "Grupos", "Templates",
+    "OS", "Modelo", "Vendor", "Localização", "Responsável"
+]
+
+_executor: ProcessPoolExecutor = None
+_executor_lock = threading.Lock()
+# Renderizações em andamento por hash, para que downloads simultâneos do mesmo
+# inventário compartilhem um único job no pool
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def build_inventory_rows(data: List[Dict[str, Any]]) -> List[List[str]]:
+    """Converte o inventário em linhas de texto: só isso é enviado ao processo de renderização."""
+    rows = []
+    for r in data:
+        ips = ", ".join([i.get('ip') for i in (r.get('interfaces') or []) if i.get('ip')])
+        inv = r.get('inventory') or {}
+        rows.append([
+            r.get('host', ''),
+            r.get('name', ''),
+            'Habilitado' if int(r.get('status', 1)) == 0 else 'Desabilitado',
+            ips,
+            "; ".join(r.get('groups', [])),
+            "; ".join(r.get('templates', [])),
+            inv.get('os_full', ''),
+            inv.get('model', ''),
+            inv.get('vendor', ''),
+            inv.get('location', ''),
+            inv.get('contact', '')
+        ])
+    return rows
+
+
+def _render_inventory_pdf(title: str, rows: List[List[str]], output_path: str) -> str:
+    """Executado no processo do pool: renderiza o PDF direto para o arquivo."""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    doc = SimpleDocTemplate(tmp_path, pagesize=landscape(A4), leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=20)
+    styles = getSampleStyleSheet()
+    elements = [Paragraph(title, styles['Title']), Spacer(1, 12)]
+
+    table = Table([INVENTORY_HEADERS] + rows, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,-1), 8),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ]))
+    elements.append(table)
+    doc.build(elements)
+
+    # Renomeação atômica: um leitor nunca vê um PDF pela metade
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def _prune_cache():
+    try:
+        files = [os.path.join(PDF_CACHE_DIR, f) for f in os.listdir(PDF_CACHE_DIR) if f.endswith(".pdf")]
+    except FileNotFoundError:
+        return
+    if len(files) <= PDF_CACHE_MAX_FILES:
+        return
+    files.sort(key=os.path.getmtime)
+    for path in files[:len(files) - PDF_CACHE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def inventory_hash(title: str, rows: List[List[str]]) -> str:
+    payload = json.dumps({"title": title, "rows": rows}, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _render_shared(digest: str, title: str, rows: List[List[str]], output_path: str) -> str:
+    """
+    Renderiza no pool, compartilhando o job entre requisições com o mesmo
+    conteúdo. Todos os que esperam (inclusive o primeiro) usam asyncio.shield:
+    um cliente que desconecta não cancela o PDF dos demais.
+    """
+    future = _in_flight.get(digest)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        future = loop.run_in_executor(_get_executor(), _render_inventory_pdf, title, rows, output_path)
+        _in_flight[digest] = future
+        # Sai da lista quando o job termina, e não quando o primeiro cliente desiste
+        future.add_done_callback(lambda _f: _in_flight.pop(digest, None))
+    return await asyncio.shield(future)
+
+
+async def open_inventory_pdf(empresa_id: int, data: List[Dict[str, Any]]) -> BinaryIO:
+    """
+    Retorna o PDF do inventário já aberto para leitura, renderizando-o no pool
+    de processos apenas se ainda não existir um arquivo em cache para o mesmo
+    conteúdo. O arquivo é aberto antes da limpeza do cache: se outra requisição
+    apagá-lo depois disso, a leitura continua valendo; se apagar antes, ele é
+    renderizado de novo.
+    """
+    title = f"Inventário de Hosts - Empresa ID: {empresa_id}"
+    rows = build_inventory_rows(data)
+    digest = inventory_hash(title, rows)
+    output_path = os.path.join(PDF_CACHE_DIR, f"inventario-{digest}.pdf")
+
+    for _attempt in range(3):
+        try:
+            f = open(output_path, "rb")
+        except FileNotFoundError:
+            pass
+        else:
+            try:
+                os.utime(output_path)  # Marca como usado recentemente para a limpeza do cache
+            except FileNotFoundError:
+                pass  # Já removido do diretório: o arquivo aberto continua legível
+            return f
+        await _render_shared(digest, title, rows, output_path)
+        try:
+            f = open(output_path, "rb")
+        except FileNotFoundError:
+            continue  # Apagado pela limpeza de outra requisição: renderiza de novo
+        _prune_cache()
+        return f
+    raise RuntimeError("O PDF do inventário foi removido do cache repetidas vezes antes de ser lido.")
+
+
+def iter_file(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Lê o arquivo aberto em blocos para o StreamingResponse (e o fecha), sem carregar o PDF inteiro."""
+    with f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
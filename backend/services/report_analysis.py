@@ -0,0 +1,114 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any
+
+# --- PRÉ-ANÁLISE DETERMINÍSTICA DO RELATÓRIO ---
+# Tudo o que dá para calcular em Python (problemas mais recorrentes,
+# histogramas por hora e por dia, distribuição por severidade, fotografia das
+# métricas atuais) é calculado aqui, antes do prompt. O modelo recebe apenas
+# estas estatísticas compactas, cujo tamanho não depende de quantos alertas
+# existem no período: só interpreta e redige.
+
+DEFAULT_TOP_TRIGGERS = 5
+MAX_TRIGGERS_PER_CATEGORY = 10
+
+SEVERITY_NAMES = {
+    "0": "Não classificada", "1": "Informação", "2": "Atenção",
+    "3": "Média", "4": "Alta", "5": "Desastre",
+}
+
+
+def _clock(alert: Dict[str, Any]) -> int:
+    return int(alert.get('lastchange') or 0)
+
+
+def top_recurring_triggers(alerts: List[Dict[str, Any]], limit: int = DEFAULT_TOP_TRIGGERS) -> List[Dict[str, Any]]:
+    """Triggers que mais dispararam no período, com a última ocorrência de cada."""
+    counts = Counter()
+    latest: Dict[str, Dict[str, Any]] = {}
+    for alert in alerts:
+        triggerid = alert.get('triggerid')
+        counts[triggerid] += 1
+        if triggerid not in latest or _clock(alert) > _clock(latest[triggerid]):
+            latest[triggerid] = alert
+
+    top = []
+    for triggerid, count in counts.most_common(limit):
+        alert = latest[triggerid]
+        top.append({
+            "triggerid": triggerid,
+            "description": alert.get('description'),
+            "priority": alert.get('priority'),
+            "occurrences": count,
+            "last_occurrence": datetime.fromtimestamp(_clock(alert)).strftime('%d/%m/%Y %H:%M'),
+        })
+    return top
+
+
+def hourly_histogram(alerts: List[Dict[str, Any]]) -> List[int]:
+    """Quantidade de alertas por hora do dia (0 a 23)."""
+    histogram = [0] * 24
+    for alert in alerts:
+        histogram[datetime.fromtimestamp(_clock(alert)).hour] += 1
+    return histogram
+
+
+def daily_histogram(alerts: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Quantidade de alertas por dia, em ordem cronológica."""
+    days = Counter(datetime.fromtimestamp(_clock(alert)).strftime('%Y-%m-%d') for alert in alerts)
+    return dict(sorted(days.items()))
+
+
+def severity_mix(alerts: List[Dict[str, Any]]) -> Dict[str, int]:
+    mix = Counter(str(alert.get('priority', '0')) for alert in alerts)
+    return {SEVERITY_NAMES.get(sev, sev): mix[sev] for sev in sorted(mix, reverse=True)}
+
+
+def daily_trend(daily: Dict[str, int]) -> str:
+    """Compara a média diária da primeira e da segunda metade do período."""
+    values = list(daily.values())
+    if len(values) < 2:
+        return "insuficiente"
+    half = len(values) // 2
+    first, second = sum(values[:half]) / half, sum(values[half:]) / (len(values) - half)
+    if second > first * 1.2:
+        return "crescente"
+    if second < first * 0.8:
+        return "decrescente"
+    return "estável"
+
+
+def latest_metrics_snapshot(current_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Métricas de get_key_metrics como um dicionário chave -> valor (com o rótulo das partições)."""
+    if not isinstance(current_metrics, list):
+        return {}
+    return {m.get('label') or m['key']: m['value'] for m in current_metrics if 'key' in m}
+
+
+def summarize_host_triggers(host_triggers: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Triggers do host (formato de get_host_triggers) reduzidos aos problemas ativos e contagens."""
+    if not isinstance(host_triggers, dict):
+        return {}
+    summary = {"counts": {category: len(triggers) for category, triggers in host_triggers.items()}}
+    for category in ("critical", "warning", "info"):
+        summary[category] = [
+            {
+                "description": t.get('description'),
+                "priority": t.get('priority'),
+                "since": t.get('lastchange_formatted'),
+            }
+            for t in host_triggers.get(category, [])[:MAX_TRIGGERS_PER_CATEGORY]
+        ]
+    return summary
+
+
+def build_alert_analysis(alert_history: List[Dict[str, Any]], top: int = DEFAULT_TOP_TRIGGERS) -> Dict[str, Any]:
+    daily = daily_histogram(alert_history)
+    return {
+        "total_alerts": len(alert_history),
+        "top_recurring_triggers": top_recurring_triggers(alert_history, limit=top),
+        "severity_mix": severity_mix(alert_history),
+        "alerts_by_hour_of_day": hourly_histogram(alert_history),
+        "alerts_by_day": daily,
+        "daily_trend": daily_trend(daily),
+    }
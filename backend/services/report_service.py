@@ -3,14 +3,16 @@ from datetime import datetime
 import time
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from rich import print
 import json
 
 from crud.empresa import get_empresa_by_id
 from services.gemini_service import GeminiService
 from llm.prompts import PromptBuilder
-from services import zabbix_service
+from services import zabbix_service, incident_service, report_analysis
 from utils.security import descriptografar_token
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class ReportService:
     def __init__(self, db: Session):
@@ -43,15 +45,17 @@ class ReportService:
             time_from = time_till - (days * 24 * 60 * 60)
 
             alert_history = zabbix_service.get_alert_history(api_url, token, time_from, time_till, hostids=[host_id])
-            event_log = zabbix_service.get_event_log(api_url, token, time_from, time_till, hostids=[host_id])
+            incident_stats = incident_service.compute_incident_stats(api_url, token, time_from, time_till, hostids=[host_id])
 
-            # 2. Montagem do Contexto para a IA
+            # 2. Pré-análise determinística: o prompt leva só estatísticas compactas,
+            # com tamanho independente do volume de alertas no período
             zabbix_context_data = {
                 "host_info": host_info,
-                "current_metrics": current_metrics,
-                "active_triggers": host_triggers,
-                "alert_history": alert_history,
-                "event_log": event_log,
+                "latest_metrics": report_analysis.latest_metrics_snapshot(current_metrics),
+                "host_triggers": report_analysis.summarize_host_triggers(host_triggers),
+                "alert_analysis": report_analysis.build_alert_analysis(alert_history),
+                # Agregados de MTTR/MTBF no lugar do log bruto de eventos
+                "incident_stats": incident_stats,
                 "period_analyzed": f"{days} dias"
             }
 
@@ -61,27 +65,38 @@ class ReportService:
             # 4. Formatação da Resposta para o Frontend
             metrics_dict = {m['key']: m['value'] for m in current_metrics} if isinstance(current_metrics, list) else {}
             
-            # Contagem correta dos eventos para os cards
-            critical_events_count = len([alert for alert in alert_history if alert.get('priority') in ['4', '5']])
-            warning_events_count = len([alert for alert in alert_history if alert.get('priority') == '3'])
+            # Contagens dos cards a partir das estatísticas de incidentes, que cobrem o
+            # período inteiro (o log de eventos vinha limitado aos 100 mais recentes)
+            incidents_by_severity = {s['severity']: s['incidents'] for s in incident_stats["by_severity"]}
+            critical_events_count = incidents_by_severity.get('4', 0) + incidents_by_severity.get('5', 0)
+            warning_events_count = incidents_by_severity.get('3', 0)
 
 
+            # Mesmos campos de schemas/report.py:ReportResponse
             return {
                 "report_content": report_content,
                 "host_info": host_info,
                 "metrics": metrics_dict,
                 "triggers": host_triggers,
                 "event_summary": {
-                    "total_events": len(event_log),
+                    "total_events": incident_stats["overall"]["incidents"],
                     "critical_events": critical_events_count,
                     "warning_events": warning_events_count
                 },
-                "generated_at": datetime.now().isoformat()
+                "generated_at": datetime.now().isoformat(),
+                "period_analyzed": zabbix_context_data["period_analyzed"],
+                "user_query": user_query,
+                # O que havia de dado para a análise: relatório sem métricas ou sem
+                # informações do host deve ser lido com cuidado
+                "data_quality": {
+                    "host_info_available": "error" not in host_info,
+                    "metrics_count": len(metrics_dict),
+                    "triggers_count": sum(len(group) for group in host_triggers.values()),
+                    "alerts_analyzed": len(alert_history),
+                    "incidents_analyzed": incident_stats["overall"]["incidents"],
+                }
             }
         except Exception as e:
-            print(f"!!!!!!!!!!!!!! ERRO EM REPORT_SERVICE !!!!!!!!!!!!!!")
-            import traceback
-            traceback.print_exc()
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            logger.exception("Erro ao gerar relatório", extra={"empresa_id": empresa_id, "host_id": host_id})
             # Re-lança a exceção para que o FastAPI possa capturá-la e retornar um 500
             raise e
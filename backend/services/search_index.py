@@ -0,0 +1,291 @@
+import heapq
+import math
+import re
+import time
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple
+
+# --- ÍNDICE DE BUSCA DE HOSTS EM MEMÓRIA ---
+# Cada tenant (identificado pela URL da API Zabbix, como no cache) possui um
+# índice próprio, construído a partir da lista de hosts em cache e atualizado
+# de forma incremental: apenas hosts novos, alterados ou removidos são
+# reindexados. As buscas são respondidas sem ida ao Zabbix.
+
+INDEX_REFRESH_SECONDS = 300  # Igual ao TTL da lista de hosts no cache
+MAX_SEARCH_LIMIT = 100
+_RESULT_CACHE_SIZE = 512  # Consultas recentes memorizadas até a próxima alteração do índice
+
+_TOKEN_SPLIT_RE = re.compile(r"[^0-9a-z]+")
+
+# Peso de cada tipo de correspondência no ranking final
+_SCORE_EXACT = 1.0
+_SCORE_PREFIX = 0.9
+_SCORE_SUBSTRING = 0.75
+_SCORE_FUZZY = 0.7
+_MIN_FUZZY_SIMILARITY = 0.4
+_MIN_SHARED_TRIGRAMS = 0.4  # Fração dos trigramas da consulta exigida para um candidato
+
+# Peso de cada campo: o nome do host vale mais que uma tag, por exemplo
+_FIELD_WEIGHTS = {"name": 1.0, "host": 1.0, "ip": 0.95, "groups": 0.85, "tags": 0.8}
+
+
+def _normalize(text: str) -> str:
+    return (text or "").strip().lower()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefix_score(weight: float, query_len: int, value_len: int, exact: bool) -> float:
+    if exact:
+        return _SCORE_EXACT * weight
+    # Valores mais curtos (mais próximos da consulta) ficam à frente
+    return (_SCORE_PREFIX + 0.09 * (query_len / value_len)) * weight
+
+
+class HostSearchIndex:
+    """Índice de prefixo (tokens ordenados) e de trigramas sobre os campos de um host."""
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._signatures: Dict[str, Tuple] = {}
+        # token -> {hostid: (peso do campo, tamanho do valor, campo, token é o valor inteiro)}
+        self._token_postings: Dict[str, Dict[str, Tuple[float, int, str, bool]]] = defaultdict(dict)
+        self._sorted_tokens: List[str] = []
+        # trigrama -> {(hostid, posição do campo)} (busca aproximada, verificada por campo)
+        self._trigram_postings: Dict[str, set] = defaultdict(set)
+        self._results: Dict[Tuple[str, int], List[Tuple[float, str, str]]] = {}
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _extract_fields(host: Dict[str, Any]) -> List[Tuple[str, str]]:
+        fields = [("name", host.get("name") or ""), ("host", host.get("host") or "")]
+        for interface in host.get("interfaces") or []:
+            if interface.get("ip"):
+                fields.append(("ip", interface["ip"]))
+        for group in host.get("groups") or []:
+            fields.append(("groups", group["name"] if isinstance(group, dict) else group))
+        for tag in host.get("tags") or []:
+            if isinstance(tag, dict):
+                fields.append(("tags", f"{tag.get('tag')}:{tag.get('value')}" if tag.get("value") else tag.get("tag", "")))
+            else:
+                fields.append(("tags", tag))
+        return [(field, _normalize(value)) for field, value in fields if value]
+
+    @staticmethod
+    def _field_tokens(value: str) -> set:
+        return {value, *(t for t in _TOKEN_SPLIT_RE.split(value) if t)}
+
+    def _add(self, hostid: str, host: Dict[str, Any], signature: Tuple):
+        self._docs[hostid] = {
+            "hostid": hostid,
+            "host": host.get("host"),
+            "name": host.get("name"),
+            "ip": [i["ip"] for i in host.get("interfaces") or [] if i.get("ip")],
+            "groups": [g["name"] if isinstance(g, dict) else g for g in host.get("groups") or []],
+            "tags": [f"{t.get('tag')}:{t.get('value')}" if isinstance(t, dict) else t for t in host.get("tags") or []],
+        }
+        self._signatures[hostid] = signature
+
+        for position, (field, value) in enumerate(signature):
+            weight = _FIELD_WEIGHTS.get(field, 0.8)
+            for token in self._field_tokens(value):
+                postings = self._token_postings[token]
+                if not postings:
+                    insort(self._sorted_tokens, token)
+                entry = (weight, len(value), field, token == value)
+                current = postings.get(hostid)
+                # Mantém, por host, o campo que pontua melhor para esse token
+                if current is None or (entry[0], -entry[1], entry[3]) > (current[0], -current[1], current[3]):
+                    postings[hostid] = entry
+            for gram in _trigrams(value):
+                self._trigram_postings[gram].add((hostid, position))
+
+    def _remove(self, hostid: str):
+        for position, (_, value) in enumerate(self._signatures.pop(hostid, ())):
+            for token in self._field_tokens(value):
+                postings = self._token_postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(hostid, None)
+                if not postings:
+                    del self._token_postings[token]
+                    pos = bisect_left(self._sorted_tokens, token)
+                    if pos < len(self._sorted_tokens) and self._sorted_tokens[pos] == token:
+                        self._sorted_tokens.pop(pos)
+            for gram in _trigrams(value):
+                postings = self._trigram_postings.get(gram)
+                if postings is not None:
+                    postings.discard((hostid, position))
+                    if not postings:
+                        del self._trigram_postings[gram]
+        self._docs.pop(hostid, None)
+
+    def update(self, hosts: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Sincroniza o índice com a lista de hosts, reindexando apenas o que mudou.
+        Retorna a contagem de hosts adicionados, atualizados e removidos.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            seen = set()
+            for host in hosts:
+                hostid = host["hostid"]
+                seen.add(hostid)
+                signature = tuple(self._extract_fields(host))
+                current = self._signatures.get(hostid)
+                if current == signature:
+                    continue
+                if current is not None:
+                    self._remove(hostid)
+                    stats["updated"] += 1
+                else:
+                    stats["added"] += 1
+                self._add(hostid, host, signature)
+
+            for hostid in [h for h in self._docs if h not in seen]:
+                self._remove(hostid)
+                stats["removed"] += 1
+
+            if any(stats.values()):
+                self._results.clear()
+            self.refreshed_at = time.time()
+        return stats
+
+    def _fuzzy_candidates(self, query_grams: set) -> set:
+        # Filtro por prefixo de trigramas: um campo com pelo menos `min_shared`
+        # trigramas em comum contém obrigatoriamente um dos (n - min_shared + 1)
+        # trigramas mais raros da consulta. Assim os trigramas comuns (ex.: 'srv')
+        # não geram milhares de candidatos.
+        min_shared = max(1, math.ceil(len(query_grams) * _MIN_SHARED_TRIGRAMS))
+        grams = sorted(query_grams, key=lambda g: len(self._trigram_postings.get(g, ())))
+        candidates = set()
+        for gram in grams[:len(grams) - min_shared + 1]:
+            candidates.update(self._trigram_postings.get(gram, ()))
+        # Confirma a contagem mínima antes da pontuação completa (só consultas em sets)
+        postings = [self._trigram_postings.get(g, ()) for g in grams]
+        return {h for h in candidates if sum(1 for p in postings if h in p) >= min_shared}
+
+    def _score_fuzzy(self, hostid: str, position: int, query: str, query_grams: set) -> float:
+        field, value = self._signatures[hostid][position]
+        if query in value:
+            score = _SCORE_SUBSTRING + 0.09 * (len(query) / len(value))
+        else:
+            value_grams = _trigrams(value)
+            similarity = 2 * len(query_grams & value_grams) / (len(query_grams) + len(value_grams))
+            if similarity < _MIN_FUZZY_SIMILARITY:
+                return 0.0
+            score = _SCORE_FUZZY * similarity
+        return score * _FIELD_WEIGHTS.get(field, 0.8)
+
+    def _rank(self, query: str, limit: int) -> List[Tuple[float, str, str]]:
+        cached = self._results.get((query, limit))
+        if cached is not None:
+            return cached
+
+        # 1. Prefixo: percorre apenas a faixa de tokens que começam com a consulta;
+        # a pontuação sai direto das postings, sem reprocessar os campos do host.
+        best: Dict[str, Tuple[float, str]] = {}
+        query_len = len(query)
+        pos = bisect_left(self._sorted_tokens, query)
+        while pos < len(self._sorted_tokens) and self._sorted_tokens[pos].startswith(query):
+            token = self._sorted_tokens[pos]
+            for hostid, (weight, value_len, field, is_value) in self._token_postings[token].items():
+                score = _prefix_score(weight, query_len, value_len, is_value and token == query)
+                current = best.get(hostid)
+                if current is None or score > current[0]:
+                    best[hostid] = (score, field)
+            pos += 1
+
+        # 2. Aproximada: só é necessária se o prefixo não preencheu o limite,
+        # já que qualquer acerto por prefixo supera um acerto por similaridade.
+        if query_len >= 3 and len(best) < limit:
+            query_grams = _trigrams(query)
+            prefix_hits = set(best)
+            for hostid, position in self._fuzzy_candidates(query_grams):
+                if hostid in prefix_hits:
+                    continue
+                score = self._score_fuzzy(hostid, position, query, query_grams)
+                current = best.get(hostid)
+                if score > 0 and (current is None or score > current[0]):
+                    best[hostid] = (score, self._signatures[hostid][position][0])
+
+        ranked = [(score, hostid, field) for hostid, (score, field) in best.items()]
+        sort_key = lambda r: (-r[0], self._docs[r[1]]["name"] or "")
+        if len(ranked) > limit:
+            ranked = heapq.nsmallest(limit, ranked, key=sort_key)
+        else:
+            ranked.sort(key=sort_key)
+
+        if len(self._results) >= _RESULT_CACHE_SIZE:
+            self._results.clear()
+        self._results[(query, limit)] = ranked
+        return ranked
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Busca ranqueada por prefixo, substring e similaridade de trigramas."""
+        query = _normalize(query)
+        if not query:
+            return []
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+        with self._lock:
+            return [
+                {**self._docs[hostid], "score": round(score, 4), "matched_field": field}
+                for score, hostid, field in self._rank(query, limit)
+            ]
+
+
+# --- REGISTRO DE ÍNDICES POR TENANT ---
+# Índices sem busca há mais de INDEX_IDLE_SECONDS são descartados (a varredura
+# roda a cada acesso, no máximo uma vez por intervalo de atualização); se o
+# tenant voltar, o índice é reconstruído a partir da lista de hosts em cache.
+INDEX_IDLE_SECONDS = 3600
+_indexes: Dict[str, HostSearchIndex] = {}
+_last_used: Dict[str, float] = {}
+_last_sweep = 0.0
+_indexes_lock = threading.Lock()
+
+
+def _evict_idle(now: float):
+    global _last_sweep
+    if now - _last_sweep < INDEX_REFRESH_SECONDS:
+        return
+    _last_sweep = now
+    for tenant_key in [k for k, used in _last_used.items() if now - used > INDEX_IDLE_SECONDS]:
+        _indexes.pop(tenant_key, None)
+        _last_used.pop(tenant_key, None)
+
+
+def get_index(tenant_key: str) -> HostSearchIndex:
+    now = time.time()
+    with _indexes_lock:
+        _evict_idle(now)
+        index = _indexes.get(tenant_key)
+        if index is None:
+            index = _indexes[tenant_key] = HostSearchIndex()
+        _last_used[tenant_key] = now
+        return index
+
+
+def ensure_index(tenant_key: str, load_hosts, max_age: int = INDEX_REFRESH_SECONDS) -> HostSearchIndex:
+    """
+    Retorna o índice do tenant, atualizando-o incrementalmente quando estiver
+    mais velho que `max_age`. `load_hosts` é chamado apenas nesse caso.
+    """
+    index = get_index(tenant_key)
+    if time.time() - index.refreshed_at > max_age:
+        # Uma reconstrução por tenant: quem chega durante ela espera e reaproveita o resultado
+        with index.refresh_lock:
+            if time.time() - index.refreshed_at > max_age:
+                index.update(load_hosts())
+    return index
@@ -0,0 +1,276 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from services import zabbix_service
+from utils.cache import TTLCache
+
+# --- MOTOR DE SLA / DISPONIBILIDADE ---
+# Os intervalos de indisponibilidade são reconstruídos a partir dos pares
+# problema/recuperação do 'event.get' (r_eventid). Cada problema vira um
+# intervalo [início, fim) recortado ao período; os intervalos de um mesmo host
+# são unidos (problemas simultâneos não contam em dobro) por um sort-and-sweep
+# vetorizado em numpy, que processa todos os hosts de uma vez.
+#
+# Um período fechado (time_till há mais de CLOSED_PERIOD_MARGIN segundos no
+# passado; eventos chegam ao Zabbix com algum atraso) nunca muda de resultado,
+# então fica em cache sem expiração. Períodos em aberto usam um TTL curto, com
+# os limites arredondados para janelas desse TTL na chave: "últimas 24h" pedido
+# a cada segundo reaproveita a mesma entrada em vez de criar uma nova.
+
+SLA_LOOKBACK_SECONDS = 30 * 24 * 60 * 60  # Problemas abertos antes do período, ainda ativos dentro dele
+DEFAULT_MIN_SEVERITY = 4  # Alta e Desastre
+DEFAULT_SLA_TARGET = 99.9
+OPEN_PERIOD_TTL = 60
+CLOSED_PERIOD_MARGIN = 5 * 60
+_CLOSED_PERIOD_CACHE_SIZE = 256
+_OPEN_PERIOD_CACHE_SIZE = 256
+_RECOVERY_BATCH_SIZE = 1000
+
+_open_cache = TTLCache("sla", max_entries=_OPEN_PERIOD_CACHE_SIZE)
+_closed_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_closed_lock = threading.Lock()
+
+
+def is_closed_period(time_till: int) -> bool:
+    """Período terminado há mais de CLOSED_PERIOD_MARGIN segundos: o resultado não muda mais."""
+    return time_till < int(time.time()) - CLOSED_PERIOD_MARGIN
+
+
+def open_period_key(time_from: int, time_till: int, ttl: int) -> Tuple[int, int]:
+    """Limites de um período em aberto em janelas de `ttl` segundos, para a chave não mudar a cada segundo."""
+    return time_from // ttl, time_till // ttl
+
+
+def month_bounds(month: str) -> Tuple[int, int]:
+    """Converte 'AAAA-MM' em (time_from, time_till) do mês, no fuso do servidor."""
+    start = datetime.strptime(month, "%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+# --- RECONSTRUÇÃO DOS INTERVALOS ---
+
+def _problem_params(min_severity: int, hostids: Optional[List[str]]) -> Dict[str, Any]:
+    params = {
+        "output": ["eventid", "clock", "r_eventid", "severity", "objectid", "name"],
+        "selectHosts": ["hostid", "name"],
+        "source": 0,
+        "object": 0,
+        "value": 1,
+        "severities": list(range(min_severity, 6)),
+    }
+    if hostids:
+        params["hostids"] = hostids
+    return params
+
+
+def fetch_problem_events(api_url: str, token: str, time_from: int, time_till: int, min_severity: int,
+                         hostids: Optional[List[str]], include_open_before: bool = True) -> List[Dict[str, Any]]:
+    """
+    Eventos de problema (paginados) do período. Com `include_open_before`, inclui
+    também os problemas iniciados antes dele que ainda o afetam.
+    """
+    params = _problem_params(min_severity, hostids)
+    events = []
+    lookback = SLA_LOOKBACK_SECONDS if include_open_before else 0
+    window = {**params, "time_from": time_from - lookback, "time_till": time_till - 1}
+    for page in zabbix_service.iter_event_pages(api_url, token, window):
+        events.extend(page)
+    if not include_open_before:
+        return events
+
+    # Problemas ainda ativos que começaram antes da janela de busca: o problem.get
+    # devolve os não resolvidos independentemente da idade.
+    old_open = zabbix_service.call_zabbix_api(api_url, token, "problem.get", {
+        "output": ["eventid"],
+        "source": 0,
+        "object": 0,
+        "severities": params["severities"],
+        "time_till": time_from - SLA_LOOKBACK_SECONDS - 1,
+        **({"hostids": hostids} if hostids else {}),
+    })
+    if old_open:
+        events.extend(zabbix_service.call_zabbix_api(api_url, token, "event.get", {
+            **params, "eventids": [p["eventid"] for p in old_open]
+        }))
+    return events
+
+
+def fetch_recovery_clocks(api_url: str, token: str, r_eventids: List[str]) -> Dict[str, int]:
+    clocks = {}
+    for i in range(0, len(r_eventids), _RECOVERY_BATCH_SIZE):
+        batch = r_eventids[i:i + _RECOVERY_BATCH_SIZE]
+        recoveries = zabbix_service.call_zabbix_api(api_url, token, "event.get", {
+            "output": ["eventid", "clock"],
+            "eventids": batch,
+        })
+        clocks.update({r["eventid"]: int(r["clock"]) for r in recoveries})
+    return clocks
+
+
+def build_intervals(problems: List[Dict[str, Any]], recovery_clocks: Dict[str, int],
+                    time_from: int, time_till: int, host_positions: Dict[str, int]):
+    """
+    Transforma os eventos de problema em três arrays paralelos (posição do host,
+    início, fim), já recortados ao período. Problemas sem recuperação contam até
+    o fim do período.
+    """
+    host_idx, starts, ends = [], [], []
+    seen = set()
+    for event in problems:
+        if event["eventid"] in seen:
+            continue
+        seen.add(event["eventid"])
+        start = max(int(event["clock"]), time_from)
+        r_eventid = event.get("r_eventid", "0")
+        end = recovery_clocks.get(r_eventid, time_till) if r_eventid != "0" else time_till
+        end = min(end, time_till)
+        if end <= start:
+            continue
+        # Um trigger pode envolver vários hosts: a indisponibilidade vale para cada um
+        for host in event.get("hosts") or []:
+            position = host_positions.get(host["hostid"])
+            if position is None:
+                continue
+            host_idx.append(position)
+            starts.append(start)
+            ends.append(end)
+    return (np.asarray(host_idx, dtype=np.int64),
+            np.asarray(starts, dtype=np.int64),
+            np.asarray(ends, dtype=np.int64))
+
+
+def merge_downtime(host_idx: np.ndarray, starts: np.ndarray, ends: np.ndarray, n_hosts: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    União dos intervalos por host via sort-and-sweep vetorizado.
+    Retorna (segundos indisponíveis por host, número de indisponibilidades por host).
+    """
+    downtime = np.zeros(n_hosts, dtype=np.int64)
+    outages = np.zeros(n_hosts, dtype=np.int64)
+    if host_idx.size == 0:
+        return downtime, outages
+
+    # Ordena por (host, início). Cada host é deslocado por um offset maior que
+    # qualquer instante relativo, então o máximo acumulado de um host nunca
+    # alcança o próximo e a varredura pode ser feita num único array.
+    order = np.lexsort((starts, host_idx))
+    hosts = host_idx[order]
+    base = starts.min()
+    offset = hosts * (int(ends.max() - base) + 1)
+    s = starts[order] - base + offset
+    e = ends[order] - base + offset
+
+    reach = np.maximum.accumulate(e)
+    # Começa um novo bloco quando o intervalo inicia depois de tudo o que veio antes (contíguos se unem)
+    new_block = np.empty(s.size, dtype=bool)
+    new_block[0] = True
+    new_block[1:] = s[1:] > reach[:-1]
+    block_starts = np.flatnonzero(new_block)
+
+    block_ends = np.maximum.reduceat(e, block_starts)
+    block_hosts = hosts[block_starts]
+    downtime = np.bincount(block_hosts, weights=block_ends - s[block_starts], minlength=n_hosts).astype(np.int64)
+    outages = np.bincount(block_hosts, minlength=n_hosts).astype(np.int64)
+    return downtime, outages
+
+
+# --- CÁLCULO DO SLA ---
+
+def _summarize(hosts: List[Dict[str, Any]], downtime: np.ndarray, outages: np.ndarray,
+               time_from: int, time_till: int, min_severity: int, sla_target: float, top: int) -> Dict[str, Any]:
+    period = time_till - time_from
+    availability = np.round(100.0 * (1.0 - downtime / period), 4) if period > 0 else np.full(len(hosts), 100.0)
+
+    host_rows = [
+        {
+            "hostid": host["hostid"],
+            "name": host.get("name"),
+            "availability": float(availability[i]),
+            "downtime_seconds": int(downtime[i]),
+            "outages": int(outages[i]),
+        }
+        for i, host in enumerate(hosts)
+    ]
+
+    group_members = defaultdict(list)
+    for i, host in enumerate(hosts):
+        for group in host.get("groups") or []:
+            group_members[group["name"] if isinstance(group, dict) else group].append(i)
+    groups = []
+    for name, members in sorted(group_members.items()):
+        idx = np.asarray(members)
+        groups.append({
+            "name": name,
+            "hosts": len(members),
+            "availability": round(float(availability[idx].mean()), 4),
+            "downtime_seconds": int(downtime[idx].sum()),
+            "hosts_below_target": int((availability[idx] < sla_target).sum()),
+        })
+
+    worst = np.argsort(-downtime, kind="stable")[:top]
+    return {
+        "time_from": time_from,
+        "time_till": time_till,
+        "period_seconds": period,
+        "min_severity": min_severity,
+        "sla_target": sla_target,
+        "summary": {
+            "hosts": len(hosts),
+            "average_availability": round(float(availability.mean()), 4) if len(hosts) else 100.0,
+            "total_downtime_seconds": int(downtime.sum()),
+            "hosts_with_downtime": int((downtime > 0).sum()),
+            "hosts_below_target": int((availability < sla_target).sum()),
+        },
+        "worst_offenders": [host_rows[i] for i in worst if downtime[i] > 0],
+        "groups": groups,
+        "hosts": host_rows,
+    }
+
+
+def compute_sla(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None,
+                min_severity: int = DEFAULT_MIN_SEVERITY, sla_target: float = DEFAULT_SLA_TARGET, top: int = 10) -> Dict[str, Any]:
+    """
+    Disponibilidade por host e por grupo de hosts no período, com o tempo total
+    indisponível e os piores ofensores. Períodos fechados ficam em cache sem expiração.
+    """
+    closed = is_closed_period(time_till)
+    period_key = (time_from, time_till) if closed else open_period_key(time_from, time_till, OPEN_PERIOD_TTL)
+    cache_key = (api_url, *period_key, tuple(sorted(hostids or [])), min_severity, sla_target, top)
+    if closed:
+        with _closed_lock:
+            cached = _closed_cache.get(cache_key)
+            if cached is not None:
+                _closed_cache.move_to_end(cache_key)
+                return cached
+    else:
+        cached = _open_cache.get(repr(cache_key))
+        if cached is not None:
+            return cached
+
+    hosts = zabbix_service.get_hosts_for_search(api_url, token)
+    if hostids:
+        wanted = set(hostids)
+        hosts = [h for h in hosts if h["hostid"] in wanted]
+    host_positions = {h["hostid"]: i for i, h in enumerate(hosts)}
+
+    problems = fetch_problem_events(api_url, token, time_from, time_till, min_severity, hostids)
+    r_eventids = sorted({p["r_eventid"] for p in problems if p.get("r_eventid", "0") != "0"})
+    recovery_clocks = fetch_recovery_clocks(api_url, token, r_eventids)
+
+    host_idx, starts, ends = build_intervals(problems, recovery_clocks, time_from, time_till, host_positions)
+    downtime, outages = merge_downtime(host_idx, starts, ends, len(hosts))
+    result = _summarize(hosts, downtime, outages, time_from, time_till, min_severity, sla_target, top)
+
+    if closed:
+        with _closed_lock:
+            _closed_cache[cache_key] = result
+            while len(_closed_cache) > _CLOSED_PERIOD_CACHE_SIZE:
+                _closed_cache.popitem(last=False)
+    else:
+        _open_cache.set(repr(cache_key), result, OPEN_PERIOD_TTL)
+    return result
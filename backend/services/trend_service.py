@@ -0,0 +1,240 @@
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from services import zabbix_service
+from utils.cache import TTLCache
+
+# --- PREVISÃO DE CAPACIDADE ---
+# As tendências horárias ('trend.get') de disco, memória e CPU de todo o tenant
+# são carregadas numa matriz (itens x horas) com máscara para as horas sem
+# dado. A regressão é ajustada para todas as linhas de uma só vez: mínimos
+# quadrados ponderados em forma fechada e, no modo robusto, algumas iterações
+# de IRLS com pesos de Huber, para que um pico isolado (ex.: um dump
+# temporário) não distorça a tendência. Nada é feito item a item.
+#
+# A matriz não cobre o tenant inteiro de uma vez: com 10k hosts e 180 dias
+# seriam ~70k x 4320 float64 (~2,4 GB por array, fora os temporários do IRLS).
+# Os itens vão em blocos de FIT_BLOCK_ITEMS linhas; cada bloco é carregado,
+# ajustado e descartado, e só os resultados por item são concatenados.
+
+DEFAULT_DAYS = 30
+DEFAULT_THRESHOLD = 100.0
+DEFAULT_HORIZON_DAYS = 365
+MIN_POINTS = 24  # Pelo menos um dia de tendência horária para ajustar a reta
+HUBER_K = 1.345
+HUBER_ITERATIONS = 6
+RESULTS_TTL = 900  # As tendências são horárias, recalcular mais que isso não muda o resultado
+_TREND_BATCH_SIZE = 200
+FIT_BLOCK_ITEMS = 2000  # Linhas por bloco: ~70 MB por array com 180 dias
+
+_results_cache = TTLCache("trends")
+
+CPU_KEY = 'system.cpu.util'
+MEMORY_KEYS = ('vm.memory.utilization', 'vm.memory.size[pavailable]')
+
+
+# --- ITENS E TENDÊNCIAS ---
+
+def _classify_item(key: str) -> Optional[Tuple[str, Optional[str]]]:
+    """(tipo de métrica, partição) de um item de capacidade, ou None se não for um."""
+    partition = zabbix_service.parse_pused_partition(key)
+    if partition:
+        return "disk", partition
+    if key == CPU_KEY:
+        return "cpu", None
+    if key in MEMORY_KEYS:
+        return "memory", None
+    return None
+
+
+def get_capacity_items(api_url: str, token: str, metrics: List[str]) -> List[Dict[str, Any]]:
+    """Itens de capacidade do tenant, um por (host, métrica, partição)."""
+    items = zabbix_service.call_zabbix_api(api_url, token, "item.get", {
+        "output": ["itemid", "key_", "name"],
+        "selectHosts": ["hostid", "name"],
+        "monitored": True,
+        "search": {"key_": ["vfs.fs.size[", "vfs.fs.dependent.size[", CPU_KEY, "vm.memory."]},
+        "searchByAny": True,
+    }, ttl_seconds=300)
+
+    selected = {}
+    for item in items:
+        kind = _classify_item(item['key_'])
+        if kind is None or kind[0] not in metrics or not item.get('hosts'):
+            continue
+        host = item['hosts'][0]
+        identity = (host['hostid'], kind[0], kind[1])
+        # Memória: prefere 'utilization' ao 'pavailable' (que precisa ser invertido)
+        if identity in selected and selected[identity]['key_'] == MEMORY_KEYS[0]:
+            continue
+        selected[identity] = {
+            "itemid": item['itemid'],
+            "key_": item['key_'],
+            "hostid": host['hostid'],
+            "host": host['name'],
+            "metric": kind[0],
+            "partition": kind[1],
+        }
+    return list(selected.values())
+
+
+def load_trend_matrix(api_url: str, token: str, itemids: List[str], time_from: int, time_till: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Matriz (itens x horas) com a média horária de cada item e a máscara das
+    horas que têm dado. As tendências são buscadas em lotes de itens.
+    """
+    n_hours = max(1, (time_till - time_from) // 3600)
+    values = np.zeros((len(itemids), n_hours), dtype=np.float64)
+    mask = np.zeros((len(itemids), n_hours), dtype=bool)
+    row_of = {itemid: i for i, itemid in enumerate(itemids)}
+
+    for start in range(0, len(itemids), _TREND_BATCH_SIZE):
+        trends = zabbix_service.call_zabbix_api(api_url, token, "trend.get", {
+            "output": ["itemid", "clock", "value_avg"],
+            "itemids": itemids[start:start + _TREND_BATCH_SIZE],
+            "time_from": time_from,
+            "time_till": time_till,
+        })
+        if not trends:
+            continue
+        rows = np.fromiter((row_of.get(t['itemid'], -1) for t in trends), dtype=np.int64, count=len(trends))
+        cols = (np.fromiter((int(t['clock']) for t in trends), dtype=np.int64, count=len(trends)) - time_from) // 3600
+        vals = np.fromiter((float(t['value_avg']) for t in trends), dtype=np.float64, count=len(trends))
+        ok = (rows >= 0) & (cols >= 0) & (cols < n_hours)
+        values[rows[ok], cols[ok]] = vals[ok]
+        mask[rows[ok], cols[ok]] = True
+    return values, mask
+
+
+# --- REGRESSÃO EM LOTE ---
+
+def _weighted_fit(x: np.ndarray, y: np.ndarray, w: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Mínimos quadrados ponderados linha a linha, em forma fechada (todas as linhas juntas)."""
+    sw = w.sum(axis=1)
+    sx = (w * x).sum(axis=1)
+    sy = (w * y).sum(axis=1)
+    sxx = (w * x * x).sum(axis=1)
+    sxy = (w * x * y).sum(axis=1)
+    denom = sw * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denom > 0, (sw * sxy - sx * sy) / denom, 0.0)
+        intercept = np.where(sw > 0, (sy - slope * sx) / sw, 0.0)
+    return slope, intercept
+
+
+def _masked_median(a: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Mediana por linha só das posições válidas (bem mais rápido que np.nanmedian)."""
+    ordered = np.sort(np.where(mask, a, np.inf), axis=1)
+    counts = mask.sum(axis=1)
+    rows = np.arange(a.shape[0])
+    lo = ordered[rows, np.maximum(counts - 1, 0) // 2]
+    hi = ordered[rows, np.maximum(counts, 1) // 2 - (counts == 0)]
+    return np.where(counts > 0, (lo + hi) / 2.0, 0.0)
+
+
+def fit_trends(values: np.ndarray, mask: np.ndarray, method: str = "huber") -> Dict[str, np.ndarray]:
+    """
+    Ajusta y = a + b*x (x em dias desde o início) para cada linha da matriz.
+    Retorna inclinação (por dia), intercepto, R² e número de pontos por linha.
+    """
+    n_rows, n_cols = values.shape
+    x = np.broadcast_to(np.arange(n_cols, dtype=np.float64) / 24.0, (n_rows, n_cols))
+    w = mask.astype(np.float64)
+    slope, intercept = _weighted_fit(x, values, w)
+
+    if method == "huber":
+        for _ in range(HUBER_ITERATIONS):
+            residuals = values - (intercept[:, None] + slope[:, None] * x)
+            # Escala robusta (MAD) por linha, ignorando as horas sem dado
+            scale = 1.4826 * _masked_median(np.abs(residuals), mask)
+            scale = np.where(scale > 1e-9, scale, 1e-9)
+            with np.errstate(divide="ignore"):
+                huber = np.minimum(1.0, HUBER_K * scale[:, None] / np.abs(residuals))
+            w = np.where(mask, huber, 0.0)
+            slope, intercept = _weighted_fit(x, values, w)
+
+    points = mask.sum(axis=1)
+    fitted = intercept[:, None] + slope[:, None] * x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(points > 0, (values * mask).sum(axis=1) / points, 0.0)
+        ss_tot = (((values - mean[:, None]) ** 2) * mask).sum(axis=1)
+        ss_res = (((values - fitted) ** 2) * mask).sum(axis=1)
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, 0.0)
+    return {"slope": slope, "intercept": intercept, "r2": r2, "points": points}
+
+
+def days_until_threshold(fit: Dict[str, np.ndarray], n_cols: int, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """(valor ajustado no fim da janela, dias até atingir o limite — inf se estável ou caindo)."""
+    current = fit["intercept"] + fit["slope"] * (n_cols / 24.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days = np.where(fit["slope"] > 0, (threshold - current) / fit["slope"], np.inf)
+    days = np.where(current >= threshold, 0.0, days)
+    return current, days
+
+
+# --- PREVISÃO ---
+
+def _fit_block(api_url: str, token: str, items: List[Dict[str, Any]], time_from: int, time_till: int,
+               method: str, threshold: float) -> Dict[str, np.ndarray]:
+    """Carrega e ajusta um bloco de itens; retorna só os resultados por item (vetores do tamanho do bloco)."""
+    values, mask = load_trend_matrix(api_url, token, [i['itemid'] for i in items], time_from, time_till)
+    # 'pavailable' mede o espaço livre: converte para percentual usado
+    inverted = np.array([i['key_'] == MEMORY_KEYS[1] for i in items])
+    values[inverted] = np.where(mask[inverted], 100.0 - values[inverted], 0.0)
+
+    fit = fit_trends(values, mask, method=method)
+    current, remaining = days_until_threshold(fit, values.shape[1], threshold)
+    last_value = np.where(mask.any(axis=1), values[np.arange(len(items)), mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)], np.nan)
+    return {**fit, "current": current, "remaining": remaining, "last_value": last_value}
+
+
+def forecast_capacity(api_url: str, token: str, days: int = DEFAULT_DAYS, threshold: float = DEFAULT_THRESHOLD,
+                      metrics: List[str] = None, method: str = "huber",
+                      horizon_days: int = DEFAULT_HORIZON_DAYS, limit: int = 50) -> Dict[str, Any]:
+    """
+    Estimativa de "dias até encher" para disco, memória e CPU de todos os hosts
+    do tenant, ordenada por urgência. Itens estáveis, sem dados suficientes ou
+    além do horizonte ficam de fora da lista.
+    """
+    metrics = sorted(metrics or ["disk", "memory", "cpu"])
+    cache_key = f"{api_url}:{days}:{threshold}:{','.join(metrics)}:{method}:{horizon_days}:{limit}"
+    cached = _results_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    time_till = int(time.time()) // 3600 * 3600
+    time_from = time_till - days * 24 * 3600
+    items = get_capacity_items(api_url, token, metrics)
+    forecasts = []
+    if items:
+        blocks = [_fit_block(api_url, token, items[start:start + FIT_BLOCK_ITEMS], time_from, time_till, method, threshold)
+                  for start in range(0, len(items), FIT_BLOCK_ITEMS)]
+        fit = {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+        current, remaining, last_value = fit["current"], fit["remaining"], fit["last_value"]
+
+        eligible = np.flatnonzero((fit["points"] >= MIN_POINTS) & (remaining <= horizon_days))
+        order = eligible[np.argsort(remaining[eligible], kind="stable")][:limit]
+        for i in order:
+            forecasts.append({
+                **items[i],
+                "current": round(float(current[i]), 2),
+                "last_value": round(float(last_value[i]), 2),
+                "slope_per_day": round(float(fit["slope"][i]), 4),
+                "days_until_full": round(float(remaining[i]), 1),
+                "estimated_full_at": int(time_till + remaining[i] * 86400),
+                "r2": round(float(fit["r2"][i]), 3),
+                "points": int(fit["points"][i]),
+            })
+
+    result = {
+        "time_from": time_from,
+        "time_till": time_till,
+        "threshold": threshold,
+        "method": method,
+        "items_analyzed": len(items),
+        "forecasts": forecasts,
+    }
+    _results_cache.set(cache_key, result, RESULTS_TTL)
+    return result
@@ -0,0 +1,247 @@
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+# --- CASSETES DO ZABBIX (GRAVAÇÃO E REPRODUÇÃO) ---
+# Um cassete é um arquivo JSON Lines (comprimido com gzip se o nome terminar
+# em .gz) com todos os pares requisição/resposta JSON-RPC trocados com o
+# Zabbix, na ordem em que aconteceram, com o tempo de cada chamada. Gravado
+# uma vez a partir de um ambiente real, ele pode ser reproduzido localmente
+# (CassetteTransport, ligado com zabbix_service.set_transport) para perfis e
+# testes de carga com o formato de dados de produção.
+#
+# Credenciais não vão para o arquivo: o 'auth' do payload é descartado, o
+# usuário/senha da URL são removidos e campos sensíveis (senhas, tokens,
+# sessões) são trocados por "***" em qualquer nível dos parâmetros e da resposta.
+
+CASSETTE_VERSION = 1
+REDACTED = "***"
+SENSITIVE_KEYS = {"auth", "password", "passwd", "token", "sessionid", "session", "secret", "api_key", "apikey"}
+# Métodos cujo resultado é a própria credencial
+SENSITIVE_RESULT_METHODS = {"user.login", "token.generate", "token.get"}
+# Parâmetros derivados do relógio: na reprodução o mesmo pedido chega com outros valores
+TIME_PARAMS = ("time_from", "time_till")
+
+
+def redact(value: Any) -> Any:
+    """Cópia de `value` com os campos sensíveis trocados por '***'."""
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def redact_url(api_url: str) -> str:
+    """URL da API sem usuário, senha, query e fragmento."""
+    parts = urlsplit(api_url)
+    host = parts.hostname or ""
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    return urlunsplit((parts.scheme, host, parts.path, "", ""))
+
+
+# "usuario:senha@" de URLs citadas em mensagens de erro
+_USERINFO_RE = re.compile(r"(?<=://)[^/@\s'\"]+@")
+
+
+def redact_error(message: str, api_url: str) -> str:
+    """Mensagem de erro de transporte sem a URL completa da API nem credenciais de outras URLs."""
+    message = message.replace(api_url, redact_url(api_url))
+    return _USERINFO_RE.sub("", message)
+
+
+def process_path(path: str) -> str:
+    """Caminho do cassete com o pid antes da extensão (trafego.jsonl.gz -> trafego.<pid>.jsonl.gz)."""
+    suffix = ".gz" if path.endswith(".gz") else ""
+    root, ext = os.path.splitext(path[:len(path) - len(suffix)])
+    return f"{root}.{os.getpid()}{ext}{suffix}"
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _request_key(method: str, params: Any, loose: bool = False) -> str:
+    if loose and isinstance(params, dict):
+        params = {k: v for k, v in params.items() if k not in TIME_PARAMS}
+    return method + " " + json.dumps(params, sort_keys=True, default=str)
+
+
+# --- GRAVAÇÃO ---
+
+class CassetteRecorder:
+    """Acrescenta ao cassete cada chamada feita pelo call_zabbix_api (thread-safe)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._file = _open(path, "w")
+        self._write({
+            "cassette": CASSETTE_VERSION,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        })
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def record(self, api_url: str, payload: Dict[str, Any], started: float, elapsed: float,
+               response: Dict[str, Any] = None, transport_error: str = None):
+        method = payload.get("method")
+        if response is not None and method in SENSITIVE_RESULT_METHODS and "result" in response:
+            response = {**response, "result": REDACTED}
+        record = {
+            "offset_ms": round((started - self._started) * 1000, 3),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "tenant": redact_url(api_url),
+            "method": method,
+            "params": redact(payload.get("params", {})),
+        }
+        if transport_error is not None:
+            record["transport_error"] = redact_error(transport_error, api_url)
+        else:
+            record["response"] = redact({k: v for k, v in response.items() if k != "id"})
+        with self._lock:
+            record = {"seq": self.count, **record}
+            self.count += 1
+        self._write(record)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# --- REPRODUÇÃO ---
+
+def read_cassette(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Cabeçalho e registros de um cassete, na ordem de gravação."""
+    header, records = {}, []
+    with _open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "cassette" in entry:
+                header = entry
+            else:
+                records.append(entry)
+    if header.get("cassette") != CASSETTE_VERSION:
+        raise ValueError(f"Cassete {path} sem cabeçalho ou em versão não suportada")
+    return header, records
+
+
+class CassetteTransport:
+    """
+    Transporte do zabbix_service que responde a partir de um cassete.
+
+    A requisição é casada por método e parâmetros; se não houver par exato, os
+    parâmetros de tempo (time_from/time_till) são ignorados, já que dependem do
+    relógio de quem chamou. Gravações repetidas do mesmo pedido são servidas em
+    rodízio, na ordem original, o que torna a reprodução determinística.
+
+    timing:
+      - "original": espera o mesmo tempo que a chamada levou ao ser gravada;
+      - "compressed": espera esse tempo multiplicado por `time_scale` (ex.: 0.1);
+      - "none": responde imediatamente.
+    Pedidos fora do cassete recebem um erro JSON-RPC (viram ZabbixAPIException).
+    """
+
+    def __init__(self, path: str, timing: str = "original", time_scale: float = 0.1):
+        if timing not in ("original", "compressed", "none"):
+            raise ValueError("timing deve ser 'original', 'compressed' ou 'none'")
+        self.path = path
+        self.timing = timing
+        self.time_scale = time_scale
+        self.header, self.records = read_cassette(path)
+        self._exact: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._loose: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for record in self.records:
+            self._exact[_request_key(record["method"], record["params"])].append(record)
+            self._loose[_request_key(record["method"], record["params"], loose=True)].append(record)
+        self._cursors: Dict[Tuple[int, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.stats = {"exact": 0, "loose": 0, "miss": 0}
+
+    def _next(self, index: Dict[str, List[Dict[str, Any]]], key: str) -> Optional[Dict[str, Any]]:
+        candidates = index.get(key)
+        if not candidates:
+            return None
+        with self._lock:
+            position = self._cursors[(id(index), key)]
+            self._cursors[(id(index), key)] = position + 1
+        return candidates[position % len(candidates)]
+
+    def _delay(self, record: Dict[str, Any]) -> float:
+        if self.timing == "none":
+            return 0.0
+        seconds = record.get("elapsed_ms", 0) / 1000.0
+        return seconds if self.timing == "original" else seconds * self.time_scale
+
+    def __call__(self, api_url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        method, params = payload.get("method"), redact(payload.get("params", {}))
+        record = self._next(self._exact, _request_key(method, params))
+        kind = "exact"
+        if record is None:
+            record = self._next(self._loose, _request_key(method, params, loose=True))
+            kind = "loose"
+        if record is None:
+            with self._lock:
+                self.stats["miss"] += 1
+            return {"jsonrpc": "2.0", "id": payload.get("id"),
+                    "error": {"code": -32602, "message": "Requisição fora do cassete.", "data": method}}
+        with self._lock:
+            self.stats[kind] += 1
+
+        delay = self._delay(record)
+        if delay > 0:
+            time.sleep(min(delay, timeout))
+        if "transport_error" in record:
+            raise requests.exceptions.ConnectionError(f"(cassete) {record['transport_error']}")
+        # Cópia por JSON: quem chama pode alterar a resposta sem afetar as próximas reproduções
+        return {**json.loads(json.dumps(record["response"])), "id": payload.get("id")}
+
+    def summary(self) -> Dict[str, Any]:
+        by_method: Dict[str, int] = defaultdict(int)
+        for record in self.records:
+            by_method[record["method"]] += 1
+        return {
+            "path": self.path,
+            "recorded_at": self.header.get("recorded_at"),
+            "calls": len(self.records),
+            "distinct_requests": len(self._exact),
+            "by_method": dict(sorted(by_method.items())),
+            "recorded_ms": round(sum(r.get("elapsed_ms", 0) for r in self.records), 1),
+        }
+
+    def hostids(self) -> Iterator[str]:
+        """Hostids que aparecem nas respostas do host.get gravadas (úteis para montar requisições de carga)."""
+        seen = set()
+        for record in self.records:
+            if record["method"] != "host.get":
+                continue
+            result = record.get("response", {}).get("result")
+            for host in result if isinstance(result, list) else []:
+                hostid = host.get("hostid")
+                if hostid and hostid not in seen:
+                    seen.add(hostid)
+                    yield hostid
@@ -1,14 +1,35 @@
 import requests
 import json
+import os
 import re
-import traceback
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 import time
 from datetime import datetime, timedelta
 from collections import defaultdict
+from functools import lru_cache
+from services import search_index, zabbix_cassette
+from utils.cache import TTLCache
+from utils.logger import get_logger
+from utils.metrics import registry
+from utils.timing import add_phase
+
+logger = get_logger(__name__)
+
+# Latência por método JSON-RPC e por tenant; chamadas servidas pelo cache não entram.
+# O tenant é a URL da API sem usuário, senha nem query (que podem levar credenciais).
+_api_duration = registry.histogram(
+    "zabbix_api_request_duration_seconds", "Duração das chamadas à API JSON-RPC do Zabbix.", ["method", "tenant"]
+)
+_api_errors = registry.counter(
+    "zabbix_api_errors_total", "Chamadas à API do Zabbix que falharam.", ["method", "tenant"]
+)
+
+@lru_cache(maxsize=256)
+def _tenant_label(api_url: str) -> str:
+    return zabbix_cassette.redact_url(api_url)
 
 # --- INÍCIO DO SISTEMA DE CACHE ---
-_cache: Dict[str, Dict[str, Any]] = {}
+_cache = TTLCache("zabbix")
 # --- FIM DO SISTEMA DE CACHE ---
 
 class ZabbixAPIException(Exception):
@@ -19,32 +40,87 @@ class ZabbixAPIException(Exception):
     def __str__(self):
         return f"{super().__str__()} Details: {self.details}"
 
+# --- TRANSPORTE ---
+# Função que envia o payload JSON-RPC e devolve a resposta já decodificada.
+# Por padrão é um POST HTTP; benchmarks e ferramentas de teste podem trocá-la
+# (ex.: servir fixtures em memória) sem alterar nenhuma das funções abaixo.
+# Falhas de rede devem sair como requests.exceptions.RequestException.
+
+def http_transport(api_url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    response = requests.post(api_url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+_transport: Callable[[str, Dict[str, Any], float], Dict[str, Any]] = http_transport
+
+def set_transport(transport: Callable[[str, Dict[str, Any], float], Dict[str, Any]] = None):
+    """Troca o transporte das chamadas ao Zabbix (None volta ao HTTP)."""
+    global _transport
+    _transport = transport or http_transport
+
+# --- GRAVAÇÃO DE CASSETES ---
+# Com ZABBIX_CASSETTE_RECORD=<arquivo.jsonl[.gz]> (ou start_recording), cada
+# chamada que chega ao Zabbix (acertos de cache não) é gravada, sem
+# credenciais, para ser reproduzida depois com zabbix_cassette.CassetteTransport.
+# A gravação pela variável começa no lifespan (start_recording_from_env), e
+# cada processo grava no seu arquivo: com vários workers, um não trunca o do outro.
+
+_recorder: Optional[zabbix_cassette.CassetteRecorder] = None
+
+def start_recording(path: str) -> zabbix_cassette.CassetteRecorder:
+    global _recorder
+    stop_recording()
+    _recorder = zabbix_cassette.CassetteRecorder(path)
+    logger.info("Gravando chamadas ao Zabbix em cassete", extra={"cassette": path})
+    return _recorder
+
+def stop_recording():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+        logger.info("Cassete fechado", extra={"cassette": recorder.path, "calls": recorder.count})
+
+def start_recording_from_env() -> Optional[zabbix_cassette.CassetteRecorder]:
+    """Grava em <ZABBIX_CASSETTE_RECORD com o pid> se a variável estiver definida."""
+    path = os.getenv("ZABBIX_CASSETTE_RECORD")
+    if not path:
+        return None
+    return start_recording(zabbix_cassette.process_path(path))
+
 def call_zabbix_api(api_url: str, token: str, method: str, params: Dict[str, Any], ttl_seconds: int = 0) -> Any:
     if ttl_seconds > 0:
         cache_key = f"{api_url}:{method}:{json.dumps(params, sort_keys=True)}"
-        current_time = time.time()
-        if cache_key in _cache and _cache[cache_key]['expires_at'] > current_time:
-            return _cache[cache_key]['data']
+        cached = _cache.get(cache_key)
+        if cached is not None:
+            return cached
 
     # Se não há TTL, ou se o cache expirou/não existe, executa a chamada
     payload = { "jsonrpc": "2.0", "method": method, "params": params, "auth": token, "id": 1 }
+    started = time.perf_counter()
     try:
-        response = requests.post(api_url, json=payload, timeout=30)
-        response.raise_for_status()
-        result = response.json()
+        result = _transport(api_url, payload, 30)
+        elapsed = time.perf_counter() - started
+        if _recorder is not None:
+            _recorder.record(api_url, payload, started, elapsed, response=result)
+        _api_duration.observe(elapsed, method, _tenant_label(api_url))
+        add_phase("zabbix", elapsed)
         if 'error' in result:
+            _api_errors.inc(method, _tenant_label(api_url))
             raise ZabbixAPIException(f"Zabbix API Error: {result['error']}", result['error'])
         
         data = result.get('result', [])
         
         if ttl_seconds > 0:
             # Armazena o novo dado no cache
-            _cache[cache_key] = {
-                'data': data,
-                'expires_at': time.time() + ttl_seconds
-            }
+            _cache.set(cache_key, data, ttl_seconds)
         return data
     except requests.exceptions.RequestException as e:
+        elapsed = time.perf_counter() - started
+        if _recorder is not None:
+            _recorder.record(api_url, payload, started, elapsed, transport_error=str(e))
+        _api_errors.inc(method, _tenant_label(api_url))
+        add_phase("zabbix", elapsed)
         raise ZabbixAPIException(f"Erro de conexão com a API Zabbix: {e}")
 
 def get_zabbix_hosts(api_url: str, token: str) -> List[Dict[str, Any]]:
@@ -52,6 +128,20 @@ def get_zabbix_hosts(api_url: str, token: str) -> List[Dict[str, Any]]:
         "output": ["hostid", "name"], "selectInterfaces": ["ip"], "filter": {"status": 0}
     }, ttl_seconds=300)
 
+def get_hosts_for_search(api_url: str, token: str) -> List[Dict[str, Any]]:
+    """Lista de hosts com os campos indexados pela busca (nome, IP, grupos e tags)."""
+    return call_zabbix_api(api_url, token, "host.get", {
+        "output": ["hostid", "host", "name"],
+        "selectInterfaces": ["ip"],
+        "selectGroups": ["name"],
+        "selectTags": ["tag", "value"],
+    }, ttl_seconds=search_index.INDEX_REFRESH_SECONDS)
+
+def search_hosts(api_url: str, token: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Busca aproximada de hosts no índice em memória do tenant, sem consultar o Zabbix a cada tecla."""
+    index = search_index.ensure_index(api_url, lambda: get_hosts_for_search(api_url, token))
+    return index.search(query, limit=limit)
+
 def get_active_triggers(api_url: str, token: str) -> List[Dict[str, Any]]:
     triggers = call_zabbix_api(api_url, token, "trigger.get", {
         "output": ["triggerid", "description", "priority", "lastchange"],
@@ -66,6 +156,14 @@ def get_active_triggers(api_url: str, token: str) -> List[Dict[str, Any]]:
     return triggers
 
 
+def parse_pused_partition(key: str):
+    """Nome da partição de um item 'vfs.fs[.dependent].size[<partição>,pused]', ou None."""
+    if (key.startswith('vfs.fs.size[') or key.startswith('vfs.fs.dependent.size[')) and ',pused]' in key:
+        partition_match = re.search(r'\[([^,]+),pused\]', key)
+        if partition_match:
+            return partition_match.group(1)
+    return None
+
 def get_key_metrics(api_url: str, token: str, host_id: str):
     """Busca as principais métricas de um host: CPU, Memória, Disco(s) e Rede."""
     
@@ -77,7 +175,10 @@ def get_key_metrics(api_url: str, token: str, host_id: str):
 
     if not all_items:
         return []
+    return summarize_key_metrics(all_items)
 
+def summarize_key_metrics(all_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """CPU, memória, partições e a interface de rede principal a partir dos itens de um host (sem chamadas à API)."""
     # 2. Criar um mapa de chave -> item para acesso rápido
     items_map = {item['key_']: item for item in all_items}
     
@@ -102,20 +203,18 @@ def get_key_metrics(api_url: str, token: str, host_id: str):
     # 4. Processar Discos (com lógica anti-duplicata)
     processed_partitions = set()
     for key, item in items_map.items():
-        if (key.startswith('vfs.fs.size[') or key.startswith('vfs.fs.dependent.size[')) and ',pused]' in key:
-            partition_match = re.search(r'\[([^,]+),pused\]', key)
-            if partition_match:
-                partition_name = partition_match.group(1)
-                if partition_name not in processed_partitions:
-                    processed_partitions.add(partition_name)
-                    value = item.get('lastvalue', '0')
-                    
-                    results.append({
-                        "key": f"disk_{partition_name.replace('/', '_').replace('-', '_')}",
-                        "value": f"{float(value):.2f}",
-                        "label": f"Espaço Utilizado ({partition_name})",
-                        "partition": partition_name
-                    })
+        partition_name = parse_pused_partition(key)
+        if partition_name:
+            if partition_name not in processed_partitions:
+                processed_partitions.add(partition_name)
+                value = item.get('lastvalue', '0')
+                
+                results.append({
+                    "key": f"disk_{partition_name.replace('/', '_').replace('-', '_')}",
+                    "value": f"{float(value):.2f}",
+                    "label": f"Espaço Utilizado ({partition_name})",
+                    "partition": partition_name
+                })
 
     # 5. Processar Rede (Entrada e Saída)
     main_net_interface = None
@@ -165,8 +264,11 @@ def get_alert_history(api_url: str, token: str, time_from: int, time_till: int,
     if not problems:
         return []
 
+    return _format_alerts(api_url, token, problems)
+
+def _format_alerts(api_url: str, token: str, problems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # --- 2. EXTRAIR OS IDs DAS TRIGGERS DOS PROBLEMAS ---
-    trigger_ids = [p['objectid'] for p in problems]
+    trigger_ids = list({p['objectid'] for p in problems})
 
     # --- 3. BUSCAR AS TRIGGERS E OS HOSTS RELACIONADOS ---
     triggers = call_zabbix_api(api_url, token, "trigger.get", {
@@ -194,6 +296,29 @@ def get_alert_history(api_url: str, token: str, time_from: int, time_till: int,
             
     return formatted_alerts
 
+def aggregate_by_hour(history_data: List[Dict[str, Any]], itemid_to_host: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Média por hora e os 3 hosts de maior valor em cada hora, a partir dos pontos do history.get."""
+    hourly_aggr = defaultdict(lambda: {'sum': 0, 'count': 0, 'hosts': []})
+    for point in history_data:
+        dt_object = datetime.fromtimestamp(int(point['clock']))
+        hour_key = dt_object.strftime('%Y-%m-%d %H:00')
+        value = float(point['value'])
+        host_name = itemid_to_host.get(point['itemid'], 'Desconhecido')
+        hourly_aggr[hour_key]['sum'] += value
+        hourly_aggr[hour_key]['count'] += 1
+        hourly_aggr[hour_key]['hosts'].append({'name': host_name, 'value': value})
+    formatted_data = []
+    for hour_str, data in sorted(hourly_aggr.items()):
+        avg = data['sum'] / data['count'] if data['count'] > 0 else 0
+        top_hosts = sorted(data['hosts'], key=lambda x: x['value'], reverse=True)[:3]
+        formatted_data.append({
+            'time_dt': datetime.strptime(hour_str, '%Y-%m-%d %H:00'),
+            'time': datetime.strptime(hour_str, '%Y-%m-%d %H:00').strftime('%H:%M'),
+            'value': round(avg, 2),
+            'top_hosts': [{'name': h['name'], 'value': round(h['value'], 2)} for h in top_hosts]
+        })
+    return formatted_data
+
 def get_aggregated_history(api_url: str, token: str, period: str = "24h"):
     # Esta função não será mais usada pelo dashboard principal, mas pode ser mantida para uso futuro.
     days = 1
@@ -222,29 +347,8 @@ def get_aggregated_history(api_url: str, token: str, period: str = "24h"):
     history_cpu = call_zabbix_api(api_url, token, "history.get", {**history_params, "itemids": itemids_cpu}) if itemids_cpu else []
     history_mem = call_zabbix_api(api_url, token, "history.get", {**history_params, "itemids": itemids_mem}) if itemids_mem else []
    
-    def aggregate_by_hour(history_data):
-        hourly_aggr = defaultdict(lambda: {'sum': 0, 'count': 0, 'hosts': []})
-        for point in history_data:
-            dt_object = datetime.fromtimestamp(int(point['clock']))
-            hour_key = dt_object.strftime('%Y-%m-%d %H:00')
-            value = float(point['value'])
-            host_name = itemid_to_host.get(point['itemid'], 'Desconhecido')
-            hourly_aggr[hour_key]['sum'] += value
-            hourly_aggr[hour_key]['count'] += 1
-            hourly_aggr[hour_key]['hosts'].append({'name': host_name, 'value': value})
-        formatted_data = []
-        for hour_str, data in sorted(hourly_aggr.items()):
-            avg = data['sum'] / data['count'] if data['count'] > 0 else 0
-            top_hosts = sorted(data['hosts'], key=lambda x: x['value'], reverse=True)[:3]
-            formatted_data.append({
-                'time_dt': datetime.strptime(hour_str, '%Y-%m-%d %H:00'),
-                'time': datetime.strptime(hour_str, '%Y-%m-%d %H:00').strftime('%H:%M'),
-                'value': round(avg, 2),
-                'top_hosts': [{'name': h['name'], 'value': round(h['value'], 2)} for h in top_hosts]
-            })
-        return formatted_data
-    agg_cpu = aggregate_by_hour(history_cpu)
-    agg_mem = aggregate_by_hour(history_mem)
+    agg_cpu = aggregate_by_hour(history_cpu, itemid_to_host)
+    agg_mem = aggregate_by_hour(history_mem, itemid_to_host)
     all_times_dt = set()
     if agg_cpu: all_times_dt.update([d['time_dt'] for d in agg_cpu])
     if agg_mem: all_times_dt.update([d['time_dt'] for d in agg_mem])
@@ -335,7 +439,10 @@ def get_host_triggers(api_url: str, token: str, host_id: str):
         "sortfield": "lastchange",
         "sortorder": "DESC"
     }, ttl_seconds=15)
-    
+    return group_host_triggers(triggers)
+
+def group_host_triggers(triggers: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Separa os triggers ativados de um host em critical/warning/info (em problema) e ok."""
     grouped = {
         "critical": [],
         "warning": [],
@@ -496,16 +603,10 @@ def get_full_zabbix_context(api_url: str, token: str):
     except ZabbixAPIException as e:
         raise e
     except Exception as e:
-        print("!!!!!!!!!!!!!! ERRO INESPERADO AO GERAR CONTEXTO COMPLETO !!!!!!!!!!!!!!")
-        traceback.print_exc()
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        logger.exception("Erro inesperado ao gerar contexto completo do Zabbix")
         raise ZabbixAPIException(f"Erro ao gerar contexto completo do Zabbix: {e}")
 
-# --- INÍCIO DA CORREÇÃO ---
-# Esta é a função unificada que aceita o 'hostids' opcionalmente.
-# Ela substitui as duas versões que você tinha.
-def get_event_log(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None):
-    """Busca o log de eventos do Zabbix e formata para o frontend."""
+def _event_log_params(time_from: int, time_till: int, hostids: List[str] = None) -> Dict[str, Any]:
     params = {
         "output": "extend",
         "selectHosts": ["name"],
@@ -516,33 +617,161 @@ def get_event_log(api_url: str, token: str, time_from: int, time_till: int, host
         "expandDescription": True,
         "time_from": time_from,
         "time_till": time_till,
-        "sortfield": ["clock"],
-        "sortorder": "DESC",
-        "limit": 100 
     }
     # Adiciona o filtro de hostids se ele for fornecido
     if hostids:
         params["hostids"] = hostids
+    return params
+
+# --- INÍCIO DA CORREÇÃO ---
+# Esta é a função unificada que aceita o 'hostids' opcionalmente.
+# Ela substitui as duas versões que você tinha.
+def get_event_log(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None, limit: int = 100):
+    """Busca o log de eventos do Zabbix e formata para o frontend."""
+    params = {
+        **_event_log_params(time_from, time_till, hostids),
+        "sortfield": ["clock"],
+        "sortorder": "DESC",
+        "limit": limit
+    }
         
     events = call_zabbix_api(api_url, token, "event.get", params)
+    return format_event_log(events)
+
+def get_event_log_page(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None,
+                       limit: int = 100, cursor: str = None, since: str = None) -> Dict[str, Any]:
+    """
+    Log de eventos paginado por cursor, usando o eventid como chave.
+    - cursor: devolve a página de eventos mais antigos que o cursor (eventid_till).
+    - since: modo incremental, devolve apenas eventos mais novos que o cursor
+      (eventid_from), para que um refresh não baixe a janela inteira de novo.
+    Os eventos voltam sempre do mais novo para o mais antigo.
+    """
+    params = {**_event_log_params(time_from, time_till, hostids), "sortfield": ["eventid"], "limit": limit}
+    if since is not None:
+        # Sobe a partir do cursor; se houver mais que 'limit' eventos novos, o
+        # cliente repete a chamada com o 'latest_cursor' devolvido.
+        params["eventid_from"] = str(int(since) + 1)
+        params["sortorder"] = "ASC"
+    else:
+        params["sortorder"] = "DESC"
+        if cursor is not None:
+            params["eventid_till"] = str(int(cursor) - 1)
+
+    events = call_zabbix_api(api_url, token, "event.get", params)
+    if since is not None:
+        events.reverse()
+
+    formatted_log = format_event_log(events)
+    page_full = len(events) == limit
+    eventids = [int(e['eventid']) for e in events]
+
+    return {
+        "events": formatted_log,
+        # Cursor para a próxima página (mais antiga); ausente no modo incremental
+        "next_cursor": str(min(eventids)) if page_full and since is None else None,
+        # Maior eventid já visto: é o valor a enviar em 'since' no próximo refresh
+        "latest_cursor": str(max(eventids)) if eventids else since,
+        "has_more": page_full,
+    }
+
+def format_event_log_entry(event: Dict[str, Any]):
+    """Formata um evento bruto do 'event.get' para o log do frontend (None se não houver trigger)."""
+    trigger = event.get('relatedObject')
+    if not trigger:
+        return None
+    return {
+        "eventid": event.get('eventid'),
+        "time": datetime.fromtimestamp(int(event.get('clock'))).strftime('%d/%m %H:%M:%S'),
+        "description": event.get('name'),
+        "priority": trigger.get('priority'),
+        "host": event.get('hosts')[0]['name'] if event.get('hosts') else 'N/A',
+        "status": "PROBLEMA" if event.get('value') == '1' else "RESOLVIDO"
+    }
+
+def format_event_log(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Formata uma lista de eventos do 'event.get', descartando os que não têm trigger."""
+    return [entry for entry in map(format_event_log_entry, events) if entry]
+
+def iter_events(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None, page_size: int = 1000):
+    """
+    Percorre o 'event.get' em páginas, do evento mais recente para o mais antigo,
+    usando o eventid como chave (eventid_till). Produz os eventos brutos um a um,
+    mantendo em memória apenas uma página por vez.
+    """
+    for page in iter_event_pages(api_url, token, _event_log_params(time_from, time_till, hostids), page_size=page_size):
+        yield from page
+
+def iter_event_pages(api_url: str, token: str, params: Dict[str, Any], page_size: int = 1000):
+    """
+    Paginação por chave (eventid_till) de um 'event.get' arbitrário, do evento
+    mais novo para o mais antigo. Produz uma página (lista de eventos) por vez.
+    """
+    params = {**params, "sortfield": ["eventid"], "sortorder": "DESC", "limit": page_size}
+
+    eventid_till = None
+    while True:
+        page_params = dict(params)
+        if eventid_till is not None:
+            page_params["eventid_till"] = eventid_till
+        events = call_zabbix_api(api_url, token, "event.get", page_params)
+        if not events:
+            return
+        yield events
+        if len(events) < page_size:
+            return
+        eventid_till = str(int(events[-1]['eventid']) - 1)
+
+def iter_alert_history(api_url: str, token: str, time_from: int, time_till: int, hostids: List[str] = None, page_size: int = 1000):
+    """
+    Versão paginada do get_alert_history. O 'problem.get' não aceita cursor por
+    eventid, então a janela é percorrida pelo clock: cada página termina no clock
+    do problema mais antigo já lido, descartando os eventids repetidos na borda.
+    Se mais de 'page_size' problemas caem no mesmo segundo, a página se repete;
+    esse segundo é então lido inteiro (sem limit) e o cursor passa ao anterior.
+    """
+    problem_params = {
+        "output": ["objectid", "name", "severity", "clock", "eventid"],
+        "time_from": time_from,
+        "sortfield": ["eventid"],
+        "sortorder": "DESC",
+        "limit": page_size
+    }
+    if hostids:
+        problem_params["hostids"] = hostids
 
-    formatted_log = []
-    for event in events:
-        trigger = event.get('relatedObject')
-        if not trigger:
+    cursor_till = time_till
+    seen_at_boundary = set()
+    while True:
+        problems = call_zabbix_api(api_url, token, "problem.get", {**problem_params, "time_till": cursor_till})
+        fresh = [p for p in problems if p['eventid'] not in seen_at_boundary]
+        if not fresh and len(problems) < page_size:
+            return
+
+        if not fresh:
+            # Página cheia só com eventids já vistos: o segundo 'cursor_till' tem
+            # mais problemas que cabem numa página. Lê o segundo completo.
+            second_params = {k: v for k, v in problem_params.items() if k != "limit"}
+            second = call_zabbix_api(api_url, token, "problem.get",
+                                     {**second_params, "time_from": cursor_till, "time_till": cursor_till})
+            rest = [p for p in second if p['eventid'] not in seen_at_boundary]
+            if rest:
+                yield from _format_alerts(api_url, token, rest)
+            if cursor_till <= time_from:
+                return
+            cursor_till -= 1
+            seen_at_boundary = set()
             continue
-            
-        log_entry = {
-            "eventid": event.get('eventid'),
-            "time": datetime.fromtimestamp(int(event.get('clock'))).strftime('%d/%m %H:%M:%S'),
-            "description": event.get('name'),
-            "priority": trigger.get('priority'),
-            "host": event.get('hosts')[0]['name'] if event.get('hosts') else 'N/A',
-            "status": "PROBLEMA" if event.get('value') == '1' else "RESOLVIDO"
-        }
-        formatted_log.append(log_entry)
-            
-    return formatted_log
+
+        yield from _format_alerts(api_url, token, fresh)
+
+        if len(problems) < page_size:
+            return
+        oldest_clock = min(int(p['clock']) for p in problems)
+        if oldest_clock != cursor_till:
+            seen_at_boundary = set()
+        seen_at_boundary.update(p['eventid'] for p in problems if int(p['clock']) == oldest_clock)
+        cursor_till = oldest_clock
 # --- FIM DA CORREÇÃO ---
 
 def get_company_inventory(api_url: str, token: str, filter_text: str = None, include_heavy: bool = False):
@@ -556,14 +785,22 @@ def get_company_inventory(api_url: str, token: str, filter_text: str = None, inc
         "selectInventory": "extend",
         "selectItems": "count",
     }
-    if filter_text:
-        params["search"] = {"name": filter_text}
+    # O filtro é aplicado em memória sobre a lista completa (em cache por pouco
+    # tempo), e não com um 'search' no Zabbix a cada tecla. A semântica é a do
+    # antigo search={"name": ...}: trecho do nome, sem diferenciar maiúsculas.
+    # A busca aproximada (IP, grupos, tags, erros de digitação) fica em /hosts/search.
+    cached_hosts = call_zabbix_api(api_url, token, "host.get", params, ttl_seconds=60)
 
-    hosts = call_zabbix_api(api_url, token, "host.get", params)
+    if filter_text:
+        needle = filter_text.lower()
+        cached_hosts = [h for h in cached_hosts if needle in (h.get('name') or '').lower()]
 
-    if not hosts:
+    if not cached_hosts:
         return []
 
+    # Cópias rasas: as transformações abaixo não podem alterar o objeto em cache
+    hosts = [dict(h) for h in cached_hosts]
+
     host_ids = [h['hostid'] for h in hosts]
 
     active_triggers = call_zabbix_api(api_url, token, "trigger.get", {
@@ -0,0 +1,366 @@
+import contextvars
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from utils.logger import get_logger
+from utils.metrics import registry, gauge_lines
+from utils.timing import phase
+
+logger = get_logger(__name__)
+
+# --- CACHE EM MEMÓRIA COM TTL ---
+# Mesmo formato de entrada do antigo dicionário '_cache' do zabbix_service
+# ({'data': ..., 'expires_at': ...}), agora encapsulado com contadores de
+# acerto/erro e expiração para que possam ser observados. Com `max_entries`,
+# as entradas gravadas há mais tempo saem primeiro quando o limite é passado.
+
+_instances: List["TTLCache"] = []
+
+# Menor vencimento entre as entradas lidas ou gravadas enquanto um produtor do
+# cache de respostas roda (ver etag_json_response); None fora desse trecho
+_source_expiry: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("cache_source_expiry", default=None)
+
+
+def _track_expiry(expires_at: float):
+    tracked = _source_expiry.get()
+    if tracked is not None and expires_at < tracked[0]:
+        tracked[0] = expires_at
+
+
+class TTLCache:
+    def __init__(self, name: str, max_entries: Optional[int] = None):
+        _instances.append(self)
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry['expires_at'] > time.time():
+            self.hits += 1
+            _track_expiry(entry['expires_at'])
+            return entry['data']
+        self.misses += 1
+        if entry is not None:
+            with self._lock:
+                # Só remove se ninguém regravou a chave nesse meio-tempo
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                    self.evictions += 1
+        return None
+
+    def set(self, key: str, data: Any, ttl_seconds: int):
+        expires_at = time.time() + ttl_seconds
+        with self._lock:
+            # Regravar a chave a leva para o fim da ordem de remoção
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                'data': data,
+                'expires_at': expires_at,
+                'ttl': ttl_seconds,
+            }
+            self._trim()
+        _track_expiry(expires_at)
+
+    def _trim(self):
+        if self.max_entries is None:
+            return
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def export_entries(self, min_ttl: int) -> List[Tuple[str, Any, float, int]]:
+        """(chave, dados, expires_at, ttl) das entradas ainda válidas com TTL de pelo menos `min_ttl` segundos."""
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+        return [(key, entry['data'], entry['expires_at'], entry['ttl'])
+                for key, entry in entries if entry['ttl'] >= min_ttl and entry['expires_at'] > now]
+
+    def restore(self, key: str, data: Any, expires_at: float, ttl: int) -> bool:
+        """Recoloca uma entrada com o mesmo vencimento de antes; não sobrescreve uma entrada mais nova."""
+        if expires_at <= time.time():
+            return False
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current['expires_at'] >= expires_at:
+                return False
+            self._entries.pop(key, None)
+            self._entries[key] = {'data': data, 'expires_at': expires_at, 'ttl': ttl}
+            self._trim()
+        return True
+
+    def memory_usage(self, top: int = 5) -> Dict[str, Any]:
+        """Bytes aproximados das entradas (chaves e dados), com as `top` maiores."""
+        with self._lock:
+            entries = list(self._entries.items())
+        sizes = sorted(((key, _deep_sizeof(key) + _deep_sizeof(entry)) for key, entry in entries),
+                       key=lambda item: -item[1])
+        total = sum(size for _key, size in sizes)
+        return {
+            "name": self.name,
+            "entries": len(entries),
+            "bytes": total,
+            "mb": round(total / 1e6, 2),
+            "largest": [{"key": key, "bytes": size} for key, size in sizes[:top]],
+        }
+
+
+def _deep_sizeof(value: Any, seen: set = None) -> int:
+    """sys.getsizeof somado pelos conteúdos de dicts, listas, tuplas e conjuntos (cada objeto conta uma vez)."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(v, seen) for v in value)
+    return size
+
+
+def _collect_cache_metrics() -> List[str]:
+    """Os contadores já existem em cada TTLCache; são lidos só na hora da coleta."""
+    stats = [cache.stats() for cache in _instances]
+    lines = []
+    for field, kind, doc in (
+        ("hits", "counter", "Leituras encontradas no cache."),
+        ("misses", "counter", "Leituras sem entrada válida no cache."),
+        ("evictions", "counter", "Entradas removidas por expiração ou por limite de tamanho."),
+        ("entries", "gauge", "Entradas atualmente no cache."),
+    ):
+        name = f"cache_{field}_total" if kind == "counter" else f"cache_{field}"
+        lines += gauge_lines(name, doc, [({"cache": s["name"]}, s[field]) for s in stats], kind=kind)
+    return lines
+
+
+registry.register_collector(_collect_cache_metrics)
+
+
+# --- RESPOSTAS JSON COM ETAG ---
+# O corpo serializado e o seu hash são calculados uma única vez por payload em
+# cache; requisições seguintes reutilizam os bytes e, se o cliente enviar
+# If-None-Match com o mesmo ETag, recebem 304 sem corpo.
+#
+# A resposta nunca vive mais que as entradas dos caches de serviço usadas para
+# montá-la: se o inventário já estava há 50s no cache do zabbix_service, o
+# corpo fica só os 10s restantes, e não outros 60. Cada filtro é uma chave
+# com o corpo inteiro, então o número de corpos guardados é limitado.
+#
+#   RESPONSE_CACHE_MAX_ENTRIES  corpos mantidos em memória (padrão 256)
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+response_cache = TTLCache("responses", max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Aceita listas e ETags fracos (W/"...") como manda a RFC 9110
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return any(c == etag or c == f"W/{etag}" for c in candidates)
+
+
+def etag_json_response(request: Request, cache_key: str, ttl_seconds: int, producer: Callable[[], Any]) -> Response:
+    """
+    Devolve o payload de `producer` como JSON com ETag, reaproveitando corpo e
+    hash enquanto a entrada estiver em cache e respondendo 304 quando o
+    If-None-Match do cliente bate com o ETag atual.
+    """
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        expiry = [time.time() + ttl_seconds]
+        token = _source_expiry.set(expiry)
+        try:
+            payload = producer()
+        finally:
+            _source_expiry.reset(token)
+        with phase("serialize"):
+            body = json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        cached = (body, compute_etag(body))
+        remaining = expiry[0] - time.time()
+        if remaining > 0:
+            response_cache.set(cache_key, cached, remaining)
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# --- SNAPSHOT DO CACHE EM DISCO ---
+# Com o Cloud Run escalando a zero, toda instância nova começaria com o cache
+# vazio. As entradas de TTL longo (listas de hosts, inventário, informações de
+# sistema...) são gravadas periodicamente e no desligamento num JSON com gzip,
+# e recarregadas na subida com o vencimento original (em segundo plano, sem
+# segurar a primeira requisição): os usuários de cada tenant já encontram o
+# cache quente. O arquivo pode ficar num volume
+# compartilhado (ex.: bucket do Cloud Storage montado na instância), para que
+# todas as instâncias aproveitem o snapshot.
+#
+#   CACHE_SNAPSHOT_PATH      arquivo do snapshot (sem ele, nada é gravado nem lido)
+#   CACHE_SNAPSHOT_INTERVAL  segundos entre gravações periódicas (padrão 300)
+#   CACHE_SNAPSHOT_MIN_TTL   TTL mínimo para uma entrada entrar no snapshot (padrão 300)
+#
+# Só entram dados que sobrevivem intactos a um ida-e-volta em JSON (os bytes
+# do cache de respostas, por exemplo, ficam de fora e são refeitos na hora).
+
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH")
+CACHE_SNAPSHOT_INTERVAL = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))
+CACHE_SNAPSHOT_MIN_TTL = int(os.getenv("CACHE_SNAPSHOT_MIN_TTL", "300"))
+SNAPSHOT_VERSION = 1
+
+
+def _json_safe(data: Any) -> bool:
+    try:
+        return json.loads(json.dumps(data)) == data
+    except (TypeError, ValueError):
+        return False
+
+
+def save_snapshot(path: str = None, min_ttl: int = None) -> int:
+    """Grava as entradas de TTL longo de todos os caches em `path`; retorna quantas foram gravadas."""
+    path = path or CACHE_SNAPSHOT_PATH
+    if not path:
+        return 0
+    min_ttl = CACHE_SNAPSHOT_MIN_TTL if min_ttl is None else min_ttl
+    caches, total = {}, 0
+    for cache in _instances:
+        entries = [[key, expires_at, ttl, data] for key, data, expires_at, ttl in cache.export_entries(min_ttl)
+                   if _json_safe(data)]
+        if entries:
+            caches[cache.name] = entries
+            total += len(entries)
+    document = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "caches": caches}
+
+    # Grava num temporário no mesmo diretório e troca de uma vez: quem lê nunca vê um arquivo pela metade
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".cache-snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            f.write(json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return total
+
+
+def load_snapshot(path: str = None) -> int:
+    """Recarrega o snapshot nos caches de mesmo nome, respeitando o vencimento; retorna quantas entradas voltaram."""
+    path = path or CACHE_SNAPSHOT_PATH
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with gzip.open(path, "rb") as f:
+            document = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        logger.warning("Snapshot do cache ilegível; a instância começa com o cache vazio", extra={"path": path, "error": str(e)})
+        return 0
+    if document.get("version") != SNAPSHOT_VERSION:
+        logger.warning("Snapshot do cache em versão não suportada", extra={"path": path, "version": document.get("version")})
+        return 0
+
+    by_name = {cache.name: cache for cache in _instances}
+    restored = 0
+    for name, entries in document.get("caches", {}).items():
+        cache = by_name.get(name)
+        if cache is None:
+            continue
+        for key, expires_at, ttl, data in entries:
+            restored += cache.restore(key, data, expires_at, ttl)
+    return restored
+
+
+_snapshot_stop = threading.Event()
+_snapshot_thread: Optional[threading.Thread] = None
+
+
+def _snapshot_loop(interval: float):
+    # A carga do snapshot roda aqui, e não no lifespan, para não atrasar a
+    # primeira requisição; restore não sobrescreve o que já foi gravado nesse meio-tempo
+    started = time.perf_counter()
+    try:
+        restored = load_snapshot()
+        logger.info("Snapshot do cache carregado", extra={
+            "path": CACHE_SNAPSHOT_PATH, "entries": restored, "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    except Exception:
+        logger.exception("Falha ao carregar o snapshot do cache", extra={"path": CACHE_SNAPSHOT_PATH})
+    while not _snapshot_stop.wait(interval):
+        try:
+            save_snapshot()
+        except Exception:
+            logger.exception("Falha ao gravar o snapshot do cache", extra={"path": CACHE_SNAPSHOT_PATH})
+
+
+def start_snapshots(interval: float = None):
+    """
+    Carrega o snapshot existente em segundo plano e passa a gravá-lo a cada
+    `interval` segundos (se CACHE_SNAPSHOT_PATH estiver definido).
+    """
+    global _snapshot_thread
+    if not CACHE_SNAPSHOT_PATH or _snapshot_thread is not None:
+        return
+    _snapshot_stop.clear()
+    _snapshot_thread = threading.Thread(target=_snapshot_loop, args=(interval or CACHE_SNAPSHOT_INTERVAL,),
+                                        name="cache-snapshot", daemon=True)
+    _snapshot_thread.start()
+
+
+def stop_snapshots():
+    """Para as gravações periódicas e grava um último snapshot (chamado no desligamento)."""
+    global _snapshot_thread
+    if _snapshot_thread is None:
+        return
+    _snapshot_stop.set()
+    _snapshot_thread.join()
+    _snapshot_thread = None
+    try:
+        saved = save_snapshot()
+        logger.info("Snapshot do cache gravado", extra={"path": CACHE_SNAPSHOT_PATH, "entries": saved})
+    except Exception:
+        logger.exception("Falha ao gravar o snapshot do cache", extra={"path": CACHE_SNAPSHOT_PATH})
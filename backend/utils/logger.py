@@ -0,0 +1,188 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+# --- LOG ESTRUTURADO E NÃO BLOQUEANTE ---
+# As requisições só colocam o registro numa fila em memória. Uma thread
+# separada (QueueListener) serializa cada registro como uma linha JSON e
+# escreve no stdout, então a escrita em disco/terminal não acontece no
+# caminho da requisição. Se a fila encher, o registro é descartado e contado,
+# em vez de travar a requisição.
+#
+# Cada registro leva o id da requisição (cabeçalho X-Request-ID, gerado quando
+# não vier) para correlacionar as linhas de uma mesma chamada. Conteúdos
+# grandes (prompts, respostas do modelo) só são registrados em DEBUG, por
+# amostragem e truncados numa prévia.
+#
+# Variáveis de ambiente:
+#   LOG_LEVEL                nível mínimo (padrão INFO)
+#   LOG_QUEUE_SIZE           registros pendentes antes de descartar (padrão 10000)
+#   LOG_PAYLOAD_SAMPLE_RATE  fração dos conteúdos grandes registrados em DEBUG (padrão 1.0)
+#   LOG_PREVIEW_CHARS        tamanho máximo da prévia de um conteúdo (padrão 2000)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+PREVIEW_CHARS = int(os.getenv("LOG_PREVIEW_CHARS", "2000"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Atributos que todo LogRecord tem; o que sobrar veio de `extra=` e vira campo do JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def preview(text: Any, limit: int = None) -> str:
+    """Início do texto, com o total de caracteres omitidos quando passa do limite."""
+    limit = PREVIEW_CHARS if limit is None else limit
+    text = text if isinstance(text, str) else str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [+{len(text) - limit} caracteres]"
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: ts, level, logger, request_id, msg, campos extras e exceção."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Roda na thread da requisição, onde o contextvar ainda está definido
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve a mensagem e a exceção aqui (os args podem mudar depois), mas
+        # deixa a serialização JSON para a thread do listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[_NonBlockingQueueHandler] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level: str = None):
+    """Instala o handler com fila no logger raiz. Chamadas repetidas não têm efeito."""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = _NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(_RequestIdFilter())
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=False)
+        _listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(level or LOG_LEVEL)
+        # Esvazia a fila ao encerrar o processo
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def dropped_records() -> int:
+    """Registros descartados porque a fila estava cheia."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def log_payload(logger: logging.Logger, label: str, payload: Any, level: int = logging.DEBUG, **fields):
+    """
+    Registra um conteúdo grande (prompt, resposta, contexto) como prévia
+    truncada. Nada é montado se o nível estiver desligado ou se o registro
+    não for sorteado pela amostragem.
+    """
+    if not logger.isEnabledFor(level) or (PAYLOAD_SAMPLE_RATE < 1.0 and random.random() >= PAYLOAD_SAMPLE_RATE):
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    logger.log(level, label, extra={"payload_chars": len(text), "payload_preview": preview(text), **fields})
+
+
+# --- MIDDLEWARE DE CORRELAÇÃO ---
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI: usa o X-Request-ID recebido (ou gera um), deixa-o no
+    contextvar durante a requisição e devolve o mesmo id na resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
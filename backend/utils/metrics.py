@@ -0,0 +1,288 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- MÉTRICAS NO FORMATO DO PROMETHEUS ---
+# Cada thread escreve apenas no seu próprio "shard" (um dicionário em
+# threading.local), então registrar uma medida é só um incremento em
+# dicionário, sem lock e sem disputa entre threads. Os shards de todas as
+# threads são somados apenas na hora da coleta (GET /metrics); os shards de
+# threads já encerradas são incorporados a um total "aposentado" e descartados,
+# na coleta e quando novos shards se acumulam. Valores que já
+# existem em outro lugar (estatísticas dos caches, pool do banco) entram por
+# coletores chamados na hora da coleta, sem custo nenhum no caminho quente.
+
+_PRUNE_MIN_SHARDS = 64  # Shards registrados antes de procurar os de threads encerradas
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Sharded:
+    """Base das métricas: um shard por thread, registrado na primeira escrita."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # (thread dona, shard); os shards de threads encerradas são somados em _retired
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._prune_at = _PRUNE_MIN_SHARDS
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+                # Sem coletas (ou com muitas threads de vida curta), os shards mortos não se acumulam
+                if len(self._shards) >= self._prune_at:
+                    self._prune()
+                    self._prune_at = max(_PRUNE_MIN_SHARDS, 2 * len(self._shards))
+        return shard
+
+    def _prune(self):
+        """Soma em _retired os shards das threads encerradas e os descarta (chamado com _shards_lock)."""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                # A thread não escreve mais: o shard pode ser lido sem cópia
+                self._merge(self._retired, shard)
+        self._shards = alive
+
+    def _merge(self, into: dict, shard: dict):
+        raise NotImplementedError
+
+    def _snapshots(self) -> List[dict]:
+        with self._shards_lock:
+            self._prune()
+            shards = [shard for _thread, shard in self._shards]
+            retired = dict(self._retired)
+        # dict(shard) copia em C, sem ceder o GIL: a cópia é consistente
+        return [retired] + [dict(shard) for shard in shards]
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, into: dict, shard: dict):
+        for labels, value in shard.items():
+            into[labels] = into.get(labels, 0) + value
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Gauge de inc/dec (ex.: requisições em andamento); o valor é a soma dos shards."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # [contagem por bucket (não cumulativa; o último é +Inf), soma, total]
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _merge(self, into: dict, shard: dict):
+        # Entradas novas em vez de somar no lugar: uma coleta pode estar lendo as antigas
+        for labels, (counts, total, count) in shard.items():
+            previous = into.get(labels)
+            if previous is None:
+                into[labels] = [list(counts), total, count]
+            else:
+                into[labels] = [[a + b for a, b in zip(previous[0], counts)], previous[1] + total, previous[2] + count]
+
+    def collect(self) -> List[str]:
+        merged: Dict[LabelValues, list] = {}
+        for shard in self._snapshots():
+            for labels, (counts, total, count) in shard.items():
+                acc = merged.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                acc[0] = [a + b for a, b in zip(acc[0], counts)]
+                acc[1] += total
+                acc[2] += count
+
+        lines = self.header()
+        for labels, (counts, total, count) in sorted(merged.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+# --- REGISTRO E COLETA ---
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Sharded] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Sharded) -> _Sharded:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]):
+        """Função chamada a cada coleta, que devolve linhas já no formato de exposição."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def exposition(self) -> str:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines += metric.collect()
+        for collector in collectors:
+            lines += list(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def gauge_lines(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]], kind: str = "gauge") -> List[str]:
+    """Linhas de exposição para valores lidos na hora da coleta (usado pelos coletores)."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+
+# --- MÉTRICAS COMPARTILHADAS ---
+
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento por rota.", ["method", "route"]
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Duração das requisições HTTP por rota e status.", ["method", "route", "status"]
+)
+
+
+def _route_wrapper(app, route_path: str):
+    async def instrumented(scope, receive, send):
+        method = scope.get("method", "")
+        status_holder = {"status": "500"}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc(method, route_path)
+        started = time.perf_counter()
+        try:
+            await app(scope, receive, send_with_status)
+        except Exception as e:
+            status_holder["status"] = str(getattr(e, "status_code", 500))
+            raise
+        finally:
+            http_requests_in_flight.dec(method, route_path)
+            http_request_duration.observe(time.perf_counter() - started, method, route_path, status_holder["status"])
+    return instrumented
+
+
+def instrument_routes(app, exclude: Optional[Sequence[str]] = ("/metrics",)):
+    """
+    Envolve o ASGI de cada rota já registrada para medir requisições em
+    andamento e duração, rotuladas pelo template da rota (ex.:
+    /zabbix/hosts/{empresa_id}) e não pela URL, para não explodir a
+    cardinalidade. Deve ser chamado depois de todos os include_router.
+    """
+    for route in app.router.routes:
+        path = getattr(route, "path", None)
+        if path is None or path in (exclude or ()) or not hasattr(route, "app"):
+            continue
+        if getattr(route.app, "_instrumented", False):
+            continue
+        route.app = _route_wrapper(route.app, path)
+        route.app._instrumented = True
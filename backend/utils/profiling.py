@@ -0,0 +1,369 @@
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+# --- PERFIS SOB DEMANDA (CPU E MEMÓRIA) ---
+# Ferramentas para olhar dentro de uma instância em produção sem reiniciá-la,
+# expostas para super admins em /admin/profiling (ver api/profiling.py).
+#
+# CPU: uma thread amostra as pilhas de todas as threads (sys._current_frames)
+# a cada `interval_ms`, por N segundos ou até N requisições terminarem. Pilhas
+# de threads ociosas (esperando em fila, lock ou no select do event loop) são
+# descartadas. O resultado sai em "collapsed stacks" (flamegraph.pl, speedscope)
+# e em pstats (python -m pstats, snakeviz), montado a partir das amostras.
+#
+# Memória: snapshots do tracemalloc (ligado no primeiro snapshot), com os
+# maiores alocadores e a diferença entre dois snapshots.
+#
+#   PROFILING_MAX_SECONDS  duração máxima de uma captura de CPU (padrão 300)
+
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "300"))
+MAX_SNAPSHOTS = 10
+PROFILING_PATH_PREFIX = "/admin/profiling"
+
+logger = get_logger(__name__)
+
+Frame = Tuple[str, int, str]  # (arquivo, primeira linha, função): a chave de função do pstats
+
+# Folhas de pilha que indicam uma thread parada esperando trabalho
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("base_events.py", "run_forever"),
+    ("base_events.py", "run_until_complete"),
+    ("runners.py", "run"),
+}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# --- CPU ---
+
+class CpuProfile:
+    """Captura por amostragem; `samples` guarda, por (thread, pilha), o número de amostras e os segundos."""
+
+    def __init__(self, interval_ms: float = 5.0, seconds: float = None, requests: int = None):
+        self.interval = interval_ms / 1000.0
+        self.seconds = min(seconds, MAX_PROFILE_SECONDS) if seconds else MAX_PROFILE_SECONDS
+        self.requests = requests
+        self.requests_done = 0
+        self.in_flight = 0
+        self.samples: Dict[Tuple[str, Tuple[Frame, ...]], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.sample_count = 0
+        self.started_at = _now_iso()
+        self.stopped_reason: Optional[str] = None
+        self._started = time.perf_counter()
+        self._elapsed: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cpu-profiler", daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, reason: str = "stopped"):
+        if not self._stop.is_set():
+            self.stopped_reason = reason
+            self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now - self._started >= self.seconds:
+                self.stopped_reason = self.stopped_reason or "seconds"
+                break
+            # No modo por requisições só interessa o que roda enquanto alguma está em andamento
+            if self.requests is None or self.in_flight > 0:
+                self._sample(now - last)
+            last = now
+        self._stop.set()
+        self._elapsed = time.perf_counter() - self._started
+
+    def _sample(self, dt: float):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            entry = self.samples[(names.get(ident, str(ident)), tuple(reversed(stack)))]
+            entry[0] += 1
+            entry[1] += dt
+        self.sample_count += 1
+
+    # Chamados pelo ProfilingMiddleware
+    def request_started(self):
+        self.in_flight += 1
+
+    def request_finished(self):
+        self.in_flight -= 1
+        self.requests_done += 1
+        if self.requests is not None and self.requests_done >= self.requests:
+            self.stopped_reason = self.stopped_reason or "requests"
+            self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "elapsed_s": round(elapsed, 2),
+            "interval_ms": self.interval * 1000,
+            "limit_seconds": self.seconds,
+            "limit_requests": self.requests,
+            "requests_done": self.requests_done,
+            "ticks": self.sample_count,
+            "stacks": len(self.samples),
+            "stopped_reason": self.stopped_reason,
+        }
+
+    # --- SAÍDAS ---
+
+    def collapsed(self) -> str:
+        """Formato 'thread;func (arquivo:linha);... contagem' do flamegraph.pl."""
+        lines = []
+        for (thread, stack), (count, _seconds) in sorted(self.samples.items(), key=lambda item: -item[1][0]):
+            frames = [thread] + [f"{name} ({_short_path(filename)}:{line})" for filename, line, name in stack]
+            lines.append(";".join(f.replace(";", ":") for f in frames) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats_dict(self) -> Dict[Frame, tuple]:
+        """
+        Estatísticas no formato do cProfile, derivadas das amostras: tt é o
+        tempo com a função no topo da pilha, ct o tempo com ela em qualquer
+        nível, e as "chamadas" são o número de amostras.
+        """
+        stats: Dict[Frame, list] = {}
+        callers: Dict[Frame, Dict[Frame, list]] = defaultdict(dict)
+        for (_thread, stack), (count, seconds) in self.samples.items():
+            # Recursão: cada função conta uma vez por pilha no tempo acumulado
+            for func in set(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0])
+                entry[0] += count
+                entry[1] += count
+                entry[3] += seconds
+            stats[stack[-1]][2] += seconds
+            for caller, callee in set(zip(stack, stack[1:])):
+                edge = callers[callee].setdefault(caller, [0, 0, 0.0, 0.0])
+                edge[0] += count
+                edge[1] += count
+                edge[3] += seconds
+                if callee == stack[-1]:
+                    edge[2] += seconds
+        return {
+            func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers[func].items()})
+            for func, (cc, nc, tt, ct) in stats.items()
+        }
+
+    def pstats_bytes(self) -> bytes:
+        """Conteúdo de um arquivo .prof (marshal), carregável com pstats.Stats(caminho)."""
+        return marshal.dumps(self.pstats_dict())
+
+
+def _short_path(filename: str) -> str:
+    for prefix in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+_cpu_lock = threading.Lock()
+_cpu_profile: Optional[CpuProfile] = None
+
+
+def start_cpu_profile(interval_ms: float = 5.0, seconds: float = None, requests: int = None) -> CpuProfile:
+    """Inicia uma captura; falha com RuntimeError se já houver uma em andamento."""
+    global _cpu_profile
+    with _cpu_lock:
+        if _cpu_profile is not None and _cpu_profile.running:
+            raise RuntimeError("Já existe uma captura de CPU em andamento.")
+        _cpu_profile = CpuProfile(interval_ms=interval_ms, seconds=seconds, requests=requests)
+        _cpu_profile.start()
+    logger.info("Captura de CPU iniciada", extra={"seconds": seconds, "requests": requests, "interval_ms": interval_ms})
+    return _cpu_profile
+
+
+def current_cpu_profile() -> Optional[CpuProfile]:
+    """A captura em andamento ou, se nenhuma estiver rodando, a última concluída."""
+    return _cpu_profile
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: informa à captura de CPU em andamento o início e o fim de
+    cada requisição (para o modo "próximas N requisições"). Sem captura ativa,
+    custa uma leitura de variável. As rotas do próprio profiler não contam.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profile = _cpu_profile
+        if (scope["type"] != "http" or profile is None or not profile.running
+                or scope.get("path", "").startswith(PROFILING_PATH_PREFIX)):
+            await self.app(scope, receive, send)
+            return
+        profile.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.request_finished()
+
+
+# --- MEMÓRIA (TRACEMALLOC) ---
+
+_snapshot_lock = threading.Lock()
+_snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_next_snapshot_id = 1
+
+# Alocações do próprio tracemalloc e do import system só atrapalham a leitura
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def take_snapshot(frames: int = 1) -> Dict[str, Any]:
+    """
+    Tira um snapshot do tracemalloc, ligando-o se preciso (com `frames` níveis
+    de pilha por alocação). Só alocações feitas depois de ligado aparecem, então
+    o primeiro snapshot serve de base para os diffs seguintes.
+    """
+    global _next_snapshot_id
+    started_now = not tracemalloc.is_tracing()
+    if started_now:
+        tracemalloc.start(frames)
+        logger.info("tracemalloc ligado", extra={"frames": frames})
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshot_lock:
+        snapshot_id = _next_snapshot_id
+        _next_snapshot_id += 1
+        _snapshots[snapshot_id] = {
+            "snapshot": snapshot,
+            "info": {
+                "id": snapshot_id,
+                "taken_at": _now_iso(),
+                "traced_mb": round(current / 1e6, 2),
+                "peak_mb": round(peak / 1e6, 2),
+                "frames": tracemalloc.get_traceback_limit(),
+                "tracing_started": started_now,
+            },
+        }
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return _snapshots[snapshot_id]["info"]
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    with _snapshot_lock:
+        return [entry["info"] for entry in _snapshots.values()]
+
+
+def get_snapshot(snapshot_id: int) -> Optional[tracemalloc.Snapshot]:
+    entry = _snapshots.get(snapshot_id)
+    return entry["snapshot"] if entry else None
+
+
+def _location(trace_traceback: tracemalloc.Traceback) -> str:
+    frame = trace_traceback[0]
+    return f"{_short_path(frame.filename)}:{frame.lineno}"
+
+
+def top_allocators(snapshot: tracemalloc.Snapshot, group_by: str = "lineno", limit: int = 20) -> List[Dict[str, Any]]:
+    rows = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        row = {"location": _location(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        if group_by == "traceback":
+            row["traceback"] = stat.traceback.format()
+        rows.append(row)
+    return rows
+
+
+def diff_snapshots(base: tracemalloc.Snapshot, current: tracemalloc.Snapshot, group_by: str = "lineno",
+                   limit: int = 20) -> List[Dict[str, Any]]:
+    """Maiores variações de `base` para `current` (ordenadas pelo módulo da diferença de tamanho)."""
+    rows = []
+    for stat in current.compare_to(base, group_by)[:limit]:
+        row = {
+            "location": _location(stat.traceback),
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        }
+        if group_by == "traceback":
+            row["traceback"] = stat.traceback.format()
+        rows.append(row)
+    return rows
+
+
+def dump_snapshot(snapshot: tracemalloc.Snapshot) -> bytes:
+    """Snapshot no formato do tracemalloc.Snapshot.dump (carregável com tracemalloc.Snapshot.load)."""
+    with tempfile.NamedTemporaryFile(suffix=".tracemalloc") as f:
+        snapshot.dump(f.name)
+        return f.read()
+
+
+def stop_tracing():
+    """Desliga o tracemalloc (que custa CPU e memória enquanto ativo) e descarta os snapshots."""
+    with _snapshot_lock:
+        _snapshots.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("tracemalloc desligado")
+
+
+# --- MEMÓRIA DO PROCESSO E DOS CACHES ---
+
+def process_memory() -> Dict[str, Any]:
+    """RSS atual e de pico em MB (de /proc quando disponível)."""
+    usage: Dict[str, Any] = {}
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key = "rss_mb" if line.startswith("VmRSS") else "peak_rss_mb"
+                    usage[key] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        import resource
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage["peak_rss_mb"] = round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    usage["tracemalloc"] = tracemalloc.is_tracing()
+    return usage
+
+
+def cache_memory(top: int = 5) -> List[Dict[str, Any]]:
+    """Uso de memória aproximado de cada TTLCache, do maior para o menor."""
+    from utils.cache import _instances
+    return sorted((cache.memory_usage(top) for cache in _instances), key=lambda c: -c["bytes"])
@@ -1,5 +1,6 @@
 from cryptography.fernet import Fernet
 import os
+import threading
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
@@ -12,6 +13,10 @@ from schemas.roles import UserRole, ROLE_HIERARCHY
 from sqlalchemy.orm import Session
 from database.connection import get_db
 from crud import usuario as crud_usuario
+from utils.logger import get_logger
+from utils.timing import phase
+
+logger = get_logger(__name__)
 
 # --- Criptografia Fernet (para tokens do Zabbix) ---
 KEY_FILE = "encryption.key"
@@ -20,7 +25,7 @@ def gerar_e_salvar_chave():
     key = Fernet.generate_key()
     with open(KEY_FILE, "wb") as key_file:
         key_file.write(key)
-    print(f"Chave de criptografia gerada e salva em '{KEY_FILE}'. Mantenha este arquivo seguro!")
+    logger.warning("Chave de criptografia gerada e salva em disco. Mantenha este arquivo seguro!", extra={"key_file": KEY_FILE})
     return key
 
 def carregar_chave():
@@ -30,17 +35,27 @@ def carregar_chave():
     with open(KEY_FILE, "rb") as key_file:
         return key_file.read()
 
-CHAVE_FERNET = carregar_chave()
-fernet = Fernet(CHAVE_FERNET)
+# A chave é lida (ou gerada) no primeiro uso, não na importação do módulo
+_fernet: Fernet = None
+_fernet_lock = threading.Lock()
+
+def get_fernet() -> Fernet:
+    global _fernet
+    if _fernet is None:
+        with _fernet_lock:
+            if _fernet is None:
+                _fernet = Fernet(carregar_chave())
+    return _fernet
 
 def criptografar_token(token: str) -> str:
     token_bytes = token.encode('utf-8')
-    token_criptografado_bytes = fernet.encrypt(token_bytes)
+    token_criptografado_bytes = get_fernet().encrypt(token_bytes)
     return token_criptografado_bytes.decode('utf-8')
 
 def descriptografar_token(token_criptografado: str) -> str:
     token_criptografado_bytes = token_criptografado.encode('utf-8')
-    token_descriptografado_bytes = fernet.decrypt(token_criptografado_bytes)
+    with phase("fernet"):
+        token_descriptografado_bytes = get_fernet().decrypt(token_criptografado_bytes)
     return token_descriptografado_bytes.decode('utf-8')
 
 # --- Validação de JWT (para autenticação de usuário) ---
@@ -84,7 +99,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     )
     
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        with phase("jwt"):
+            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
         subject: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         role: str = payload.get("role")
@@ -96,7 +112,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         token_data = TokenData(sub=subject, user_id=user_id, role=UserRole(role), empresas=empresas)
         
     except (JWTError, ValueError) as e:
-        print(f"\nERRO DE JWT OU PAPEL INVÁLIDO: {e}\n")
+        logger.warning("Erro de JWT ou papel inválido", extra={"error": str(e)})
         raise credentials_exception
     
     return token_data
@@ -0,0 +1,117 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from utils.logger import get_logger
+
+# --- TEMPO POR FASE DA REQUISIÇÃO ---
+# Cada requisição ganha um dicionário de fases (jwt, db, fernet, zabbix,
+# model, serialize) num contextvar. Os trechos instrumentados somam o tempo
+# gasto na sua fase; como o FastAPI copia o contexto para as threads das
+# dependências e rotas síncronas, o mesmo dicionário é visto em todo o
+# caminho. Ao responder, as fases vão no cabeçalho Server-Timing (visível na
+# aba Network do devtools) e requisições lentas são registradas no log.
+#
+#   SLOW_REQUEST_SECONDS  a partir de quanto uma requisição é logada como lenta (padrão 1.0)
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+logger = get_logger(__name__)
+
+# nome da fase -> [segundos acumulados, número de trechos]
+_phases: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = contextvars.ContextVar("request_phases", default=None)
+
+
+def add_phase(name: str, seconds: float):
+    phases = _phases.get()
+    if phases is None:
+        return
+    entry = phases.get(name)
+    if entry is None:
+        phases[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def phase(name: str):
+    """Soma o tempo do bloco à fase `name` da requisição atual (sem efeito fora de uma requisição)."""
+    if _phases.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - started)
+
+
+def current_phases() -> Dict[str, Dict[str, float]]:
+    phases = _phases.get() or {}
+    return {name: {"ms": round(total * 1000, 2), "count": int(count)} for name, (total, count) in phases.items()}
+
+
+def server_timing_header(phases: Dict[str, List[float]], total_seconds: float) -> str:
+    entries = [f"{name};dur={total * 1000:.1f}" for name, (total, _count) in phases.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse que conta a codificação do corpo na fase 'serialize'."""
+
+    def render(self, content) -> bytes:
+        with phase("serialize"):
+            return super().render(content)
+
+
+# --- MIDDLEWARE ---
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI: abre o dicionário de fases da requisição, escreve o
+    Server-Timing na resposta e loga as fases das requisições acima de
+    SLOW_REQUEST_SECONDS.
+    """
+
+    def __init__(self, app, slow_request_seconds: float = None):
+        self.app = app
+        self.slow_request_seconds = SLOW_REQUEST_SECONDS if slow_request_seconds is None else slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases: Dict[str, List[float]] = {}
+        token = _phases.set(phases)
+        started = time.perf_counter()
+        status_holder = {"status": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                value = server_timing_header(phases, time.perf_counter() - started)
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.slow_request_seconds:
+                logger.warning("Requisição lenta", extra={
+                    "method": scope.get("method"),
+                    "path": scope.get("path"),
+                    "status": status_holder["status"],
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "phases": current_phases(),
+                })
+            _phases.reset(token)
@@ -1,8 +1,8 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useEffect } from 'react';
 import { useDashboard } from '@/contexts/DashboardContext';
-import fetchWithAuth from '@/lib/fetchwithauth';
+import { useLiveTopic } from '@/hooks/use-live-topic';
 import { Cpu, HardDrive, MemoryStick, Activity, AlertCircle, Server, Upload, Download } from 'lucide-react';
 import HostAlerts from '@/components/dashboard/host-alerts';
 import HostSystemInfo from '@/components/dashboard/host-system-info';
@@ -45,9 +45,10 @@ export default function HostAnalysisPage() {
         setSelectedHostId
     } = useDashboard();
     
-    const [metrics, setMetrics] = useState<KeyMetric[]>([]);
-    const [isLoadingMetrics, setIsLoadingMetrics] = useState(false);
-    const [error, setError] = useState<string | null>(null);
+    // Métricas-chave ao vivo: o backend envia um snapshot e depois só o que mudou
+    const { records, error } = useLiveTopic<KeyMetric>(selectedCompanyId, 'key_metrics', selectedHostId);
+    const metrics = records ?? [];
+    const isLoadingMetrics = !!selectedHostId && records === null && !error;
 
     useEffect(() => {
         if (!isLoadingHosts && hosts.length > 0 && !selectedHostId) {
@@ -55,35 +56,6 @@ export default function HostAnalysisPage() {
         }
     }, [isLoadingHosts, hosts, selectedHostId, setSelectedHostId]);
 
-    useEffect(() => {
-        if (!selectedHostId) {
-            setMetrics([]);
-            return;
-        }
-
-        const fetchMetrics = async () => {
-            setIsLoadingMetrics(true);
-            setError(null);
-            try {
-                const response = await fetchWithAuth(`${process.env.NEXT_PUBLIC_API_URL}/zabbix/metrics/key_metrics/${selectedCompanyId}/${selectedHostId}`);
-                if (!response.ok) {
-                    throw new Error('Falha ao buscar métricas do host.');
-                }
-                const data: KeyMetric[] = await response.json();
-                setMetrics(data);
-            } catch (err: any) {
-                setError(err.message);
-            } finally {
-                setIsLoadingMetrics(false);
-            }
-        };
-
-        fetchMetrics();
-        const intervalId = setInterval(fetchMetrics, 30000); // Atualiza a cada 30s
-        return () => clearInterval(intervalId);
-
-    }, [selectedCompanyId, selectedHostId]);
-
     if (!selectedCompanyId) {
         return (
             <div className="flex items-center justify-center h-full">
@@ -1,5 +1,5 @@
 'use client';
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { useSession } from 'next-auth/react';
 import fetchWithAuth from '@/lib/fetchwithauth';
 import { useDashboard } from '@/contexts/DashboardContext';
@@ -14,8 +14,10 @@ interface ZabbixHost { hostid: string; name: string; }
 // Add lastchange to the Alert interface
 interface Alert { triggerid: string; description: string; priority: string; hosts: { name: string }[]; lastchange: string; }
 interface EventLogEntry { eventid: string; time: string; description: string; priority: string; host: string; status: 'PROBLEMA' | 'RESOLVIDO'; }
+interface EventLogPage { events: EventLogEntry[]; latest_cursor: string | null; has_more: boolean; }
 interface Consumer { name: string; value: number; }
 type Period = "24h" | "7d" | "30d";
+const MAX_EVENT_LOG_ENTRIES = 500;
 
 export default function DashboardPage() {
     // 1. Obter a sessão para saber o papel do usuário
@@ -40,6 +42,8 @@ export default function DashboardPage() {
     const [aiResponse, setAiResponse] = useState<string | null>(null);
     const [pageError, setPageError] = useState<string | null>(null);
     const [isTimelineExpanded, setIsTimelineExpanded] = useState(false); // 1. Adicionar estado de expansão
+    // Maior eventid já recebido: nos refreshes, só os eventos mais novos são buscados
+    const latestEventCursor = useRef<string | null>(null);
 
     // Add this function inside the DashboardPage component
     const getStatusProps = (status: 'PROBLEMA' | 'RESOLVIDO') => {
@@ -73,19 +77,49 @@ export default function DashboardPage() {
         setPageError(null);
 
         try {
-            const [alertsRes, eventLogRes, topConsumersRes] = await Promise.all([
+            const eventLogUrl = `${process.env.NEXT_PUBLIC_API_URL}/zabbix/events/log/${selectedCompanyId}/page`;
+            const fetchEventPage = async (query = ''): Promise<EventLogPage> => {
+                const res = await fetchWithAuth(`${eventLogUrl}${query}`);
+                if (!res.ok) throw new Error("Falha ao carregar log de eventos.");
+                return res.json();
+            };
+            // Nos refreshes, só os eventos novos: cada página vem com até 'limit' deles,
+            // então segue pedindo enquanto a página vier cheia (has_more)
+            const fetchEventLog = async (): Promise<{ page: EventLogPage; incremental: boolean }> => {
+                let cursor = latestEventCursor.current;
+                if (isInitialLoad || cursor === null) return { page: await fetchEventPage(), incremental: false };
+                let events: EventLogEntry[] = [];
+                while (true) {
+                    const page = await fetchEventPage(`?since=${cursor}`);
+                    events = [...page.events, ...events];
+                    cursor = page.latest_cursor ?? cursor;
+                    if (!page.has_more) return { page: { ...page, events, latest_cursor: cursor }, incremental: true };
+                    // Mais eventos novos do que a tela mostra: recarrega só os mais recentes
+                    if (events.length >= MAX_EVENT_LOG_ENTRIES) return { page: await fetchEventPage(), incremental: false };
+                }
+            };
+
+            const [alertsRes, { page: eventPage, incremental }, topConsumersRes] = await Promise.all([
                 fetchWithAuth(`${process.env.NEXT_PUBLIC_API_URL}/zabbix/alerts/history/${selectedCompanyId}?period=${period}`),
-                fetchWithAuth(`${process.env.NEXT_PUBLIC_API_URL}/zabbix/events/log/${selectedCompanyId}?period=${period}`),
+                fetchEventLog(),
                 fetchWithAuth(`${process.env.NEXT_PUBLIC_API_URL}/zabbix/metrics/top_consumers/${selectedCompanyId}`),
             ]);
 
             if (!alertsRes.ok) throw new Error("Falha ao carregar histórico de alertas.");
-            if (!eventLogRes.ok) throw new Error("Falha ao carregar log de eventos.");
             if (!topConsumersRes.ok) throw new Error("Falha ao carregar maiores consumidores de recursos.");
 
             const topConsumersJson = await topConsumersRes.json();
             setAlerts(await alertsRes.json());
-            setEventLog(await eventLogRes.json());
+            if (incremental) {
+                // Apenas os eventos novos chegam; junta no topo sem duplicar
+                setEventLog(prev => {
+                    const known = new Set(eventPage.events.map(e => e.eventid));
+                    return [...eventPage.events, ...prev.filter(e => !known.has(e.eventid))].slice(0, MAX_EVENT_LOG_ENTRIES);
+                });
+            } else {
+                setEventLog(eventPage.events);
+            }
+            latestEventCursor.current = eventPage.latest_cursor ?? latestEventCursor.current;
             setTopCpu(topConsumersJson.top_cpu);
             setTopMemory(topConsumersJson.top_memory);
 
@@ -1,8 +1,7 @@
 'use client';
-import { useState, useEffect, useCallback } from 'react';
-import { useSession } from 'next-auth/react';
+import { useState, useMemo } from 'react';
 import { AlertTriangle, CheckCircle, Info, ShieldAlert, ChevronDown, ChevronUp, Loader2 } from 'lucide-react';
-import fetchWithAuth from '@/lib/fetchwithauth'; // Adicionado para fazer a chamada autenticada
+import { useLiveTopic } from '@/hooks/use-live-topic';
 
 interface Trigger {
     triggerid: string;
@@ -11,6 +10,7 @@ interface Trigger {
     lastchange: string;
     comments: string;
     lastchange_formatted?: string;
+    group: keyof GroupedTriggers;
 }
 
 interface GroupedTriggers {
@@ -54,10 +54,9 @@ const Section = ({ title, triggers, icon, color, isOpen, onToggle }: { title: st
 };
 
 export default function HostAlerts({ hostId, empresaId }: HostAlertsProps) {
-    const { data: session } = useSession();
-    const [triggers, setTriggers] = useState<GroupedTriggers | null>(null);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState<string | null>(null);
+    // Triggers do host ao vivo (tópico host_triggers), cada um com o grupo já calculado no backend
+    const { records, error } = useLiveTopic<Trigger>(empresaId, 'host_triggers', hostId);
+    const loading = records === null && !error;
     const [openSections, setOpenSections] = useState({
         critical: true,
         warning: true,
@@ -65,33 +64,13 @@ export default function HostAlerts({ hostId, empresaId }: HostAlertsProps) {
         ok: false,
     });
 
-    const fetchTriggers = useCallback(async () => {
-        if (!hostId || !empresaId || !session?.accessToken) return;
-
-        setLoading(true);
-        setError(null);
-
-        try {
-            // CORREÇÃO: Usando fetchWithAuth e a variável de ambiente correta
-            const response = await fetchWithAuth(`${process.env.NEXT_PUBLIC_API_URL}/zabbix/triggers/host/${empresaId}/${hostId}`);
-
-            if (!response.ok) {
-                const errorData = await response.json();
-                throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
-            }
-            const data: GroupedTriggers = await response.json();
-            setTriggers(data);
-        } catch (e: any) {
-            setError(e.message || 'Falha ao buscar os alertas do host');
-            console.error(e);
-        } finally {
-            setLoading(false);
-        }
-    }, [hostId, empresaId, session]);
-
-    useEffect(() => {
-        fetchTriggers();
-    }, [fetchTriggers]);
+    const triggers = useMemo<GroupedTriggers | null>(() => {
+        if (!records) return null;
+        const grouped: GroupedTriggers = { critical: [], warning: [], info: [], ok: [] };
+        const sorted = [...records].sort((a, b) => Number(b.lastchange) - Number(a.lastchange));
+        for (const trigger of sorted) grouped[trigger.group]?.push(trigger);
+        return grouped;
+    }, [records]);
 
     const handleToggle = (section: keyof typeof openSections) => {
         setOpenSections(prev => ({ ...prev, [section]: !prev[section] }));
@@ -0,0 +1,99 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+import fetchWithAuth from '@/lib/fetchwithauth';
+
+// Atualizações ao vivo de /zabbix/live (Server-Sent Events): um snapshot inicial
+// e depois só os diffs. Um único poller no backend atende todas as abas abertas,
+// no lugar do polling de cada componente. O EventSource não envia o cabeçalho
+// Authorization, então o stream é lido com fetch.
+
+export type LiveTopic = 'triggers' | 'key_metrics' | 'host_triggers';
+
+// Campo de identidade de cada registro, o mesmo de TOPICS em services/live_updates.py
+const ID_FIELDS: Record<LiveTopic, string> = {
+    triggers: 'triggerid',
+    key_metrics: 'key',
+    host_triggers: 'triggerid',
+};
+const RECONNECT_DELAY_MS = 5000;
+
+export function useLiveTopic<T extends Record<string, any>>(
+    empresaId: string | number | null,
+    topic: LiveTopic,
+    hostId?: string | null,
+) {
+    // null até o primeiro snapshot chegar
+    const [records, setRecords] = useState<T[] | null>(null);
+    const [error, setError] = useState<string | null>(null);
+
+    useEffect(() => {
+        setRecords(null);
+        setError(null);
+        if (!empresaId || (topic !== 'triggers' && !hostId)) return;
+
+        const idField = ID_FIELDS[topic];
+        const controller = new AbortController();
+        let retryTimer: ReturnType<typeof setTimeout> | undefined;
+        let current = new Map<string, T>();
+
+        const apply = (message: any) => {
+            if (message.type === 'error') {
+                setError(message.detail);
+                return;
+            }
+            if (message.type === 'snapshot') {
+                current = new Map(message.data.map((r: T) => [String(r[idField]), r]));
+            } else if (message.type === 'diff') {
+                current = new Map(current);
+                for (const id of message.removed) current.delete(String(id));
+                for (const r of [...message.added, ...message.changed]) current.set(String(r[idField]), r);
+            } else {
+                return;
+            }
+            setError(null);
+            setRecords(Array.from(current.values()));
+        };
+
+        const connect = async () => {
+            const params = new URLSearchParams({ topic });
+            if (hostId) params.set('host_id', hostId);
+            try {
+                const response = await fetchWithAuth(
+                    `${process.env.NEXT_PUBLIC_API_URL}/zabbix/live/${empresaId}?${params}`,
+                    { signal: controller.signal },
+                );
+                if (!response.ok || !response.body) throw new Error(`HTTP error! status: ${response.status}`);
+
+                const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += value;
+                    // Cada mensagem termina numa linha em branco; comentários (": keep-alive") não têm 'data:'
+                    let end;
+                    while ((end = buffer.indexOf('\n\n')) !== -1) {
+                        const block = buffer.slice(0, end);
+                        buffer = buffer.slice(end + 2);
+                        const data = block.split('\n').filter(l => l.startsWith('data: ')).map(l => l.slice(6)).join('\n');
+                        if (data) apply(JSON.parse(data));
+                    }
+                }
+            } catch (e: any) {
+                if (controller.signal.aborted) return;
+                setError(e.message || 'Falha na conexão de atualizações ao vivo.');
+            }
+            // Conexão caiu (deploy, proxy, rede): reconecta e recebe um snapshot novo
+            if (!controller.signal.aborted) retryTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        };
+
+        connect();
+        return () => {
+            controller.abort();
+            clearTimeout(retryTimer);
+        };
+    }, [empresaId, topic, hostId]);
+
+    return { records, error };
+}